@@ -0,0 +1,286 @@
+"""Per-user columnar ledger snapshots for analytics.
+
+Each user's expenses and incomes are exported to one file per kind and
+year under ``ANALYTICS_DIR``::
+
+    analytics/user_42/expenses/year=2024.arrow
+    analytics/user_42/incomes/year=2024.arrow
+    analytics/user_42/manifest.json
+
+``ANALYTICS_FORMAT`` picks Arrow IPC (``arrow``, the default: uncompressed,
+memory-mapped with zero copies) or Parquet (``parquet``: smaller, read with
+``memory_map=True``). ``GET /analytics/aggregate`` answers grouped queries
+from these files with Arrow compute and never touches the OLTP tables.
+
+Refresh is incremental. The manifest keeps a watermark, and only rows with
+``updated_at`` past it are looked at (``ix_*_user_updated`` index). Each
+year partition that holds a changed row, before or after the change, is
+rebuilt from that year's live rows. The watermark is used instead of the
+last exported id because rows can be edited and tombstoned. Users with no
+changes cost two indexed queries each. Years before the archive horizon
+are read from the hot and archive tables together (see ``app.archive``);
+moving rows to the archive does not touch ``updated_at``, so it triggers
+no rebuild. Hard deletes leave nothing to find, so they set
+``user_versions.resync_before`` and the next refresh of that user is full.
+
+Run from cron (e.g. nightly)::
+
+    python -m app.analytics [--user EMAIL] [--full]
+
+pyarrow is optional (``pip install -r requirements-analytics.txt``); without
+it the endpoint returns 501 and the job exits with an error.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import extract, select
+
+from app.archive import ARCHIVES, read_horizon
+from app.database import shard_engines
+from app.models import Expense, Income, User, UserVersion
+
+ANALYTICS_DIR = os.getenv("ANALYTICS_DIR", "./analytics")
+ANALYTICS_FORMAT = os.getenv("ANALYTICS_FORMAT", "arrow")
+
+# Watermark overlap, for transactions still in flight during an export
+WATERMARK_LAG = timedelta(seconds=5)
+
+# kind -> (model, date column, label column)
+KINDS = {
+    "expenses": (Expense, Expense.expense_date, Expense.category),
+    "incomes": (Income, Income.income_date, Income.source),
+}
+EXTENSIONS = {"arrow": ".arrow", "parquet": ".parquet"}
+
+
+def _pyarrow():
+    """Import pyarrow on first use; it is an optional dependency."""
+    try:
+        import pyarrow
+        import pyarrow.compute  # noqa: F401
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def available() -> bool:
+    return _pyarrow() is not None
+
+
+def user_dir(user_id: int) -> str:
+    return os.path.join(ANALYTICS_DIR, f"user_{user_id}")
+
+
+def partition_paths(user_id: int, kind: str):
+    """``{year: path}`` of the existing partitions, in either format."""
+    directory = os.path.join(user_dir(user_id), kind)
+    if not os.path.isdir(directory):
+        return {}
+    paths = {}
+    for name in os.listdir(directory):
+        stem, extension = os.path.splitext(name)
+        if stem.startswith("year=") and extension in EXTENSIONS.values():
+            paths[int(stem[len("year="):])] = os.path.join(directory, name)
+    return paths
+
+
+def read_manifest(user_id: int):
+    try:
+        with open(os.path.join(user_dir(user_id), "manifest.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_json(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _schema(pa):
+    return pa.schema([
+        ("id", pa.int64()),
+        ("date", pa.date32()),
+        ("month", pa.int8()),
+        ("category", pa.dictionary(pa.int32(), pa.string())),
+        ("currency", pa.dictionary(pa.int32(), pa.string())),
+        ("amount_minor", pa.int64()),
+    ])
+
+
+def read_partition(path):
+    """Load one partition; Arrow files are memory-mapped without copying."""
+    pa = _pyarrow()
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return pq.read_table(path, memory_map=True)
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def _write_partition(pa, directory, year, table):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"year={year}{EXTENSIONS[ANALYTICS_FORMAT]}")
+    tmp = f"{path}.tmp"
+    if ANALYTICS_FORMAT == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, tmp)
+    else:
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+    # A partition exists in one format only
+    for extension in EXTENSIONS.values():
+        other = os.path.join(directory, f"year={year}{extension}")
+        if other != path and os.path.exists(other):
+            os.remove(other)
+
+
+def _sources(conn, kind, start=None):
+    """The hot model of ``kind``, plus its archive if rows dated ``start``
+    or later (any date if None) may have been archived."""
+    model = KINDS[kind][0]
+    horizon = read_horizon(conn, model)
+    if horizon is not None and (start is None or start < horizon):
+        return [model, ARCHIVES[model]]
+    return [model]
+
+
+def _year_rows(conn, kind, user_id, year):
+    _, date_column, label = KINDS[kind]
+    rows = []
+    sources = _sources(conn, kind, date(year, 1, 1))
+    for source in sources:
+        source_date, source_label = getattr(source, date_column.key), getattr(source, label.key)
+        rows += conn.execute(
+            select(source.id, source_date, source_label, source.currency, source.amount_minor)
+            .where(source.user_id == user_id, source.deleted_at.is_(None),
+                   source_date >= date(year, 1, 1), source_date < date(year + 1, 1, 1))
+            .order_by(source_date, source.id)
+        ).all()
+    if len(sources) > 1:
+        rows.sort(key=lambda row: (row[1], row[0]))
+    return rows
+
+
+def _build_table(pa, rows):
+    ids, days, months, labels, currencies, amounts = [], [], [], [], [], []
+    for row_id, day, label, currency, amount_minor in rows:
+        ids.append(row_id)
+        days.append(day)
+        months.append(day.month)
+        labels.append(label or "")
+        currencies.append(currency or "USD")
+        amounts.append(amount_minor or 0)
+    schema = _schema(pa)
+    return pa.table([
+        pa.array(ids, pa.int64()),
+        pa.array(days, pa.date32()),
+        pa.array(months, pa.int8()),
+        pa.array(labels, pa.string()).dictionary_encode(),
+        pa.array(currencies, pa.string()).dictionary_encode(),
+        pa.array(amounts, pa.int64()),
+    ], schema=schema)
+
+
+def _changed_years(pa, conn, kind, user_id, watermark, existing):
+    """Years whose partition must be rebuilt for changes after ``watermark``."""
+    model, date_column, _ = KINDS[kind]
+    if watermark is None:
+        # Full export: every year with data, plus stale partitions to drop
+        years = set(existing)
+        for source in _sources(conn, kind):
+            source_date = getattr(source, date_column.key)
+            query = select(extract("year", source_date)).where(
+                source.user_id == user_id, source.deleted_at.is_(None)
+            ).distinct()
+            years |= {int(year) for (year,) in conn.execute(query) if year}
+        return years
+    changed = conn.execute(
+        select(model.id, date_column).where(model.user_id == user_id, model.updated_at > watermark)
+    ).all()
+    if not changed:
+        return set()
+    years = {day.year for _, day in changed if day}
+    # An edit can move a row out of the year it was exported under
+    changed_ids = pa.array([row_id for row_id, _ in changed], pa.int64())
+    for year, path in existing.items():
+        if year not in years:
+            ids = read_partition(path).column("id")
+            if pa.compute.any(pa.compute.is_in(ids, value_set=changed_ids)).as_py():
+                years.add(year)
+    return years
+
+
+def refresh_user(conn, user_id: int, full: bool = False):
+    """Bring one user's snapshot up to date. Returns ``{kind: [rebuilt years]}``."""
+    pa = _pyarrow()
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed (pip install -r requirements-analytics.txt)")
+    manifest = None if full else read_manifest(user_id)
+    watermark = datetime.fromisoformat(manifest["watermark"]) if manifest else None
+    if watermark is not None:
+        # Hard deletes (delete-all of archived rows, a shard move) leave no
+        # changed rows behind, so the whole snapshot is rebuilt
+        resync_before = conn.execute(
+            select(UserVersion.resync_before).where(UserVersion.user_id == user_id)
+        ).scalar()
+        if resync_before is not None and resync_before > watermark:
+            watermark = None
+    started = datetime.utcnow()
+
+    rebuilt = {}
+    for kind in KINDS:
+        existing = partition_paths(user_id, kind)
+        years = _changed_years(pa, conn, kind, user_id, watermark, existing)
+        directory = os.path.join(user_dir(user_id), kind)
+        for year in sorted(years):
+            rows = _year_rows(conn, kind, user_id, year)
+            if rows:
+                _write_partition(pa, directory, year, _build_table(pa, rows))
+            elif year in existing:
+                os.remove(existing[year])
+        rebuilt[kind] = sorted(years)
+
+    os.makedirs(user_dir(user_id), exist_ok=True)
+    _write_json(os.path.join(user_dir(user_id), "manifest.json"), {
+        "user_id": user_id,
+        "watermark": (started - WATERMARK_LAG).isoformat(),
+        "exported_at": started.isoformat(),
+        "format": ANALYTICS_FORMAT,
+    })
+    return rebuilt
+
+
+def _users(conn, email=None):
+    query = select(User.id, User.email)
+    if email:
+        query = query.where(User.email == email)
+    return conn.execute(query.order_by(User.id)).all()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh per-user columnar analytics snapshots.")
+    parser.add_argument("--user", help="only this email")
+    parser.add_argument("--full", action="store_true", help="rebuild every partition")
+    args = parser.parse_args(argv)
+    if not available():
+        print("pyarrow is not installed (pip install -r requirements-analytics.txt)", file=sys.stderr)
+        return 1
+
+    for shard_engine in shard_engines:
+        with shard_engine.connect() as conn:
+            for user_id, email in _users(conn, args.user):
+                rebuilt = refresh_user(conn, user_id, full=args.full)
+                changes = ", ".join(f"{kind} {years}" for kind, years in rebuilt.items() if years)
+                print(f"{email}: {changes or 'up to date'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""Hot/cold archival of old expenses and incomes.
+
+With ``ARCHIVE_AFTER_YEARS`` set (0, the default, disables archiving),
+``python -m app.archive`` moves rows dated more than that many years ago
+(rounded down to a month start) from ``expenses``/``incomes`` into
+``expenses_archive``/``incomes_archive``. Rows are moved in batches of
+``ARCHIVE_BATCH_SIZE``, with one INSERT ... SELECT plus DELETE and a commit
+per batch, so the hot tables and their indexes only hold the recent years.
+
+Rows keep their id. Tombstones and rows changed in the last
+``ARCHIVE_MIN_AGE_DAYS`` stay hot, so ``/sync`` deltas never need the
+archive. On SQLite the row with the highest id also stays, so its id is
+never reused by a new insert.
+
+Each shard keeps an ``archive_horizons`` row per table: every archived row
+is dated before it. Readers only query the archive when the requested
+period starts before the horizon (:func:`may_be_archived`). Processes cache
+the horizon for ``ARCHIVE_HORIZON_CACHE_SECONDS``, so the job raises it
+first and waits that long before moving anything. Lowering the policy
+moves rows back to the hot table first and lowers the horizon afterwards.
+
+The archive is read-only. A write that targets an archived row (delete,
+batch update) first moves it back with :func:`restore`. Archived rows stay
+in the search index (migration v0013).
+
+The same job purges tombstones: expense, income and saving-plan rows
+deleted more than ``TOMBSTONE_RETENTION_DAYS`` ago are removed for good.
+``/sync`` answers older cursors with a full resync, since the deletions
+they would need are gone.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import func, select, true, update
+
+from app.models import ArchiveHorizon, Expense, ExpenseArchive, Income, IncomeArchive, SavingPlan
+
+ARCHIVE_AFTER_YEARS = int(os.getenv("ARCHIVE_AFTER_YEARS", "0"))
+ARCHIVE_MIN_AGE_DAYS = int(os.getenv("ARCHIVE_MIN_AGE_DAYS", "30"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+ARCHIVE_HORIZON_CACHE_SECONDS = float(os.getenv("ARCHIVE_HORIZON_CACHE_SECONDS", "60"))
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "90"))
+
+ARCHIVES = {Expense: ExpenseArchive, Income: IncomeArchive}
+DATE_FIELDS = {Expense: "expense_date", Income: "income_date"}
+
+_horizons = {}  # (shard, table) -> (monotonic time read, archived_before)
+
+
+def read_horizon(db, model) -> Optional[date]:
+    """The stored horizon of ``model``'s table, or None if nothing was ever archived."""
+    return db.execute(
+        select(ArchiveHorizon.archived_before).where(ArchiveHorizon.table_name == model.__tablename__)
+    ).scalar()
+
+
+def archived_before(db, model) -> Optional[date]:
+    """:func:`read_horizon`, cached per process and shard."""
+    key = (db.info.get("shard", 0), model.__tablename__)
+    now = time.monotonic()
+    cached = _horizons.get(key)
+    if cached is None or now - cached[0] > ARCHIVE_HORIZON_CACHE_SECONDS:
+        cached = _horizons[key] = (now, read_horizon(db, model))
+    return cached[1]
+
+
+def may_be_archived(db, model, start: Optional[date]) -> bool:
+    """Whether rows dated ``start`` or later (any date if None) may be in the archive."""
+    horizon = archived_before(db, model)
+    return horizon is not None and (start is None or start < horizon)
+
+
+def _columns(model):
+    return [column.name for column in ARCHIVES[model].__table__.columns]
+
+
+def _move(db, source, target, columns, condition) -> int:
+    """Move the rows of ``source`` matching ``condition`` into ``target``."""
+    moved = db.execute(target.insert().from_select(
+        columns, select(*[source.c[name] for name in columns]).where(condition)
+    )).rowcount
+    if moved:
+        db.execute(source.delete().where(condition))
+    return moved
+
+
+def restore(db, model, user_id: int, ids: Optional[Iterable[int]] = None) -> int:
+    """Move a user's archived rows (all of them if ``ids`` is None) back to
+    the hot table so they can be changed. Returns how many were moved."""
+    archive = ARCHIVES[model].__table__
+    condition = archive.c.user_id == user_id
+    if ids is not None:
+        ids = list(ids)
+        if not ids:
+            return 0
+        condition = condition & archive.c.id.in_(ids)
+    return _move(db, archive, model.__table__, _columns(model), condition)
+
+
+def policy_cutoff(today: date, years: int = None) -> Optional[date]:
+    """First day of the month ``years`` years before ``today``; None when disabled."""
+    years = ARCHIVE_AFTER_YEARS if years is None else years
+    if years <= 0:
+        return None
+    return date(today.year - years, today.month, 1)
+
+
+def _set_horizon(conn, model, horizon: date):
+    table = ArchiveHorizon.__table__
+    values = {"archived_before": horizon, "updated_at": datetime.utcnow()}
+    updated = conn.execute(
+        update(table).where(table.c.table_name == model.__tablename__).values(**values)
+    ).rowcount
+    if not updated:
+        conn.execute(table.insert().values(table_name=model.__tablename__, **values))
+    conn.commit()
+
+
+def _move_batches(conn, source, target, columns, condition, batch_size: int) -> int:
+    total = 0
+    while True:
+        batch = select(source.c.id).where(condition).order_by(source.c.id).limit(batch_size)
+        moved = _move(conn, source, target, columns, source.c.id.in_(batch.scalar_subquery()))
+        conn.commit()
+        total += moved
+        if moved < batch_size:
+            return total
+
+
+def archive_table(conn, model, cutoff: date, now: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Move ``model``'s rows dated before ``cutoff`` to its archive; returns the row count."""
+    hot, archive = model.__table__, ARCHIVES[model].__table__
+    date_column = hot.c[DATE_FIELDS[model]]
+    horizon = read_horizon(conn, model)
+    if horizon is None or cutoff > horizon:
+        # Readers must look at the archive before any row lands there
+        _set_horizon(conn, model, cutoff)
+        time.sleep(ARCHIVE_HORIZON_CACHE_SECONDS)
+    condition = (
+        (date_column < cutoff)
+        & hot.c.deleted_at.is_(None)
+        & (hot.c.updated_at < now - timedelta(days=ARCHIVE_MIN_AGE_DAYS))
+        # SQLite hands out max(id) + 1, so the newest id must stay
+        & (hot.c.id < select(func.max(hot.c.id)).scalar_subquery())
+    )
+    return _move_batches(conn, hot, archive, _columns(model), condition, batch_size)
+
+
+def unarchive_table(conn, model, cutoff: Optional[date], batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Move archived rows dated ``cutoff`` or later (all if None) back, then lower the horizon."""
+    hot, archive = model.__table__, ARCHIVES[model].__table__
+    horizon = read_horizon(conn, model)
+    if horizon is None or (cutoff is not None and cutoff >= horizon):
+        return 0
+    condition = true() if cutoff is None else archive.c[DATE_FIELDS[model]] >= cutoff
+    moved = _move_batches(conn, archive, hot, _columns(model), condition, batch_size)
+    if cutoff is None:
+        table = ArchiveHorizon.__table__
+        conn.execute(table.delete().where(table.c.table_name == model.__tablename__))
+        conn.commit()
+    else:
+        _set_horizon(conn, model, cutoff)
+    return moved
+
+
+def purge_tombstones(conn, model, now: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Delete ``model``'s rows tombstoned more than ``TOMBSTONE_RETENTION_DAYS``
+    before ``now``; returns the row count."""
+    table = model.__table__
+    condition = (
+        (table.c.deleted_at < now - timedelta(days=TOMBSTONE_RETENTION_DAYS))
+        # As when archiving: the newest id must stay so it is never reused
+        & (table.c.id < select(func.max(table.c.id)).scalar_subquery())
+    )
+    total = 0
+    while True:
+        batch = select(table.c.id).where(condition).order_by(table.c.id).limit(batch_size)
+        purged = conn.execute(table.delete().where(table.c.id.in_(batch.scalar_subquery()))).rowcount
+        conn.commit()
+        total += purged
+        if purged < batch_size:
+            return total
+
+
+def run(conn, today: date, years: int = None, batch_size: int = ARCHIVE_BATCH_SIZE):
+    """Apply the archival policy to one shard and purge old tombstones.
+
+    Returns ``({table: rows moved}, {table: tombstones purged})``; moved
+    counts are negative when rows were moved back to the hot table.
+    """
+    cutoff = policy_cutoff(today, years)
+    now = datetime.utcnow()
+    moved = {}
+    for model in ARCHIVES:
+        restored = unarchive_table(conn, model, cutoff, batch_size)
+        archived = archive_table(conn, model, cutoff, now, batch_size) if cutoff else 0
+        moved[model.__tablename__] = archived - restored
+    purged = {model.__tablename__: purge_tombstones(conn, model, now, batch_size)
+              for model in (Expense, Income, SavingPlan)}
+    return moved, purged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Move old expenses and incomes to the archive tables and purge old tombstones."
+    )
+    parser.add_argument("--years", type=int, default=None,
+                        help="archive rows older than this many years (default ARCHIVE_AFTER_YEARS; 0 restores everything)")
+    args = parser.parse_args(argv)
+    from app.database import shard_engines
+
+    today = datetime.utcnow().date()
+    for shard, shard_engine in enumerate(shard_engines):
+        with shard_engine.connect() as conn:
+            moved, purged = run(conn, today, args.years)
+        print(f"shard {shard}: " + ", ".join(f"{name} {count:+d}" for name, count in moved.items())
+              + "; tombstones purged: " + ", ".join(f"{name} {count}" for name, count in purged.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
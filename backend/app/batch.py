@@ -0,0 +1,153 @@
+"""Set-based batch mutations for ``POST /expenses/batch`` and ``POST /incomes/batch``.
+
+A batch is applied as a handful of statements, whatever its size:
+
+* one ``SELECT`` of the rows targeted by updates and deletes (existence,
+  current currency and date), plus a move back from the archive for ids
+  that were not found,
+* one multi-row ``INSERT ... RETURNING id`` for all creates,
+* one ``UPDATE ... WHERE id IN (...)`` per distinct set of changes (so
+  recategorizing 500 rows is a single statement),
+* one ``UPDATE`` that tombstones all deletes,
+
+followed by a single commit. Operations that cannot be applied (unknown id,
+bad shape) are reported in their result and skipped; the rest still apply.
+"""
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import List
+
+from fastapi import HTTPException
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.archive import restore
+from app.cache import touch_user
+from app.currency_utils import minor_to_decimal, to_minor
+from app.idempotency import commit_with_key
+from app.periods import reopen_periods
+from app.schemas import BatchResponse, BatchResult
+
+MAX_BATCH_OPS = int(os.getenv("MAX_BATCH_OPS", "1000"))
+
+# Fields that cannot be set to null by an update
+REQUIRED_FIELDS = {"category", "source", "amount", "currency", "expense_date", "income_date", "expense_type"}
+
+
+def apply_batch(db: Session, user_id: int, model, date_field: str, operations, idempotency=(None, None)):
+    if len(operations) > MAX_BATCH_OPS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_OPS} operations per batch")
+
+    results = {}
+    date_column = getattr(model, date_field)
+    now = datetime.utcnow()
+    days = set()  # Dates whose closed-month snapshots must be dropped
+
+    def fail(index, op, status, detail):
+        results[index] = BatchResult(index=index, op=op.op, id=op.id, status=status, detail=detail)
+
+    # Shape checks; each id may be targeted once per batch
+    creates, updates, deletes, seen = [], [], [], set()
+    for index, op in enumerate(operations):
+        if op.op == "create":
+            if op.data is None:
+                fail(index, op, 422, "create needs data")
+            else:
+                creates.append((index, op))
+        elif op.op in ("update", "delete"):
+            if op.id is None:
+                fail(index, op, 422, f"{op.op} needs an id")
+            elif op.id in seen:
+                fail(index, op, 409, "id already used earlier in this batch")
+            elif op.op == "update" and (op.changes is None or not op.changes.model_fields_set):
+                fail(index, op, 422, "update needs changes")
+            else:
+                seen.add(op.id)
+                (updates if op.op == "update" else deletes).append((index, op))
+        else:
+            fail(index, op, 422, "op must be create, update or delete")
+
+    def lookup(ids):
+        return {row.id: row for row in db.query(
+            model.id, model.currency, model.amount_minor, date_column.label("day")
+        ).filter(
+            model.user_id == user_id, model.deleted_at.is_(None), model.id.in_(ids)
+        )}
+
+    existing = lookup(seen) if seen else {}
+    missing = seen - existing.keys()
+    if missing and restore(db, model, user_id, missing):
+        # Archived rows are moved back to the hot table before being changed
+        existing.update(lookup(missing))
+
+    # Creates: one multi-row INSERT
+    if creates:
+        rows = []
+        for index, op in creates:
+            values = op.data.model_dump()
+            values["currency"] = values.get("currency") or "USD"
+            values["amount_minor"] = to_minor(values.pop("amount"), values["currency"])
+            rows.append({**values, "user_id": user_id, "created_at": now, "updated_at": now})
+            days.add(values[date_field])
+        ids = db.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), rows).all()
+        for (index, op), new_id in zip(creates, ids):
+            results[index] = BatchResult(index=index, op="create", id=new_id, status=201)
+
+    # Updates: one UPDATE per distinct set of new values
+    groups = defaultdict(list)
+    for index, op in updates:
+        row = existing.get(op.id)
+        if row is None:
+            fail(index, op, 404, "Not found")
+            continue
+        values = op.changes.model_dump(exclude_unset=True)
+        nulls = sorted(name for name, value in values.items() if value is None and name in REQUIRED_FIELDS)
+        if nulls:
+            fail(index, op, 422, f"Cannot clear {', '.join(nulls)}")
+            continue
+        currency = values.get("currency", row.currency)
+        if "amount" in values:
+            values["amount_minor"] = to_minor(values.pop("amount"), currency)
+        elif currency != row.currency:
+            # Same value, re-expressed in the new currency's minor unit
+            values["amount_minor"] = to_minor(minor_to_decimal(row.amount_minor, row.currency), currency)
+        days.update((row.day, values.get(date_field)))
+        groups[tuple(sorted(values.items()))].append((index, op.id))
+    for key, members in groups.items():
+        db.execute(
+            update(model)
+            .where(model.user_id == user_id, model.id.in_([row_id for _, row_id in members]))
+            .values(**dict(key), updated_at=now),
+            execution_options={"synchronize_session": False},
+        )
+        for index, row_id in members:
+            results[index] = BatchResult(index=index, op="update", id=row_id, status=200)
+
+    # Deletes: one UPDATE writing the tombstones
+    found = []
+    for index, op in deletes:
+        row = existing.get(op.id)
+        if row is None:
+            fail(index, op, 404, "Not found")
+            continue
+        found.append(op.id)
+        days.add(row.day)
+        results[index] = BatchResult(index=index, op="delete", id=op.id, status=200)
+    if found:
+        db.execute(
+            update(model)
+            .where(model.user_id == user_id, model.id.in_(found))
+            .values(deleted_at=now, updated_at=now),
+            execution_options={"synchronize_session": False},
+        )
+
+    ordered: List[BatchResult] = [results[index] for index in range(len(operations))]
+    applied = sum(1 for result in ordered if result.status < 400)
+    response = BatchResponse(applied=applied, failed=len(ordered) - applied, results=ordered)
+    if applied:
+        # Late entries for closed months invalidate those snapshots
+        reopen_periods(db, user_id, days)
+        touch_user(db, user_id)
+    key, fingerprint = idempotency
+    return commit_with_key(db, user_id, key, fingerprint, response)
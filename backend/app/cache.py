@@ -0,0 +1,119 @@
+"""Per-user, per-process caches that stay correct with many workers.
+
+Every write to a user's data calls :func:`touch_user` before committing,
+which bumps that user's row in ``user_versions`` inside the same
+transaction. Cached values are stored with the version they were computed
+at. A worker serves a cached value only while the database still reports
+that version, so a write made through any worker is seen by the very next
+request on every other worker.
+
+The version check is a primary-key lookup (or is folded into a query the
+route already makes via :func:`remember_version`) and is done at most once
+per user per request.
+"""
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app import database
+from app.models import UserVersion
+
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+
+
+def touch_user(db: Session, user_id: int):
+    """Record that ``user_id``'s data changed. Call before ``db.commit()``."""
+    db.execute(text(
+        "INSERT INTO user_versions (user_id, version, updated_at) VALUES (:user_id, 1, :now) "
+        "ON CONFLICT (user_id) DO UPDATE SET version = user_versions.version + 1, "
+        "updated_at = excluded.updated_at"
+    ), {"user_id": user_id, "now": datetime.utcnow()})
+    # The request's remembered version is now stale
+    db.info.setdefault("user_versions", {}).pop(user_id, None)
+    db.info.setdefault("touched_users", set()).add(user_id)
+
+
+def remember_version(db: Session, user_id: int, version):
+    """Store a version fetched by the caller (e.g. joined into the user query)."""
+    db.info.setdefault("user_versions", {})[user_id] = version or 0
+
+
+def current_version(db: Session, user_id: int) -> int:
+    versions = db.info.setdefault("user_versions", {})
+    if user_id not in versions:
+        version = db.query(UserVersion.version).filter(UserVersion.user_id == user_id).scalar()
+        versions[user_id] = version or 0
+    return versions[user_id]
+
+
+def route_reads(db: Session, user_id: int):
+    """Pick replica or primary for the rest of a read-only request.
+
+    Only does anything for replica-routed sessions (``get_read_db`` with
+    ``DATABASE_READ_URL`` set). The user's version row is read from the
+    primary. If it changed within ``READ_AFTER_WRITE_SECONDS``, the user's
+    reads stay on the primary so they see their own writes from any worker.
+    The primary's version also becomes the one caches validate against.
+    """
+    if database.read_engine is None or not db.info.get("read_only") or db.info.get("shard"):
+        return
+    row = db.execute(
+        select(UserVersion.version, UserVersion.updated_at).where(UserVersion.user_id == user_id),
+        bind_arguments={"bind": database.engine},
+    ).first()
+    version, updated_at = row if row else (0, None)
+    remember_version(db, user_id, version)
+    window = timedelta(seconds=database.READ_AFTER_WRITE_SECONDS)
+    if updated_at is not None and datetime.utcnow() - updated_at < window:
+        db.info["use_primary"] = True
+
+
+def require_caught_up(db: Session, user_id: int):
+    """For reads that must not miss any committed write of ``user_id``.
+
+    Call after :func:`route_reads`. Every write bumps the user's version in
+    the same transaction, so the replica has them all when its version row
+    matches the primary's; otherwise the rest of the request reads from the
+    primary.
+    """
+    if database.read_engine is None or not db.info.get("read_only") or db.info.get("shard"):
+        return
+    if db.info.get("use_primary"):
+        return
+    replica_version = db.query(UserVersion.version).filter(UserVersion.user_id == user_id).scalar()
+    if (replica_version or 0) != current_version(db, user_id):
+        db.info["use_primary"] = True
+
+
+class UserCache:
+    """Bounded LRU of ``(user_id, key) -> (version, value)``."""
+
+    def __init__(self, name: str, max_entries: int = CACHE_MAX_ENTRIES):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, db: Session, user_id: int, key, compute):
+        version = current_version(db, user_id)
+        cache_key = (user_id, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(cache_key)
+                return entry[1]
+        value = compute()
+        with self._lock:
+            self._entries[cache_key] = (version, value)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -1,4 +1,5 @@
 """Currency conversion utilities"""
+from decimal import Decimal, ROUND_HALF_UP
 
 def convert_amount(amount: float, from_currency: str, to_currency: str, rate: float = 81.0) -> float:
     """
@@ -29,3 +30,64 @@ def get_currency_symbol(currency: str) -> str:
     if currency == "INR":
         return "₹"
     return "$"
+
+# Fixed-point money
+#
+# Amounts are stored as integers in the currency's minor unit (cents, paise)
+# so SQL SUMs are exact. CURRENCY_EXPONENTS is the number of minor-unit
+# digits per currency; anything not listed (and saving plans, which carry no
+# currency) uses DEFAULT_EXPONENT. Conversion to a display currency happens
+# once, on exact Decimal totals, rounded half-up to that currency's exponent.
+
+CURRENCY_EXPONENTS = {
+    "USD": 2,
+    "INR": 2,
+}
+DEFAULT_EXPONENT = 2
+
+def currency_exponent(currency: str) -> int:
+    return CURRENCY_EXPONENTS.get(currency, DEFAULT_EXPONENT)
+
+def to_minor(amount: float, currency: str = None) -> int:
+    """Convert a major-unit amount (e.g. 12.34 USD) to integer minor units (1234)."""
+    if amount is None:
+        return None
+    scaled = Decimal(str(amount)).scaleb(currency_exponent(currency))
+    return int(scaled.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def minor_to_decimal(minor: int, currency: str = None) -> Decimal:
+    """Exact major-unit value of an integer minor-unit amount."""
+    return Decimal(int(minor or 0)).scaleb(-currency_exponent(currency))
+
+def from_minor(minor: int, currency: str = None) -> float:
+    if minor is None:
+        return None
+    return float(minor_to_decimal(minor, currency))
+
+def convert_decimal(value: Decimal, from_currency: str, to_currency: str, rate: float = 81.0) -> Decimal:
+    """Exact (unrounded) counterpart of :func:`convert_amount`."""
+    if from_currency == to_currency:
+        return value
+    if from_currency == "USD" and to_currency == "INR":
+        return value * Decimal(str(rate))
+    elif from_currency == "INR" and to_currency == "USD":
+        return value / Decimal(str(rate))
+    return value
+
+def round_money(value: Decimal, currency: str = None) -> float:
+    """Round a Decimal amount half-up to the currency's minor unit."""
+    quantum = Decimal(1).scaleb(-currency_exponent(currency))
+    return float(value.quantize(quantum, rounding=ROUND_HALF_UP))
+
+def convert_minor(minor: int, from_currency: str, to_currency: str, rate: float = 81.0) -> float:
+    """Minor units in ``from_currency`` -> rounded major units in ``to_currency``."""
+    value = convert_decimal(minor_to_decimal(minor, from_currency), from_currency, to_currency, rate)
+    return round_money(value, to_currency)
+
+def total_in_currency(minor_by_currency: dict, to_currency: str, rate: float = 81.0) -> Decimal:
+    """Exact sum of ``{currency: minor_total}`` expressed in ``to_currency``."""
+    return sum(
+        (convert_decimal(minor_to_decimal(minor, currency), currency, to_currency, rate)
+         for currency, minor in minor_by_currency.items()),
+        Decimal(0),
+    )
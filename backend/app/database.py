@@ -1,24 +1,103 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.sql.elements import TextClause
 
 # DATABASE_URL = "sqlite:///./test.db"
 # Use env var (cloud) or fallback to local sqlite (dev)
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
+# Optional read replica for read-only GET handlers
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+# After a user writes, their reads stay on the primary for this long
+READ_AFTER_WRITE_SECONDS = float(os.getenv("READ_AFTER_WRITE_SECONDS", "5"))
 
-# Render/Heroku fix: SQLAlchemy requires postgresql://, but some providers give postgres://
-if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+def _normalize_url(url):
+    # Render/Heroku fix: SQLAlchemy requires postgresql://, but some providers give postgres://
+    if url and url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+    return url
 
-connect_args = {}
-# Only add check_same_thread for SQLite
-if "sqlite" in DATABASE_URL:
-    connect_args["check_same_thread"] = False
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers in other worker processes proceed during a write;
+    # busy_timeout makes concurrent writers wait instead of failing.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
 
-engine = create_engine(
-    DATABASE_URL, connect_args=connect_args
+def _create_engine(url):
+    connect_args = {}
+    # Only add check_same_thread for SQLite
+    if "sqlite" in url:
+        connect_args["check_same_thread"] = False
+    new_engine = create_engine(url, connect_args=connect_args)
+    if new_engine.dialect.name == "sqlite":
+        event.listen(new_engine, "connect", _sqlite_pragmas)
+    return new_engine
+
+DATABASE_URL = _normalize_url(DATABASE_URL)
+DATABASE_READ_URL = _normalize_url(DATABASE_READ_URL)
+
+engine = _create_engine(DATABASE_URL)
+read_engine = _create_engine(DATABASE_READ_URL) if DATABASE_READ_URL else None
+
+# Horizontal sharding of user data. Shard 0 is always DATABASE_URL, which
+# also holds the global email -> shard directory; DATABASE_SHARD_URLS lists
+# the additional shards 1..N-1 (comma separated). See app/sharding.py.
+DATABASE_SHARD_URLS = [
+    _normalize_url(url.strip())
+    for url in os.getenv("DATABASE_SHARD_URLS", "").split(",") if url.strip()
+]
+shard_engines = [engine] + [_create_engine(url) for url in DATABASE_SHARD_URLS]
+
+# Tables that only exist meaningfully on the primary, whatever the shard
+GLOBAL_TABLES = {"shard_directory"}
+
+def _is_write(clause) -> bool:
+    if clause is None:
+        return False
+    if isinstance(clause, TextClause):
+        keyword = clause.text.lstrip().split(None, 1)[0].upper() if clause.text.strip() else ""
+        return keyword not in ("SELECT", "WITH", "EXPLAIN")
+    return bool(getattr(clause, "is_dml", False))
+
+class RoutingSession(Session):
+    """Session that picks the database per statement.
+
+    * Global tables (the shard directory) always use the primary.
+    * Once ``info["shard"]`` is set (``app.sharding.bind_user_shard``), user
+      data goes to that shard's engine.
+    * Read-only sessions (``info["read_only"]``) on shard 0 read from the
+      replica when one is configured and write to the primary. Reads go to
+      the primary as well once ``info["use_primary"]`` is set (see
+      ``app.cache.route_reads``), which keeps a user's own recent writes
+      visible to them.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kw):
+        if bind is not None:
+            # Explicit bind_arguments={"bind": ...} always wins
+            return bind
+        if mapper is not None and mapper.local_table.name in GLOBAL_TABLES:
+            return engine
+        shard = self.info.get("shard", 0)
+        if shard:
+            return shard_engines[shard]
+        if (
+            read_engine is None
+            or not self.info.get("read_only")
+            or self.info.get("use_primary")
+            or self._flushing
+            or _is_write(clause)
+        ):
+            return engine
+        return read_engine
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, class_=RoutingSession)
+ReadSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, class_=RoutingSession, info={"read_only": True}
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
@@ -29,5 +108,17 @@ def get_db():
     finally:
         db.close()
 
-def init_db():
-    Base.metadata.create_all(bind=engine)
+def get_read_db():
+    """Session for read-only GET handlers; uses the replica when configured."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def check_schema():
+    """Fail fast if migrations have not been applied (see ``python -m app.migrate``)."""
+    from app import migrations
+    for shard_engine in shard_engines[1:]:
+        migrations.check(shard_engine)
+    return migrations.check(engine)
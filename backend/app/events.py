@@ -0,0 +1,135 @@
+"""In-process pub/sub behind ``GET /events`` (server-sent events).
+
+Each open event stream holds one ``asyncio.Queue(maxsize=1)`` in the hub; an
+idle connection costs a queue and a suspended coroutine, no thread and no
+database session. Notifications carry no payload and coalesce: a stream that
+is woken several times before it runs recomputes its state once.
+
+Two sources wake streams:
+
+* Commits in this process. :func:`app.cache.touch_user` records the user in
+  ``session.info["touched_users"]`` and the ``after_commit`` hook below
+  publishes them.
+* Commits in other worker processes. While any stream is open, one task per
+  process polls ``user_versions`` for the subscribed users every
+  ``EVENTS_POLL_SECONDS`` (one query per shard, regardless of how many
+  connections are open) and wakes users whose version moved.
+"""
+import asyncio
+import logging
+import os
+
+from sqlalchemy import event, select
+
+from app import database
+from app.models import UserVersion
+
+EVENTS_POLL_SECONDS = float(os.getenv("EVENTS_POLL_SECONDS", "2"))
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "25"))
+EVENTS_MAX_CONNECTIONS = int(os.getenv("EVENTS_MAX_CONNECTIONS", "10000"))
+
+POLL_CHUNK = 500
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_versions(user_ids):
+    """``{user_id: version}`` from every shard's primary, for the given users."""
+    table = UserVersion.__table__
+    versions = {}
+    for shard_engine in database.shard_engines:
+        with shard_engine.connect() as conn:
+            for start in range(0, len(user_ids), POLL_CHUNK):
+                chunk = user_ids[start:start + POLL_CHUNK]
+                for user_id, version in conn.execute(
+                    select(table.c.user_id, table.c.version).where(table.c.user_id.in_(chunk))
+                ):
+                    versions[user_id] = version
+    return versions
+
+
+class EventHub:
+    def __init__(self):
+        self._subscribers = {}  # user_id -> set of queues
+        self._versions = {}  # user_id -> version last seen by the poller
+        self._loop = None
+        self._poller = None
+
+    def connection_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        """Register a stream for ``user_id``. Must run on the event loop."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop, self._poller, self._versions = loop, None, {}
+        queue = asyncio.Queue(maxsize=1)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        if EVENTS_POLL_SECONDS > 0 and (self._poller is None or self._poller.done()):
+            self._poller = loop.create_task(self._poll())
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+            self._versions.pop(user_id, None)
+
+    def publish(self, user_ids):
+        """Wake every stream of ``user_ids``. Safe to call from any thread."""
+        loop = self._loop
+        if loop is None or loop.is_closed() or not self._subscribers:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._notify(user_ids)
+        else:
+            loop.call_soon_threadsafe(self._notify, list(user_ids))
+
+    def _notify(self, user_ids):
+        for user_id in user_ids:
+            for queue in self._subscribers.get(user_id, ()):
+                if queue.empty():
+                    queue.put_nowait(None)
+
+    async def _poll(self):
+        while self._subscribers:
+            await asyncio.sleep(EVENTS_POLL_SECONDS)
+            user_ids = list(self._subscribers)
+            if not user_ids:
+                break
+            try:
+                versions = await asyncio.to_thread(fetch_versions, user_ids)
+            except Exception:
+                logger.exception("Polling user_versions failed")
+                continue
+            changed = []
+            for user_id in user_ids:
+                version = versions.get(user_id, 0)
+                if user_id in self._subscribers and self._versions.get(user_id) != version:
+                    self._versions[user_id] = version
+                    changed.append(user_id)
+            # Streams drop notifications that do not change their version,
+            # so waking a newly seen user once is harmless
+            self._notify(changed)
+
+
+hub = EventHub()
+
+
+@event.listens_for(database.RoutingSession, "after_commit")
+def _publish_touched_users(session):
+    touched = session.info.pop("touched_users", None)
+    if touched:
+        hub.publish(touched)
+
+
+@event.listens_for(database.RoutingSession, "after_rollback")
+def _forget_touched_users(session):
+    session.info.pop("touched_users", None)
@@ -0,0 +1,231 @@
+"""Month-end forecasts for ``GET /dashboard/forecast``.
+
+The projection for the current month is the month-to-date total plus an
+estimate for the remaining days. Each component gets its own estimate:
+
+* **regular expenses and income** (rent, bills, salary) arrive on roughly
+  the same days every month. The estimate is the average amount that
+  arrived after today's day of the month in each of the previous
+  ``FORECAST_SEASONAL_MONTHS`` months (default 3);
+* **additional expenses** are day-to-day spending. The estimate is the
+  average for each weekday over the trailing ``FORECAST_TRAILING_DAYS``
+  (default 56), summed over the weekdays that remain.
+
+Amounts are converted to each user's currency. Any number of users is
+forecast at once from one grouped daily-sum query. It fills a
+``users x components x days`` NumPy array, and every estimate is a few
+array operations on it.
+
+``python -m app.forecast`` (e.g. nightly from cron) stores a forecast for
+every user on every shard in ``forecasts``. The endpoint serves the
+stored one while it is for today and the user has not written since;
+otherwise it computes the user's forecast on the spot. Either way the
+result is cached in-process until the user's next write.
+"""
+import argparse
+import calendar
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+from sqlalchemy import func, literal, select, union_all
+
+from app.cache import current_version
+from app.currency_utils import currency_exponent, round_money
+from app.models import Expense, Forecast, Income, Settings, User, UserVersion
+from app.schemas import DashboardForecast, ForecastLine
+
+FORECAST_SEASONAL_MONTHS = int(os.getenv("FORECAST_SEASONAL_MONTHS", "3"))
+FORECAST_TRAILING_DAYS = int(os.getenv("FORECAST_TRAILING_DAYS", "56"))
+FORECAST_BATCH_USERS = int(os.getenv("FORECAST_BATCH_USERS", "1000"))
+
+REGULAR, ADDITIONAL, INCOME = range(3)
+# Currencies convert_amount knows about; anything else is left as is
+CURRENCY_CODES = {"USD": 0, "INR": 1}
+
+
+def _add_months(day: date, months: int) -> date:
+    """First day of the month ``months`` away from ``day``'s month."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _daily_sums(user_ids, start: date, end: date):
+    """Per user, component, currency and day totals in ``[start, end]``."""
+    expenses = select(
+        Expense.user_id.label("user_id"), Expense.expense_type.label("component"),
+        Expense.currency.label("currency"), Expense.expense_date.label("day"),
+        func.sum(Expense.amount_minor).label("total"),
+    ).where(
+        Expense.user_id.in_(user_ids), Expense.deleted_at.is_(None),
+        Expense.expense_date >= start, Expense.expense_date <= end,
+    ).group_by(Expense.user_id, Expense.expense_type, Expense.currency, Expense.expense_date)
+    incomes = select(
+        Income.user_id, literal("income"), Income.currency, Income.income_date,
+        func.sum(Income.amount_minor),
+    ).where(
+        Income.user_id.in_(user_ids), Income.deleted_at.is_(None),
+        Income.income_date >= start, Income.income_date <= end,
+    ).group_by(Income.user_id, Income.currency, Income.income_date)
+    return union_all(expenses, incomes)
+
+
+def daily_matrix(db, users, start: date, today: date):
+    """``[user, component, day]`` totals in each user's currency, major units.
+
+    ``users`` is a list of ``(user_id, currency, usd_to_inr_rate)`` sorted
+    by user id.
+    """
+    ids = np.array([user_id for user_id, _, _ in users], dtype=np.int64)
+    targets = np.array([CURRENCY_CODES.get(currency, -1) for _, currency, _ in users])
+    rates = np.array([rate for _, _, rate in users], dtype=np.float64)
+    daily = np.zeros((len(users), 3, (today - start).days + 1))
+
+    rows = db.execute(_daily_sums(ids.tolist(), start, today)).all()
+    if not rows:
+        return daily
+    user_ids, components, currencies, days, totals = zip(*rows)
+    u = np.searchsorted(ids, np.array(user_ids, dtype=np.int64))
+    components = np.array(components, dtype=object)
+    c = np.where(components == "regular", REGULAR, np.where(components == "income", INCOME, ADDITIONAL))
+    d = (np.array(days, dtype="datetime64[D]") - np.datetime64(start, "D")).astype(np.int64)
+
+    # Minor units -> major units of the row's currency -> user's currency
+    names, inverse = np.unique(np.array([code or "USD" for code in currencies]), return_inverse=True)
+    scale = np.array([10.0 ** -currency_exponent(name) for name in names])[inverse]
+    source = np.array([CURRENCY_CODES.get(name, -1) for name in names])[inverse]
+    target, rate = targets[u], rates[u]
+    factor = np.ones(len(rows))
+    to_inr = (source == CURRENCY_CODES["USD"]) & (target == CURRENCY_CODES["INR"])
+    to_usd = (source == CURRENCY_CODES["INR"]) & (target == CURRENCY_CODES["USD"])
+    factor[to_inr] = rate[to_inr]
+    factor[to_usd] = 1 / rate[to_usd]
+
+    amounts = np.array(totals, dtype=np.float64) * scale * factor
+    np.add.at(daily, (u, c, d), amounts)
+    return daily
+
+
+def project(daily, start: date, today: date):
+    """Month-to-date and projected month-end totals, each ``[user, component]``."""
+    days = np.arange(np.datetime64(start, "D"), np.datetime64(today, "D") + 1)
+    months = days.astype("datetime64[M]")
+    day_of_month = (days - months).astype(np.int64) + 1
+    weekdays = (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+    this_month = np.datetime64(today, "M")
+    actual = daily[:, :, months == this_month].sum(axis=2)
+
+    # Regular expenses and income: what arrived after today's day of the
+    # month in each previous month, averaged
+    seasonal = np.stack([
+        (months == this_month - k) & (day_of_month > today.day)
+        for k in range(1, FORECAST_SEASONAL_MONTHS + 1)
+    ]).astype(np.float64)
+    monthly_rest = (daily @ seasonal.T).mean(axis=2)
+
+    # Additional expenses: mean per weekday over the trailing window
+    # (yesterday and before), times the number of each weekday left
+    window_start = np.datetime64(today - timedelta(days=FORECAST_TRAILING_DAYS), "D")
+    trailing = (days >= window_start) & (days < np.datetime64(today, "D"))
+    by_weekday = ((weekdays[:, None] == np.arange(7)) & trailing[:, None]).astype(np.float64)
+    weekday_mean = (daily @ by_weekday) / np.maximum(by_weekday.sum(axis=0), 1)
+    month_end = date(today.year, today.month, calendar.monthrange(today.year, today.month)[1])
+    remaining = np.arange(np.datetime64(today, "D") + 1, np.datetime64(month_end, "D") + 1)
+    remaining_weekdays = np.bincount((remaining.astype(np.int64) + 3) % 7, minlength=7)
+    weekday_rest = weekday_mean @ remaining_weekdays
+
+    rest = monthly_rest.copy()
+    rest[:, ADDITIONAL] = weekday_rest[:, ADDITIONAL]
+    return actual, actual + rest
+
+
+def _line(actual, projected, currency: str) -> ForecastLine:
+    return ForecastLine(
+        actual=round_money(Decimal(repr(float(actual))), currency),
+        projected=round_money(Decimal(repr(float(projected))), currency),
+    )
+
+
+def forecast_users(db, users, today: date):
+    """Forecasts for ``users`` (``(user_id, currency, rate)`` tuples) -> ``{user_id: DashboardForecast}``."""
+    users = sorted(users)
+    if not users:
+        return {}
+    start = min(_add_months(today, -FORECAST_SEASONAL_MONTHS), today - timedelta(days=FORECAST_TRAILING_DAYS))
+    actual, projected = project(daily_matrix(db, users, start, today), start, today)
+    actual_expense, projected_expense = actual[:, :INCOME].sum(axis=1), projected[:, :INCOME].sum(axis=1)
+
+    forecasts = {}
+    for i, (user_id, currency, _) in enumerate(users):
+        forecasts[user_id] = DashboardForecast(
+            month=today.month,
+            year=today.year,
+            as_of=today,
+            regularExpense=_line(actual[i, REGULAR], projected[i, REGULAR], currency),
+            additionalExpense=_line(actual[i, ADDITIONAL], projected[i, ADDITIONAL], currency),
+            totalExpense=_line(actual_expense[i], projected_expense[i], currency),
+            totalIncome=_line(actual[i, INCOME], projected[i, INCOME], currency),
+            savings=_line(actual[i, INCOME] - actual_expense[i], projected[i, INCOME] - projected_expense[i], currency),
+            currency=currency,
+        )
+    return forecasts
+
+
+def user_forecast(db, user_id: int, currency: str, rate: float, today: date) -> DashboardForecast:
+    """The nightly forecast if it is still current, otherwise a fresh one."""
+    stored = db.query(Forecast).filter(Forecast.user_id == user_id).first()
+    if stored is not None and stored.as_of == today and stored.version == current_version(db, user_id):
+        forecast = DashboardForecast.model_validate_json(stored.payload)
+        if forecast.currency == currency:
+            return forecast
+    return forecast_users(db, [(user_id, currency, rate)], today)[user_id]
+
+
+def store_all(conn, today: date, batch_size: int = FORECAST_BATCH_USERS) -> int:
+    """Forecast every user on one shard and store the results. Returns the user count."""
+    users = conn.execute(
+        select(User.id, Settings.currency, Settings.usd_to_inr_rate, UserVersion.version)
+        .outerjoin(Settings, Settings.user_id == User.id)
+        .outerjoin(UserVersion, UserVersion.user_id == User.id)
+        .order_by(User.id)
+    ).all()
+    conn.commit()
+    table = Forecast.__table__
+    for offset in range(0, len(users), batch_size):
+        batch = users[offset:offset + batch_size]
+        # Versions were read before the data, so a write that lands in
+        # between leaves the stored forecast stale rather than wrong
+        versions = {user_id: version or 0 for user_id, _, _, version in batch}
+        forecasts = forecast_users(
+            conn, [(user_id, currency or "USD", rate or 81.0) for user_id, currency, rate, _ in batch], today
+        )
+        now = datetime.utcnow()
+        conn.execute(table.delete().where(table.c.user_id.in_(list(forecasts))))
+        conn.execute(table.insert(), [
+            {"user_id": user_id, "as_of": today, "version": versions[user_id],
+             "payload": forecast.model_dump_json(), "computed_at": now}
+            for user_id, forecast in forecasts.items()
+        ])
+        conn.commit()
+    return len(users)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute month-end forecasts for every user.")
+    parser.parse_args(argv)
+    from app.database import shard_engines
+
+    today = datetime.utcnow().date()
+    for shard, shard_engine in enumerate(shard_engines):
+        started = time.perf_counter()
+        with shard_engine.connect() as conn:
+            count = store_all(conn, today)
+        print(f"shard {shard}: {count} users in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
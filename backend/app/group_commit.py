@@ -0,0 +1,142 @@
+"""Group commit for single-row creates (``POST /expenses``, ``POST /incomes``).
+
+Each create normally commits its own transaction, which costs one write-lock
+acquisition and one fsync per request. Under bursts on SQLite, writers
+queue on the lock and start hitting ``busy_timeout``.
+
+With ``GROUP_COMMIT_MS`` > 0 (off by default), the create handlers hand
+their row to a writer thread, one per shard and process, and wait. The
+writer takes the first waiting row and collects whatever else arrives within
+``GROUP_COMMIT_MS`` (up to ``GROUP_COMMIT_MAX_ROWS`` rows). It writes the
+whole group in one transaction:
+
+* one ``INSERT ... RETURNING`` per table,
+* one ``user_versions`` bump and one closed-month reopen per user,
+* one commit.
+
+Each waiting request then gets its row's id back, from an ``INSERT ...
+RETURNING`` ordered by parameter (on SQLite, SQLAlchemy runs it row by row,
+still inside the group's single transaction). If a group fails, its rows are
+retried one per transaction, so one bad row cannot fail the others; every
+waiter gets either its id or its row's error.
+
+Requests that send an ``Idempotency-Key`` keep the regular path, because the
+key must commit in the same transaction as the row.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+
+from sqlalchemy import insert
+
+from app.archive import DATE_FIELDS
+from app.cache import touch_user
+from app.database import SessionLocal
+from app.periods import reopen_periods
+
+GROUP_COMMIT_MS = float(os.getenv("GROUP_COMMIT_MS", "0"))
+GROUP_COMMIT_MAX_ROWS = int(os.getenv("GROUP_COMMIT_MAX_ROWS", "500"))
+
+log = logging.getLogger(__name__)
+
+
+def enabled() -> bool:
+    return GROUP_COMMIT_MS > 0
+
+
+def _insert_rows(db, model, rows) -> list:
+    """Insert ``rows``; returns their ids in order."""
+    return db.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), rows).all()
+
+
+class GroupCommitWriter:
+    def __init__(self, shard: int):
+        self.shard = shard
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"group-commit-{shard}", daemon=True)
+        self._thread.start()
+
+    def insert(self, model, values: dict) -> int:
+        """Queue one row and block until its group has committed; returns its id."""
+        future = Future()
+        self._queue.put((model, values, future))
+        return future.result()
+
+    def _collect(self):
+        group = [self._queue.get()]
+        deadline = time.monotonic() + GROUP_COMMIT_MS / 1000
+        while len(group) < GROUP_COMMIT_MAX_ROWS:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                group.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return group
+
+    def _write(self, group) -> list:
+        db = SessionLocal(info={"shard": self.shard})
+        try:
+            ids = [None] * len(group)
+            by_model = defaultdict(list)
+            for index, (model, _, _) in enumerate(group):
+                by_model[model].append(index)
+            for model, indexes in by_model.items():
+                new_ids = _insert_rows(db, model, [group[index][1] for index in indexes])
+                for index, new_id in zip(indexes, new_ids):
+                    ids[index] = new_id
+
+            days = defaultdict(set)
+            for model, values, _ in group:
+                days[values["user_id"]].add(values[DATE_FIELDS[model]])
+            for user_id, user_days in days.items():
+                # A late entry for a closed month invalidates that month's snapshot
+                reopen_periods(db, user_id, user_days)
+                touch_user(db, user_id)
+            db.commit()
+            return ids
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _run(self):
+        while True:
+            group = self._collect()
+            try:
+                ids = self._write(group)
+            except Exception:
+                log.exception("group commit of %d rows failed; retrying one by one", len(group))
+                for item in group:
+                    try:
+                        item[2].set_result(self._write([item])[0])
+                    except Exception as exc:
+                        item[2].set_exception(exc)
+                continue
+            for (_, _, future), new_id in zip(group, ids):
+                future.set_result(new_id)
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def writer_for(shard: int) -> GroupCommitWriter:
+    with _writers_lock:
+        if shard not in _writers:
+            _writers[shard] = GroupCommitWriter(shard)
+        return _writers[shard]
+
+
+def insert_row(db, model, values: dict) -> int:
+    """Insert one row through the group-commit writer of ``db``'s shard; returns its id."""
+    # Nothing of this request's own transaction is needed any more; don't
+    # hold it open while waiting for the group
+    db.rollback()
+    return writer_for(db.info.get("shard", 0)).insert(model, values)
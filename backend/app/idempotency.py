@@ -0,0 +1,122 @@
+"""``Idempotency-Key`` support for create endpoints.
+
+A client that may retry a create sends a unique ``Idempotency-Key`` header.
+The first request stores its response in ``idempotency_keys`` in the same
+transaction as the insert; a retry with the same key is answered from that
+row (header ``Idempotent-Replayed: true``) without touching the transaction
+tables.
+
+Concurrent duplicates are serialized by the ``(user_id, key)`` unique
+constraint: the loser's insert fails when the winner commits, its
+transaction (including the duplicate expense) is rolled back, and it
+replays the winner's stored response instead.
+
+Keys expire after ``IDEMPOTENCY_TTL_HOURS`` (default 24). Each process
+deletes expired rows at most every ``IDEMPOTENCY_PURGE_SECONDS`` as part of
+a write, using the ``expires_at`` index.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import IdempotencyKey
+
+IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_PURGE_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_SECONDS", "600"))
+MAX_KEY_LENGTH = 255
+PURGE_BATCH = 1000
+
+_last_purge = {}  # shard -> monotonic time of the last purge in this process
+_purge_lock = threading.Lock()
+
+
+class Fingerprint(NamedTuple):
+    endpoint: str  # e.g. "POST /expenses"; stored so app.rebalance can remap ids in the response
+    digest: str
+
+
+def request_fingerprint(endpoint: str, payload: BaseModel) -> Fingerprint:
+    """Hash of the endpoint and request body, to catch a key reused for a different request."""
+    body = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return Fingerprint(endpoint, hashlib.sha256(f"{endpoint}\n{body}".encode()).hexdigest())
+
+
+def find_response(db: Session, user_id: int, key: Optional[str], fingerprint: Fingerprint) -> Optional[JSONResponse]:
+    """The stored response for ``key``, or None if this is its first use."""
+    if not key:
+        return None
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key longer than {MAX_KEY_LENGTH} characters")
+    stored = db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id, IdempotencyKey.key == key
+    ).first()
+    if stored is None:
+        return None
+    if stored.expires_at <= datetime.utcnow():
+        # Expired but not purged yet: free the key for this request
+        db.delete(stored)
+        db.flush()
+        return None
+    if stored.fingerprint != fingerprint.digest:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    return JSONResponse(
+        status_code=stored.status_code,
+        content=json.loads(stored.response_body),
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def commit_with_key(db: Session, user_id: int, key: Optional[str], fingerprint: Fingerprint, response,
+                    status_code: int = 200):
+    """Commit the request's transaction, storing ``response`` under ``key``.
+
+    Returns ``response``, or the stored response of a concurrent request
+    with the same key that committed first.
+    """
+    if key:
+        now = datetime.utcnow()
+        db.add(IdempotencyKey(
+            user_id=user_id,
+            key=key,
+            endpoint=fingerprint.endpoint,
+            fingerprint=fingerprint.digest,
+            status_code=status_code,
+            response_body=json.dumps(jsonable_encoder(response)),
+            created_at=now,
+            expires_at=now + timedelta(hours=IDEMPOTENCY_TTL_HOURS),
+        ))
+        _maybe_purge(db, now)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        replay = find_response(db, user_id, key, fingerprint) if key else None
+        if replay is None:
+            raise
+        return replay
+    return response
+
+
+def _maybe_purge(db: Session, now: datetime):
+    shard = db.info.get("shard", 0)
+    with _purge_lock:
+        if time.monotonic() - _last_purge.get(shard, float("-inf")) < IDEMPOTENCY_PURGE_SECONDS:
+            return
+        _last_purge[shard] = time.monotonic()
+    expired = db.query(IdempotencyKey.id).filter(
+        IdempotencyKey.expires_at < now
+    ).order_by(IdempotencyKey.expires_at).limit(PURGE_BATCH)
+    db.query(IdempotencyKey).filter(IdempotencyKey.id.in_(expired.scalar_subquery())).delete(
+        synchronize_session=False
+    )
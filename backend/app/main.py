@@ -1,14 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from app.database import init_db
+from app.database import check_schema
+from app.compression import CompressionMiddleware
 from app.routes import auth, expenses, incomes, dashboard, settings
-from app.routes import plans
+from app.routes import plans, search, sync, events, analytics, household
 
-# Initialize database on startup
+# Verify the schema version on startup; migrations run as a separate step
 def startup():
-    init_db()
-    print("Database initialized successfully!")
+    version = check_schema()
+    print(f"Database schema at version {version}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -33,6 +34,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger JSON responses (brotli when available, otherwise gzip)
+app.add_middleware(CompressionMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(expenses.router)
@@ -40,6 +44,11 @@ app.include_router(incomes.router)
 app.include_router(dashboard.router)
 app.include_router(settings.router)
 app.include_router(plans.router)
+app.include_router(search.router)
+app.include_router(sync.router)
+app.include_router(events.router)
+app.include_router(analytics.router)
+app.include_router(household.router)
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,34 @@
+"""Apply pending schema migrations.
+
+Usage:
+    python -m app.migrate            # upgrade to the latest version
+    python -m app.migrate --status   # print current and latest version
+"""
+import sys
+
+from app import migrations
+from app.database import shard_engines
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # Every shard carries the full schema; shard 0 is DATABASE_URL
+    for index, shard_engine in enumerate(shard_engines):
+        label = f"shard {index}" if len(shard_engines) > 1 else "database"
+        if "--status" in argv:
+            with shard_engine.connect() as conn:
+                current = migrations.current_version(conn)
+            print(f"{label}: current {current}  head {migrations.head_version()}")
+            continue
+
+        applied = migrations.upgrade(shard_engine)
+        if applied:
+            for name in applied:
+                print(f"{label}: applied {name}")
+        else:
+            print(f"{label}: already up to date.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Versioned schema migrations.
+
+Every module in this package named ``vNNNN_<slug>.py`` is one migration and
+defines ``upgrade(conn)``. Migrations are applied in order by
+``python -m app.migrate`` and recorded in the ``schema_version`` table; the
+API itself only checks that the database is at the expected version on boot.
+"""
+import importlib
+import pkgutil
+from datetime import datetime
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+VERSION_TABLE = "schema_version"
+
+
+def discover() -> List[Tuple[int, str]]:
+    """Return ``(version, module_name)`` for every migration, in order."""
+    found = []
+    for info in pkgutil.iter_modules(__path__):
+        name = info.name
+        if not name.startswith("v") or "_" not in name:
+            continue
+        number = name[1:].split("_", 1)[0]
+        if number.isdigit():
+            found.append((int(number), name))
+    found.sort()
+    return found
+
+
+def head_version() -> int:
+    migrations = discover()
+    return migrations[-1][0] if migrations else 0
+
+
+def _ensure_version_table(conn: Connection):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ("
+        "version INTEGER PRIMARY KEY, "
+        "name VARCHAR NOT NULL, "
+        "applied_at TIMESTAMP NOT NULL)"
+    ))
+
+
+def current_version(conn: Connection) -> int:
+    """Highest applied migration, or 0 for a database that was never migrated."""
+    try:
+        value = conn.execute(text(f"SELECT MAX(version) FROM {VERSION_TABLE}")).scalar()
+    except Exception:
+        # Table does not exist yet; leave the connection usable on Postgres
+        conn.rollback()
+        return 0
+    return value or 0
+
+
+def upgrade(engine: Engine, target: int = None) -> List[str]:
+    """Apply every pending migration up to ``target`` (default: head).
+
+    Each migration runs in its own transaction together with its version row,
+    so an interrupted run can simply be restarted.
+    """
+    applied = []
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        version = current_version(conn)
+
+    for number, name in discover():
+        if number <= version or (target is not None and number > target):
+            continue
+        module = importlib.import_module(f"{__name__}.{name}")
+        with engine.begin() as conn:
+            module.upgrade(conn)
+            conn.execute(
+                text(f"INSERT INTO {VERSION_TABLE} (version, name, applied_at) VALUES (:v, :n, :t)"),
+                {"v": number, "n": name, "t": datetime.utcnow()},
+            )
+        applied.append(name)
+    return applied
+
+
+def check(engine: Engine) -> int:
+    """Verify the database is fully migrated. Raises RuntimeError otherwise.
+
+    This is a single ``SELECT MAX(version)`` so it is cheap enough to run on
+    every process start.
+    """
+    expected = head_version()
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if version != expected:
+        raise RuntimeError(
+            f"Database schema is at version {version}, expected {expected}. "
+            "Run `python -m app.migrate` before starting the API."
+        )
+    return version
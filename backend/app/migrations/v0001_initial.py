@@ -0,0 +1,79 @@
+"""Initial schema, as previously created by ``Base.metadata.create_all``.
+
+The tables are frozen here rather than taken from ``app.models`` so that later
+model changes do not rewrite history. ``checkfirst`` makes this a no-op for
+existing deployments that were bootstrapped with ``create_all``.
+"""
+from datetime import datetime
+
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, Float, ForeignKey, Integer, MetaData,
+    String, Table, Text,
+)
+
+metadata = MetaData()
+
+users = Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, index=True),
+    Column("email", String, unique=True, index=True),
+    Column("phone", String),
+    Column("password_hash", String),
+    Column("category", String),
+    Column("is_verified", Boolean, default=False),
+    Column("verification_token", String, nullable=True),
+    Column("verification_token_expiry", DateTime, nullable=True),
+    Column("profile_picture", String, nullable=True),
+    Column("default_avatar", String, nullable=True),
+    Column("created_at", DateTime, default=datetime.utcnow),
+)
+
+expenses = Table(
+    "expenses", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id")),
+    Column("category", String),
+    Column("amount", Float),
+    Column("currency", String, default="USD"),
+    Column("expense_date", Date),
+    Column("notes", Text, nullable=True),
+    Column("expense_type", String, default="additional"),
+    Column("created_at", DateTime, default=datetime.utcnow),
+)
+
+incomes = Table(
+    "incomes", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id")),
+    Column("source", String),
+    Column("amount", Float),
+    Column("currency", String, default="USD"),
+    Column("income_date", Date),
+    Column("notes", Text, nullable=True),
+    Column("created_at", DateTime, default=datetime.utcnow),
+)
+
+settings = Table(
+    "settings", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), unique=True),
+    Column("currency", String, default="USD"),
+    Column("usd_to_inr_rate", Float, default=81.0),
+    Column("created_at", DateTime, default=datetime.utcnow),
+)
+
+saving_plans = Table(
+    "saving_plans", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id")),
+    Column("category", String),
+    Column("amount", Float),
+    Column("month", Integer),
+    Column("year", Integer),
+    Column("created_at", DateTime, default=datetime.utcnow),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
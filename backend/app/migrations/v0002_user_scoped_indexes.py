@@ -0,0 +1,19 @@
+"""Composite indexes for the per-user queries issued by every router.
+
+All list and dashboard queries filter on ``user_id`` first and then on a date
+or period, so ``(user_id, <date>)`` lets them seek straight to one user's rows
+instead of scanning the whole table.
+"""
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_expenses_user_date ON expenses (user_id, expense_date)"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_incomes_user_date ON incomes (user_id, income_date)"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_saving_plans_user_period ON saving_plans (user_id, year, month)"
+    ))
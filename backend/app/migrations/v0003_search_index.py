@@ -0,0 +1,98 @@
+"""Full-text search index over expense category/notes and income source/notes.
+
+SQLite: one FTS5 table, ``transactions_fts``, kept in sync by triggers.
+Its rowid encodes the source row as ``id * 2`` (expense) or ``id * 2 + 1``
+(income). The owner is stored as a ``u<user_id>`` token, so per-user
+filtering is part of the index lookup.
+
+Postgres: a generated ``search_vector`` column with a GIN index on each
+table. Postgres keeps it up to date by itself.
+"""
+from sqlalchemy import text
+
+SQLITE_STATEMENTS = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+        owner, title, notes,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    # Expenses
+    """
+    CREATE TRIGGER IF NOT EXISTS expenses_fts_ai AFTER INSERT ON expenses BEGIN
+        INSERT INTO transactions_fts (rowid, owner, title, notes)
+        VALUES (new.id * 2, 'u' || new.user_id, coalesce(new.category, ''), coalesce(new.notes, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS expenses_fts_ad AFTER DELETE ON expenses BEGIN
+        DELETE FROM transactions_fts WHERE rowid = old.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS expenses_fts_au AFTER UPDATE OF user_id, category, notes ON expenses BEGIN
+        DELETE FROM transactions_fts WHERE rowid = old.id * 2;
+        INSERT INTO transactions_fts (rowid, owner, title, notes)
+        VALUES (new.id * 2, 'u' || new.user_id, coalesce(new.category, ''), coalesce(new.notes, ''));
+    END
+    """,
+    # Incomes
+    """
+    CREATE TRIGGER IF NOT EXISTS incomes_fts_ai AFTER INSERT ON incomes BEGIN
+        INSERT INTO transactions_fts (rowid, owner, title, notes)
+        VALUES (new.id * 2 + 1, 'u' || new.user_id, coalesce(new.source, ''), coalesce(new.notes, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS incomes_fts_ad AFTER DELETE ON incomes BEGIN
+        DELETE FROM transactions_fts WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS incomes_fts_au AFTER UPDATE OF user_id, source, notes ON incomes BEGIN
+        DELETE FROM transactions_fts WHERE rowid = old.id * 2 + 1;
+        INSERT INTO transactions_fts (rowid, owner, title, notes)
+        VALUES (new.id * 2 + 1, 'u' || new.user_id, coalesce(new.source, ''), coalesce(new.notes, ''));
+    END
+    """,
+    # Backfill rows that existed before the index
+    """
+    INSERT INTO transactions_fts (rowid, owner, title, notes)
+    SELECT id * 2, 'u' || user_id, coalesce(category, ''), coalesce(notes, '') FROM expenses
+    """,
+    """
+    INSERT INTO transactions_fts (rowid, owner, title, notes)
+    SELECT id * 2 + 1, 'u' || user_id, coalesce(source, ''), coalesce(notes, '') FROM incomes
+    """,
+]
+
+POSTGRES_STATEMENTS = [
+    """
+    ALTER TABLE expenses ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(category, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(notes, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_expenses_search ON expenses USING GIN (search_vector)",
+    """
+    ALTER TABLE incomes ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(source, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(notes, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_incomes_search ON incomes USING GIN (search_vector)",
+]
+
+
+def upgrade(conn):
+    if conn.dialect.name == "sqlite":
+        statements = SQLITE_STATEMENTS
+    elif conn.dialect.name == "postgresql":
+        statements = POSTGRES_STATEMENTS
+    else:
+        return
+    for statement in statements:
+        conn.execute(text(statement))
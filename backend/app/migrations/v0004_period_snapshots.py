@@ -0,0 +1,40 @@
+"""Closed-period markers and frozen monthly totals (see ``app.periods``)."""
+from datetime import datetime
+
+from sqlalchemy import (
+    Column, DateTime, Float, ForeignKey, Index, Integer, MetaData, String,
+    Table, UniqueConstraint,
+)
+
+metadata = MetaData()
+
+# Referenced by the foreign keys below; already exists, never created here
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+closed_periods = Table(
+    "closed_periods", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id")),
+    Column("year", Integer),
+    Column("month", Integer),
+    Column("closed_at", DateTime, default=datetime.utcnow),
+    UniqueConstraint("user_id", "year", "month", name="uq_closed_periods_user_period"),
+)
+
+period_snapshots = Table(
+    "period_snapshots", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id")),
+    Column("year", Integer),
+    Column("month", Integer),
+    Column("kind", String),
+    Column("currency", String),
+    Column("category", String, nullable=True),
+    Column("total", Float),
+    Column("count", Integer),
+    Index("ix_period_snapshots_user_period", "user_id", "year", "month"),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, tables=[closed_periods, period_snapshots], checkfirst=True)
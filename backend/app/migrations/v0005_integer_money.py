@@ -0,0 +1,64 @@
+"""Store money as integer minor units instead of floats.
+
+Adds ``amount_minor`` (BIGINT) to expenses, incomes and saving_plans,
+backfills it from the float ``amount`` rounded to each currency's minor unit
+the way ``currency_utils.to_minor`` does (shortest decimal form of the
+float, then half up), then drops ``amount``. Closed-period snapshots are a cache, so they are
+cleared and rebuilt on the next read with ``total_minor``.
+
+Exponents are frozen here on purpose; later edits to
+``currency_utils.CURRENCY_EXPONENTS`` need their own migration.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from sqlalchemy import text
+
+EXPONENTS = {"USD": 2, "INR": 2}
+DEFAULT_EXPONENT = 2
+
+
+def _scale_case(currency_column):
+    if currency_column is None:
+        return str(10 ** DEFAULT_EXPONENT)
+    whens = " ".join(
+        f"WHEN '{code}' THEN {10 ** exponent}" for code, exponent in sorted(EXPONENTS.items())
+    )
+    return f"CASE {currency_column} {whens} ELSE {10 ** DEFAULT_EXPONENT} END"
+
+
+def _to_minor(amount, currency):
+    exponent = EXPONENTS.get(currency, DEFAULT_EXPONENT)
+    return int(Decimal(str(amount)).scaleb(exponent).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def _backfill_sqlite(conn, table, currency_column):
+    # SQLite's ROUND() works on the binary double, so 2.675 (stored as
+    # 2.67499...) would become 267; convert in Python as to_minor does
+    currency = currency_column or "NULL"
+    rows = conn.execute(text(f"SELECT id, amount, {currency} FROM {table} WHERE amount IS NOT NULL")).all()
+    if rows:
+        conn.execute(
+            text(f"UPDATE {table} SET amount_minor = :minor WHERE id = :id"),
+            [{"id": row_id, "minor": _to_minor(amount, code)} for row_id, amount, code in rows],
+        )
+
+
+def upgrade(conn):
+    for table, currency_column in [("expenses", "currency"), ("incomes", "currency"), ("saving_plans", None)]:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN amount_minor BIGINT"))
+        if conn.dialect.name == "sqlite":
+            _backfill_sqlite(conn, table, currency_column)
+        else:
+            # ROUND() is only half away from zero on numeric, not on double
+            # precision; the cast keeps the float's 15 significant digits,
+            # the same decimal as str() for any amount with cents
+            conn.execute(text(
+                f"UPDATE {table} SET amount_minor = "
+                f"CAST(ROUND(CAST(amount AS NUMERIC) * {_scale_case(currency_column)}) AS BIGINT)"
+            ))
+        conn.execute(text(f"ALTER TABLE {table} DROP COLUMN amount"))
+
+    conn.execute(text("DELETE FROM period_snapshots"))
+    conn.execute(text("DELETE FROM closed_periods"))
+    conn.execute(text("ALTER TABLE period_snapshots DROP COLUMN total"))
+    conn.execute(text("ALTER TABLE period_snapshots ADD COLUMN total_minor BIGINT"))
@@ -0,0 +1,19 @@
+"""Per-user data versions used to invalidate caches across worker processes."""
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer, MetaData, Table
+
+metadata = MetaData()
+
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+user_versions = Table(
+    "user_versions", metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("version", BigInteger, nullable=False, default=0),
+    Column("updated_at", DateTime, default=datetime.utcnow),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, tables=[user_versions], checkfirst=True)
@@ -0,0 +1,35 @@
+"""Global shard directory (email -> user id -> shard).
+
+Existing users are registered on shard 0 with their current ids. The table
+is created on every shard so all shards share one schema, but only the
+primary's copy is used.
+"""
+from datetime import datetime
+
+from sqlalchemy import Boolean, Column, DateTime, Integer, MetaData, String, Table, text
+
+metadata = MetaData()
+
+shard_directory = Table(
+    "shard_directory", metadata,
+    Column("user_id", Integer, primary_key=True, autoincrement=True),
+    Column("email", String, unique=True, index=True, nullable=False),
+    Column("shard", Integer, nullable=False, default=0),
+    Column("moving", Boolean, nullable=False, default=False),
+    Column("created_at", DateTime, default=datetime.utcnow),
+    sqlite_autoincrement=True,
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, tables=[shard_directory], checkfirst=True)
+    conn.execute(text(
+        "INSERT INTO shard_directory (user_id, email, shard, moving, created_at) "
+        "SELECT id, email, 0, :false, created_at FROM users WHERE email IS NOT NULL"
+    ), {"false": False})
+    if conn.dialect.name == "postgresql":
+        # Continue allocating after the backfilled ids
+        conn.execute(text(
+            "SELECT setval(pg_get_serial_sequence('shard_directory', 'user_id'), "
+            "COALESCE((SELECT MAX(user_id) FROM shard_directory), 0) + 1, false)"
+        ))
@@ -0,0 +1,47 @@
+"""Change tracking for delta sync.
+
+Adds ``updated_at`` (backfilled from ``created_at``) and a nullable
+``deleted_at`` tombstone to expenses, incomes and saving_plans, with a
+``(user_id, updated_at)`` index per table for ``GET /sync``.
+
+On SQLite the search triggers are recreated so soft-deleted rows leave
+``transactions_fts``; Postgres search filters on ``deleted_at`` instead.
+"""
+from sqlalchemy import text
+
+TABLES = ["expenses", "incomes", "saving_plans"]
+
+SQLITE_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS expenses_fts_au",
+    """
+    CREATE TRIGGER expenses_fts_au AFTER UPDATE OF user_id, category, notes, deleted_at ON expenses BEGIN
+        DELETE FROM transactions_fts WHERE rowid = old.id * 2;
+        INSERT INTO transactions_fts (rowid, owner, title, notes)
+        SELECT new.id * 2, 'u' || new.user_id, coalesce(new.category, ''), coalesce(new.notes, '')
+        WHERE new.deleted_at IS NULL;
+    END
+    """,
+    "DROP TRIGGER IF EXISTS incomes_fts_au",
+    """
+    CREATE TRIGGER incomes_fts_au AFTER UPDATE OF user_id, source, notes, deleted_at ON incomes BEGIN
+        DELETE FROM transactions_fts WHERE rowid = old.id * 2 + 1;
+        INSERT INTO transactions_fts (rowid, owner, title, notes)
+        SELECT new.id * 2 + 1, 'u' || new.user_id, coalesce(new.source, ''), coalesce(new.notes, '')
+        WHERE new.deleted_at IS NULL;
+    END
+    """,
+]
+
+
+def upgrade(conn):
+    timestamp = "TIMESTAMP" if conn.dialect.name == "postgresql" else "DATETIME"
+    for table in TABLES:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN updated_at {timestamp}"))
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN deleted_at {timestamp}"))
+        conn.execute(text(f"UPDATE {table} SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)"))
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_user_updated ON {table} (user_id, updated_at)"
+        ))
+    if conn.dialect.name == "sqlite":
+        for statement in SQLITE_TRIGGERS:
+            conn.execute(text(statement))
@@ -0,0 +1,30 @@
+"""Stored responses for ``Idempotency-Key`` retries (see ``app.idempotency``)."""
+from datetime import datetime
+
+from sqlalchemy import (
+    Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, Text,
+    UniqueConstraint,
+)
+
+metadata = MetaData()
+
+# Referenced by the foreign key below; already exists, never created here
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+idempotency_keys = Table(
+    "idempotency_keys", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("key", String(255), nullable=False),
+    Column("fingerprint", String(64), nullable=False),
+    Column("status_code", Integer, nullable=False),
+    Column("response_body", Text, nullable=False),
+    Column("created_at", DateTime, default=datetime.utcnow),
+    Column("expires_at", DateTime, nullable=False),
+    UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_key"),
+    Index("ix_idempotency_keys_expires", "expires_at"),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, tables=[idempotency_keys], checkfirst=True)
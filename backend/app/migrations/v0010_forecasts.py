@@ -0,0 +1,22 @@
+"""Nightly month-end forecasts (see ``app.forecast``)."""
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, Date, DateTime, ForeignKey, Integer, MetaData, Table, Text
+
+metadata = MetaData()
+
+# Referenced by the foreign key below; already exists, never created here
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+forecasts = Table(
+    "forecasts", metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("as_of", Date, nullable=False),
+    Column("version", BigInteger, nullable=False),
+    Column("payload", Text, nullable=False),
+    Column("computed_at", DateTime, default=datetime.utcnow),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, tables=[forecasts], checkfirst=True)
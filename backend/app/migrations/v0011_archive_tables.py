@@ -0,0 +1,53 @@
+"""Cold archive tables for old expenses and incomes (see ``app.archive``)."""
+from datetime import datetime
+
+from sqlalchemy import (
+    BigInteger, Column, Date, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, Text,
+)
+
+metadata = MetaData()
+
+# Referenced by the foreign keys below; already exists, never created here
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+expenses_archive = Table(
+    "expenses_archive", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("user_id", Integer, ForeignKey("users.id")),
+    Column("category", String),
+    Column("amount_minor", BigInteger),
+    Column("currency", String),
+    Column("expense_date", Date),
+    Column("notes", Text, nullable=True),
+    Column("expense_type", String),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    Column("deleted_at", DateTime, nullable=True),
+    Index("ix_expenses_archive_user_date", "user_id", "expense_date"),
+)
+
+incomes_archive = Table(
+    "incomes_archive", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("user_id", Integer, ForeignKey("users.id")),
+    Column("source", String),
+    Column("amount_minor", BigInteger),
+    Column("currency", String),
+    Column("income_date", Date),
+    Column("notes", Text, nullable=True),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    Column("deleted_at", DateTime, nullable=True),
+    Index("ix_incomes_archive_user_date", "user_id", "income_date"),
+)
+
+archive_horizons = Table(
+    "archive_horizons", metadata,
+    Column("table_name", String, primary_key=True),
+    Column("archived_before", Date, nullable=False),
+    Column("updated_at", DateTime, default=datetime.utcnow),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, tables=[expenses_archive, incomes_archive, archive_horizons], checkfirst=True)
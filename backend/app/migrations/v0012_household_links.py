@@ -0,0 +1,20 @@
+"""Linked accounts for the household dashboard (``GET /dashboard/household``)."""
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, Table
+
+metadata = MetaData()
+
+# Referenced by the foreign keys below; already exists, never created here
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+household_links = Table(
+    "household_links", metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("partner_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("created_at", DateTime, default=datetime.utcnow),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, tables=[household_links], checkfirst=True)
@@ -0,0 +1,73 @@
+"""Keep archived expenses and incomes searchable.
+
+SQLite: an archived row keeps its ``transactions_fts`` entry (same rowid,
+since rows keep their id). Moving a row between ``expenses`` and
+``expenses_archive`` inserts into one table and deletes from the other, so
+every search trigger on either table skips the index when the row still
+exists on the other side. Only inserting a brand-new row or deleting a row
+for good touches the index. Rows archived before this migration lost their
+entry and are indexed again.
+
+Postgres: the archive tables get the same generated ``search_vector``
+column and GIN index as the hot tables.
+"""
+from sqlalchemy import text
+
+# (hot table, archive table, rowid expression, title column)
+TABLES = [
+    ("expenses", "expenses_archive", "id * 2", "category"),
+    ("incomes", "incomes_archive", "id * 2 + 1", "source"),
+]
+
+
+def _sqlite_statements(hot, archive, rowid, title):
+    new_rowid = rowid.replace("id", "new.id", 1)
+    old_rowid = rowid.replace("id", "old.id", 1)
+    statements = [f"DROP TRIGGER IF EXISTS {hot}_fts_ai", f"DROP TRIGGER IF EXISTS {hot}_fts_ad"]
+    for table, other in ((hot, archive), (archive, hot)):
+        statements += [
+            f"""
+            CREATE TRIGGER {table}_fts_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO transactions_fts (rowid, owner, title, notes)
+                SELECT {new_rowid}, 'u' || new.user_id, coalesce(new.{title}, ''), coalesce(new.notes, '')
+                WHERE new.deleted_at IS NULL AND NOT EXISTS (SELECT 1 FROM {other} WHERE id = new.id);
+            END
+            """,
+            f"""
+            CREATE TRIGGER {table}_fts_ad AFTER DELETE ON {table} BEGIN
+                DELETE FROM transactions_fts
+                WHERE rowid = {old_rowid} AND NOT EXISTS (SELECT 1 FROM {other} WHERE id = old.id);
+            END
+            """,
+        ]
+    statements.append(f"""
+        INSERT INTO transactions_fts (rowid, owner, title, notes)
+        SELECT {rowid}, 'u' || user_id, coalesce({title}, ''), coalesce(notes, '') FROM {archive}
+        WHERE deleted_at IS NULL
+    """)
+    return statements
+
+
+def _postgres_statements(hot, archive, rowid, title):
+    return [
+        f"""
+        ALTER TABLE {archive} ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce({title}, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(notes, '')), 'B')
+        ) STORED
+        """,
+        f"CREATE INDEX IF NOT EXISTS ix_{archive}_search ON {archive} USING GIN (search_vector)",
+    ]
+
+
+def upgrade(conn):
+    if conn.dialect.name == "sqlite":
+        build = _sqlite_statements
+    elif conn.dialect.name == "postgresql":
+        build = _postgres_statements
+    else:
+        return
+    for table in TABLES:
+        for statement in build(*table):
+            conn.execute(text(statement))
@@ -0,0 +1,9 @@
+"""``user_versions.resync_before``: ``/sync`` cursors older than it get a full
+resync. Set when a user's deletions leave no tombstones behind (archived rows
+removed by ``DELETE /auth/data``)."""
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    timestamp = "TIMESTAMP" if conn.dialect.name == "postgresql" else "DATETIME"
+    conn.execute(text(f"ALTER TABLE user_versions ADD COLUMN resync_before {timestamp}"))
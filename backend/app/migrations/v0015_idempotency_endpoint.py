@@ -0,0 +1,10 @@
+"""``idempotency_keys.endpoint``: which create endpoint stored the response.
+
+``app.rebalance`` needs it to rewrite the ids in a stored response when the
+user's rows are renumbered on another shard.
+"""
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    conn.execute(text("ALTER TABLE idempotency_keys ADD COLUMN endpoint VARCHAR"))
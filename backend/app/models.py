@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Index, UniqueConstraint, Column, Integer, BigInteger, String, Float, Date, DateTime, Boolean, ForeignKey, Text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
+from app.currency_utils import from_minor
 
 class User(Base):
     __tablename__ = "users"
@@ -29,29 +30,99 @@ class Expense(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     category = Column(String)
-    amount = Column(Float)
+    amount_minor = Column(BigInteger)  # Integer minor units (cents/paise) of `currency`
     currency = Column(String, default="USD")  # Currency this expense was entered in
     expense_date = Column(Date)
     notes = Column(Text, nullable=True)
     expense_type = Column(String, default="additional")  # regular or additional
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    deleted_at = Column(DateTime, nullable=True)  # Tombstone, see /sync
     
     owner = relationship("User", back_populates="expenses")
 
+    @property
+    def amount(self) -> float:
+        return from_minor(self.amount_minor, self.currency)
+
+    __table_args__ = (Index("ix_expenses_user_date", "user_id", "expense_date"),
+                      Index("ix_expenses_user_updated", "user_id", "updated_at"))
+
 class Income(Base):
     __tablename__ = "incomes"
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     source = Column(String)
-    amount = Column(Float)
+    amount_minor = Column(BigInteger)  # Integer minor units (cents/paise) of `currency`
     currency = Column(String, default="USD")  # Currency this income was entered in
     income_date = Column(Date)
     notes = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    deleted_at = Column(DateTime, nullable=True)  # Tombstone, see /sync
     
     owner = relationship("User", back_populates="incomes")
 
+    @property
+    def amount(self) -> float:
+        return from_minor(self.amount_minor, self.currency)
+
+    __table_args__ = (Index("ix_incomes_user_date", "user_id", "income_date"),
+                      Index("ix_incomes_user_updated", "user_id", "updated_at"))
+
+class ExpenseArchive(Base):
+    """Expenses older than the archive horizon, moved out of ``expenses`` by
+    ``python -m app.archive``. Rows keep their id; see app.archive."""
+    __tablename__ = "expenses_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    category = Column(String)
+    amount_minor = Column(BigInteger)
+    currency = Column(String, default="USD")
+    expense_date = Column(Date)
+    notes = Column(Text, nullable=True)
+    expense_type = Column(String, default="additional")
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    deleted_at = Column(DateTime, nullable=True)
+
+    @property
+    def amount(self) -> float:
+        return from_minor(self.amount_minor, self.currency)
+
+    __table_args__ = (Index("ix_expenses_archive_user_date", "user_id", "expense_date"),)
+
+class IncomeArchive(Base):
+    """Incomes older than the archive horizon (see ExpenseArchive)."""
+    __tablename__ = "incomes_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    source = Column(String)
+    amount_minor = Column(BigInteger)
+    currency = Column(String, default="USD")
+    income_date = Column(Date)
+    notes = Column(Text, nullable=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    deleted_at = Column(DateTime, nullable=True)
+
+    @property
+    def amount(self) -> float:
+        return from_minor(self.amount_minor, self.currency)
+
+    __table_args__ = (Index("ix_incomes_archive_user_date", "user_id", "income_date"),)
+
+class ArchiveHorizon(Base):
+    """Per hot table, the date every archived row is older than."""
+    __tablename__ = "archive_horizons"
+
+    table_name = Column(String, primary_key=True)
+    archived_before = Column(Date, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
 class Settings(Base):
     __tablename__ = "settings"
 
@@ -69,8 +140,111 @@ class SavingPlan(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     category = Column(String)
-    amount = Column(Float)
+    amount_minor = Column(BigInteger)  # Integer minor units (plans carry no currency)
+    month = Column(Integer)  # 1-12
+    year = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    deleted_at = Column(DateTime, nullable=True)  # Tombstone, see /sync
+
+    @property
+    def amount(self) -> float:
+        return from_minor(self.amount_minor)
+
+    __table_args__ = (Index("ix_saving_plans_user_period", "user_id", "year", "month"),
+                      Index("ix_saving_plans_user_updated", "user_id", "updated_at"))
+
+class ClosedPeriod(Base):
+    """Marks a user's calendar month as closed; its totals live in PeriodSnapshot."""
+    __tablename__ = "closed_periods"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    year = Column(Integer)
     month = Column(Integer)  # 1-12
+    closed_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint("user_id", "year", "month", name="uq_closed_periods_user_period"),)
+
+class PeriodSnapshot(Base):
+    """Frozen per-currency, per-category totals of a closed month."""
+    __tablename__ = "period_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
     year = Column(Integer)
+    month = Column(Integer)  # 1-12
+    kind = Column(String)  # expense or income
+    currency = Column(String)
+    category = Column(String, nullable=True)  # expense category or income source
+    total_minor = Column(BigInteger)  # Integer minor units of `currency`
+    count = Column(Integer)
+
+    __table_args__ = (Index("ix_period_snapshots_user_period", "user_id", "year", "month"),)
+
+class UserVersion(Base):
+    """Per-user data version, bumped in the same transaction as every write.
+
+    It is the cross-process invalidation channel for per-user caches: any
+    worker can tell whether its cached value is stale by comparing versions.
+    """
+    __tablename__ = "user_versions"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    resync_before = Column(DateTime, nullable=True)  # older /sync cursors get a full resync
+
+class IdempotencyKey(Base):
+    """Stored response of a create request, replayed for retries with the same key."""
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    key = Column(String(255), nullable=False)  # Idempotency-Key header
+    endpoint = Column(String, nullable=True)  # e.g. "POST /expenses"; NULL for keys stored before v0015
+    fingerprint = Column(String(64), nullable=False)  # sha256 of endpoint + request body
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_key"),
+                      Index("ix_idempotency_keys_expires", "expires_at"))
+
+class Forecast(Base):
+    """Month-end forecast precomputed by the nightly ``python -m app.forecast`` run."""
+    __tablename__ = "forecasts"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    as_of = Column(Date, nullable=False)  # Day the forecast was made for
+    version = Column(BigInteger, nullable=False)  # user_versions.version it was computed at
+    payload = Column(Text, nullable=False)  # DashboardForecast JSON
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+class HouseholdLink(Base):
+    """Two linked accounts (a Mocha/Milky pair) share a household dashboard.
+
+    Stored once per direction, so either member finds their partner by
+    primary key. Both members must live on the same shard.
+    """
+    __tablename__ = "household_links"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    partner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ShardDirectory(Base):
+    """Global email -> user id -> shard map. Lives on the primary only.
+
+    User ids are allocated here so they are unique across all shards.
+    """
+    __tablename__ = "shard_directory"
+
+    user_id = Column(Integer, primary_key=True, autoincrement=True)
+    email = Column(String, unique=True, index=True, nullable=False)
+    shard = Column(Integer, nullable=False, default=0)
+    moving = Column(Boolean, nullable=False, default=False)  # Set while being rebalanced
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = {"sqlite_autoincrement": True}
@@ -0,0 +1,190 @@
+"""Calendar period helpers and closed-month snapshots.
+
+Once a month has ended its transactions rarely change, so the first read of
+a past month freezes its totals (per kind, currency and category) into
+``period_snapshots`` and marks it in ``closed_periods``. Later reads of that
+month are served from the snapshot instead of rescanning transactions.
+
+Any write dated inside a closed month calls :func:`reopen_period`, which
+drops just that month's snapshot; the next read recomputes it.
+
+A write can commit while a read is still scanning the month. Its reopen
+then finds no snapshot to drop, and the read must not store totals that
+miss the write. So the close takes the user's ``user_versions`` version
+from before the scan (the one the request's caches validate against). It
+stores the snapshot only if the version is still the same, checked under a
+row lock that every reopen also takes.
+
+The snapshot lookup may use a read replica, but the scan and the close
+always run on the primary: a lagging replica could otherwise miss a write
+whose version the guard has already seen, and freeze stale totals.
+"""
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.archive import ARCHIVES, DATE_FIELDS, may_be_archived
+from app.cache import current_version
+from app.database import SessionLocal
+from app.models import ClosedPeriod, Expense, Income, PeriodSnapshot, UserVersion
+
+
+def month_bounds(year: int, month: int) -> Tuple[date, date]:
+    """Half-open ``[start, end)`` date range covering one calendar month.
+
+    Range predicates on the date column can use the ``(user_id, <date>)``
+    indexes, unlike ``LIKE 'YYYY-MM%'``.
+    """
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def is_past_month(year: int, month: int, today: Optional[date] = None) -> bool:
+    today = today or datetime.utcnow().date()
+    return (year, month) < (today.year, today.month)
+
+
+def _scan_month(db: Session, user_id: int, year: int, month: int):
+    """Grouped totals straight from the transaction tables, plus the archive
+    tables for months before the archive horizon."""
+    start, end = month_bounds(year, month)
+    totals = {}
+    for kind, model, label in (("expense", Expense, "category"), ("income", Income, "source")):
+        date_field = DATE_FIELDS[model]
+        sources = [model] + ([ARCHIVES[model]] if may_be_archived(db, model, start) else [])
+        for source in sources:
+            date_column = getattr(source, date_field)
+            rows = db.query(
+                source.currency, getattr(source, label), func.sum(source.amount_minor), func.count()
+            ).filter(
+                source.user_id == user_id, source.deleted_at.is_(None),
+                date_column >= start, date_column < end
+            ).group_by(source.currency, getattr(source, label))
+            for currency, category, total, count in rows:
+                entry = totals.setdefault((kind, currency, category), [0, 0])
+                entry[0] += int(total or 0)
+                entry[1] += count
+    return [(*key, total, count) for key, (total, count) in totals.items()]
+
+
+def _lock_version(db: Session, user_id: int) -> int:
+    """The user's data version, read under a row lock held until commit."""
+    # FOR UPDATE is a no-op on SQLite, where writers are serialized anyway
+    return db.execute(
+        select(UserVersion.version).where(UserVersion.user_id == user_id).with_for_update()
+    ).scalar() or 0
+
+
+def _close_month(db: Session, user_id: int, year: int, month: int, rows, version: int):
+    """Store the snapshot unless the user's data changed since ``version``."""
+    try:
+        # Insert first: on SQLite this takes the write lock, so the version
+        # read below is current; on Postgres the row lock then waits for
+        # any writer that is reopening this user's months
+        db.add(ClosedPeriod(user_id=user_id, year=year, month=month))
+        db.flush()
+        if _lock_version(db, user_id) != version:
+            # A write got in after the scan; the next read closes the month
+            db.rollback()
+            return
+        if rows:
+            # One executemany instead of an INSERT ... RETURNING per category
+            db.execute(PeriodSnapshot.__table__.insert(), [
+                dict(user_id=user_id, year=year, month=month, kind=kind, currency=currency,
+                     category=category, total_minor=int(total or 0), count=count)
+                for kind, currency, category, total, count in rows
+            ])
+        db.commit()
+    except IntegrityError:
+        # Another request closed the same month concurrently; its snapshot
+        # has the same contents
+        db.rollback()
+
+
+@contextmanager
+def _primary_session(db: Session):
+    """``db`` itself, or a primary session on the same shard if ``db`` is
+    read-only (``get_read_db``)."""
+    if not db.info.get("read_only"):
+        yield db
+        return
+    primary = SessionLocal(info={"shard": db.info.get("shard", 0)})
+    try:
+        yield primary
+    finally:
+        primary.close()
+
+
+def closed_month_rows(db: Session, user_id: int, year: int, month: int):
+    """``(kind, currency, category, total_minor, count)`` rows for a past month,
+    served from its snapshot, which is taken on first access."""
+    snapshot = db.query(
+        ClosedPeriod.id, PeriodSnapshot.kind, PeriodSnapshot.currency,
+        PeriodSnapshot.category, PeriodSnapshot.total_minor, PeriodSnapshot.count
+    ).outerjoin(PeriodSnapshot, and_(
+        PeriodSnapshot.user_id == ClosedPeriod.user_id,
+        PeriodSnapshot.year == ClosedPeriod.year,
+        PeriodSnapshot.month == ClosedPeriod.month,
+    )).filter(
+        ClosedPeriod.user_id == user_id, ClosedPeriod.year == year, ClosedPeriod.month == month
+    ).all()
+    if snapshot:
+        # A closed month without transactions has one row of NULLs
+        return [tuple(row[1:]) for row in snapshot if row.kind is not None]
+
+    version = current_version(db, user_id)
+    with _primary_session(db) as primary:
+        rows = _scan_month(primary, user_id, year, month)
+        _close_month(primary, user_id, year, month, rows, version)
+    return rows
+
+
+def closed_month_totals(db: Session, user_id: int, year: int, month: int):
+    """Per-currency minor-unit totals of a past month:
+    ``{"expense": {currency: minor}, "income": {...}}``."""
+    totals = {"expense": {}, "income": {}}
+    for kind, currency, _category, total, _count in closed_month_rows(db, user_id, year, month):
+        totals[kind][currency] = totals[kind].get(currency, 0) + int(total or 0)
+    return totals
+
+
+def reopen_period(db: Session, user_id: int, day: date):
+    """Discard the snapshot of the month containing ``day`` if it was closed.
+
+    Call this before committing any insert, update or delete of a
+    transaction dated ``day``, and before :func:`app.cache.touch_user`. It
+    is a no-op for the current month.
+    """
+    if day is None or not is_past_month(day.year, day.month):
+        return
+    _lock_version(db, user_id)
+    for model in (PeriodSnapshot, ClosedPeriod):
+        db.query(model).filter(
+            model.user_id == user_id, model.year == day.year, model.month == day.month
+        ).delete(synchronize_session=False)
+
+
+def reopen_periods(db: Session, user_id: int, days):
+    """:func:`reopen_period` for many days at once, one DELETE per table."""
+    months = {(day.year, day.month) for day in days if day is not None}
+    months = [(year, month) for year, month in months if is_past_month(year, month)]
+    if not months:
+        return
+    _lock_version(db, user_id)
+    for model in (PeriodSnapshot, ClosedPeriod):
+        db.query(model).filter(
+            model.user_id == user_id,
+            or_(*[and_(model.year == year, model.month == month) for year, month in months])
+        ).delete(synchronize_session=False)
+
+
+def reopen_all(db: Session, user_id: int):
+    """Discard every snapshot of a user (e.g. after deleting all their data)."""
+    _lock_version(db, user_id)
+    for model in (PeriodSnapshot, ClosedPeriod):
+        db.query(model).filter(model.user_id == user_id).delete(synchronize_session=False)
@@ -0,0 +1,43 @@
+"""Sparse fieldsets (``?fields=a,b,c``) for list endpoints."""
+from typing import List, Optional, Sequence
+
+from fastapi import HTTPException
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> Optional[List[str]]:
+    """Parse a comma separated ``fields`` parameter.
+
+    Returns ``None`` when no projection was requested, otherwise the requested
+    field names in the order given (duplicates removed). Unknown names are
+    rejected with a 400 rather than silently ignored.
+    """
+    if not fields:
+        return None
+    requested = []
+    for name in fields.split(","):
+        name = name.strip()
+        if name and name not in requested:
+            requested.append(name)
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}"
+        )
+    if not requested:
+        return None
+    return requested
+
+
+def select_columns(model, requested: List[str], required: Sequence[str] = (), column_map: dict = None):
+    """Columns to SELECT for ``requested`` plus any ``required`` helper columns.
+
+    ``column_map`` maps response field names to the column that backs them
+    when the two differ (e.g. ``amount`` -> ``amount_minor``).
+    """
+    column_map = column_map or {}
+    names = list(requested)
+    for name in required:
+        if name not in names:
+            names.append(name)
+    return names, [column_map.get(name, getattr(model, name, None)) for name in names]
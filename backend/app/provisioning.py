@@ -0,0 +1,143 @@
+"""Creating users, for ``POST /auth/signup`` and ``POST /auth/users/bulk``.
+
+A new user is a ``shard_directory`` entry (which allocates the id), a
+``users`` row and a ``settings`` row, committed together. With sharding the
+directory entry lives on the primary and the other two on the user's shard,
+so those commit separately, as with any cross-shard write.
+
+Bulk provisioning hashes every password up front on a process pool
+(:func:`app.security.hash_passwords`), then writes users in batches of
+``BULK_USERS_BATCH_SIZE``. Each batch takes one executemany ``INSERT`` per
+table, one ``SELECT`` of the allocated ids and one commit. If a batch hits a
+unique-email conflict (a concurrent signup), it is rolled back and its users
+are retried one at a time, so only the conflicting users fail.
+"""
+import os
+from collections import defaultdict
+
+from fastapi import HTTPException
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import Settings, ShardDirectory, User
+from app.schemas import BulkUserResponse, BulkUserResult
+from app.security import hash_passwords
+from app.sharding import is_sharded, shard_for
+
+MAX_BULK_USERS = int(os.getenv("MAX_BULK_USERS", "1000"))
+BULK_USERS_BATCH_SIZE = int(os.getenv("BULK_USERS_BATCH_SIZE", "200"))
+
+# Emails per existence-check query (keeps under SQLite's parameter limit)
+LOOKUP_CHUNK = 500
+
+
+def user_values(user_data, password_hash: str) -> dict:
+    """Column values for a new ``users`` row (verified by default)."""
+    return dict(
+        name=user_data.name,
+        email=user_data.email,
+        phone=user_data.phone,
+        password_hash=password_hash,
+        category=user_data.category,
+        verification_token=None,
+        verification_token_expiry=None,
+        default_avatar="pic3" if user_data.category == "Milky" else "pic4",
+        is_verified=True,
+    )
+
+
+def settings_values(user_data) -> dict:
+    """Default settings based on category."""
+    return dict(currency="INR" if user_data.category == "Milky" else "USD")
+
+
+def _registered(db: Session, emails) -> set:
+    taken = set()
+    for start in range(0, len(emails), LOOKUP_CHUNK):
+        chunk = emails[start:start + LOOKUP_CHUNK]
+        taken.update(db.scalars(select(ShardDirectory.email).where(ShardDirectory.email.in_(chunk))))
+    return taken
+
+
+def _insert_users(db: Session, batch) -> list:
+    """Add ``(user_data, password_hash)`` pairs without committing; returns their ids."""
+    emails = [user_data.email for user_data, _ in batch]
+    # Plain executemany, then read the ids back: an ordered INSERT ...
+    # RETURNING degrades to one statement per row on SQLite
+    db.execute(insert(ShardDirectory), [{"email": email, "shard": 0, "moving": False} for email in emails])
+    allocated = dict(db.execute(
+        select(ShardDirectory.email, ShardDirectory.user_id).where(ShardDirectory.email.in_(emails))
+    ).all())
+    ids = [allocated[email] for email in emails]
+    by_shard = defaultdict(list)
+    for user_id, pair in zip(ids, batch):
+        by_shard[shard_for(user_id)].append((user_id, pair))
+    for shard, members in by_shard.items():
+        if is_sharded():
+            db.execute(update(ShardDirectory)
+                       .where(ShardDirectory.user_id.in_([user_id for user_id, _ in members]))
+                       .values(shard=shard))
+        db.info["shard"] = shard
+        db.execute(insert(User), [
+            {"id": user_id, **user_values(user_data, password_hash)}
+            for user_id, (user_data, password_hash) in members
+        ])
+        db.execute(insert(Settings), [
+            {"user_id": user_id, **settings_values(user_data)}
+            for user_id, (user_data, _) in members
+        ])
+    db.info.pop("shard", None)
+    return ids
+
+
+def create_users(db: Session, users) -> BulkUserResponse:
+    if len(users) > MAX_BULK_USERS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_USERS} users per request")
+
+    results = {}
+
+    def fail(index, user_data, detail):
+        results[index] = BulkUserResult(index=index, email=user_data.email, status=409, detail=detail)
+
+    taken = _registered(db, list({user_data.email for user_data in users}))
+    pending, seen = [], set()
+    for index, user_data in enumerate(users):
+        if user_data.email in taken:
+            fail(index, user_data, "Email already registered")
+        elif user_data.email in seen:
+            fail(index, user_data, "Email appears more than once in this request")
+        else:
+            seen.add(user_data.email)
+            pending.append((index, user_data))
+
+    hashes = hash_passwords(user_data.password for _, user_data in pending)
+    pending = [(index, user_data, password_hash) for (index, user_data), password_hash in zip(pending, hashes)]
+
+    def created(batch, ids):
+        for (index, user_data, _), user_id in zip(batch, ids):
+            results[index] = BulkUserResult(index=index, email=user_data.email, user_id=user_id, status=201)
+
+    for start in range(0, len(pending), BULK_USERS_BATCH_SIZE):
+        batch = pending[start:start + BULK_USERS_BATCH_SIZE]
+        try:
+            ids = _insert_users(db, [(user_data, password_hash) for _, user_data, password_hash in batch])
+            db.commit()
+            created(batch, ids)
+            continue
+        except IntegrityError:
+            db.rollback()
+        # Someone registered one of these emails meanwhile; find out which
+        for entry in batch:
+            index, user_data, password_hash = entry
+            try:
+                ids = _insert_users(db, [(user_data, password_hash)])
+                db.commit()
+                created([entry], ids)
+            except IntegrityError:
+                db.rollback()
+                fail(index, user_data, "Email already registered")
+
+    ordered = [results[index] for index in range(len(users))]
+    failed = sum(1 for result in ordered if result.status != 201)
+    return BulkUserResponse(created=len(ordered) - failed, failed=failed, results=ordered)
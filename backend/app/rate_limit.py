@@ -0,0 +1,143 @@
+"""Token-bucket rate limiting for the authentication endpoints.
+
+Buckets live in process memory by default. Set ``RATE_LIMIT_DB`` to a file
+path to keep them in a small SQLite database instead, so every worker
+process on the host shares the same budget.
+
+Configuration (environment):
+    RATE_LIMIT_ENABLED     "0" disables limiting (default "1")
+    RATE_LIMIT_DB          optional SQLite path for a shared store
+    LOGIN_IP_RATE          "<capacity>/<seconds>", default "20/60"
+    LOGIN_EMAIL_RATE       "<capacity>/<seconds>", default "5/60"
+    SIGNUP_IP_RATE         "<capacity>/<seconds>", default "5/60"
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Tuple
+
+from fastapi import HTTPException, Request
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB")
+
+# Memory store is pruned beyond this many keys so a spray of random emails
+# cannot grow it without bound
+MAX_MEMORY_KEYS = 100_000
+
+
+def parse_rate(value: str) -> Tuple[float, float]:
+    """``"5/60"`` -> (capacity 5, refill 5/60 tokens per second)."""
+    capacity, _, seconds = value.partition("/")
+    capacity = float(capacity)
+    return capacity, capacity / float(seconds or 1)
+
+
+class MemoryStore:
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, refill: float, now: float) -> float:
+        """Consume one token; returns 0 if allowed, else seconds until one is available."""
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / refill
+            if len(self._buckets) > MAX_MEMORY_KEYS:
+                self._prune(now)
+            return wait
+
+    def _prune(self, now: float):
+        # Buckets idle for 10 minutes are full again under any sane rate
+        stale = [key for key, (_, updated) in self._buckets.items() if now - updated > 600]
+        for key in stale:
+            del self._buckets[key]
+
+
+class SQLiteStore:
+    """Buckets in a SQLite file shared by all worker processes on the host."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # One connection per thread, never reused across a fork
+        conn, pid = getattr(self._local, "conn", (None, None))
+        if conn is None or pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = (conn, os.getpid())
+        return conn
+
+    def take(self, key: str, capacity: float, refill: float, now: float) -> float:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + (now - updated) * refill)
+            if tokens >= 1:
+                tokens, wait = tokens - 1, 0.0
+            else:
+                wait = (1 - tokens) / refill
+            conn.execute(
+                "INSERT INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+
+class RateLimiter:
+    def __init__(self, name: str, rate: str, store):
+        self.name = name
+        self.capacity, self.refill = parse_rate(rate)
+        self.store = store
+
+    def check(self, key: str):
+        """Raise 429 with Retry-After when ``key`` has no tokens left."""
+        if not RATE_LIMIT_ENABLED or not key:
+            return
+        wait = self.store.take(f"{self.name}:{key}", self.capacity, self.refill, time.time())
+        if wait > 0:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many attempts. Please try again later.",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+
+
+_store = SQLiteStore(RATE_LIMIT_DB) if RATE_LIMIT_DB else MemoryStore()
+
+login_ip_limiter = RateLimiter("login-ip", os.getenv("LOGIN_IP_RATE", "20/60"), _store)
+login_email_limiter = RateLimiter("login-email", os.getenv("LOGIN_EMAIL_RATE", "5/60"), _store)
+signup_ip_limiter = RateLimiter("signup-ip", os.getenv("SIGNUP_IP_RATE", "5/60"), _store)
+
+
+def client_ip(request: Request) -> str:
+    # The proxy's X-Forwarded-For is only applied when FORWARDED_ALLOW_IPS
+    # trusts it (gunicorn.conf.py); otherwise this is the proxy's address
+    return request.client.host if request.client else ""
@@ -0,0 +1,242 @@
+"""Move one user's data to another shard.
+
+Usage:
+    python -m app.rebalance EMAIL TARGET_SHARD [ID_MAP.json]
+
+The user is marked ``moving`` in the directory (writes get 503 + Retry-After,
+reads keep working from the source). Requests that read the directory just
+before get ``REBALANCE_DRAIN_SECONDS`` to finish; then the source transaction
+locks the user's ``user_versions`` row, which every write bumps, so writes
+still in flight commit first and later ones wait (on SQLite this locks the
+whole source database). Under that lock the rows are copied to the target in
+one transaction, the directory is flipped and the source rows are deleted.
+If the copy fails the target transaction is rolled back and the flag cleared.
+
+The expense and income rows holding their table's highest id are not
+deleted but blanked into tombstones without an owner, so SQLite never hands
+that id out again (see ``app.archive``).
+
+Transaction, plan and settings ids are shard-local, so they are renumbered
+on the target; user ids are allocated by the directory and are kept. The
+move returns the ``{table: {old id: new id}}`` map (the CLI writes it to
+``ID_MAP.json`` if given) and sets ``user_versions.resync_before``, so the
+next ``/sync`` from any client is a full resync. Stored idempotency keys
+are copied with the ids in their responses renumbered, so a retried create
+is still answered from its key instead of inserting a duplicate. Keys from
+before migration v0015 do not record their endpoint and are dropped.
+
+Closed-period snapshots and nightly forecasts are not copied, they are
+rebuilt on the target on demand. Archived expenses and incomes land in the
+target's hot tables. The user's household link moves with them; move the
+partner as well, as household reads only see partners on the same shard.
+"""
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import func, select, update
+
+from app.database import engine, shard_engines
+from app.models import (
+    ClosedPeriod, Expense, ExpenseArchive, Forecast, HouseholdLink, IdempotencyKey, Income, IncomeArchive,
+    PeriodSnapshot, SavingPlan, Settings, ShardDirectory, User, UserVersion,
+)
+
+BATCH_SIZE = 1000
+# How long requests that saw the directory before the move may keep writing
+REBALANCE_DRAIN_SECONDS = float(os.getenv("REBALANCE_DRAIN_SECONDS", "2"))
+
+# (table, keep primary key) in insert order; deletes run in reverse
+COPIED = [
+    (User.__table__, True),
+    (Settings.__table__, False),
+    (Expense.__table__, False),
+    (Income.__table__, False),
+    (SavingPlan.__table__, False),
+    (UserVersion.__table__, True),
+    (HouseholdLink.__table__, True),
+]
+# Archived rows are copied into the target's hot tables (archive ids are
+# only unique next to their shard's hot table); the next archive run there
+# moves them out again
+UNARCHIVED = [
+    (ExpenseArchive.__table__, Expense.__table__),
+    (IncomeArchive.__table__, Income.__table__),
+]
+DROPPED = [PeriodSnapshot.__table__, ClosedPeriod.__table__, Forecast.__table__]
+# Hot tables whose newest row is blanked instead of deleted, and the
+# columns cleared on it
+KEEP_NEWEST = {
+    Expense.__table__: ["category", "notes", "amount_minor"],
+    Income.__table__: ["source", "notes", "amount_minor"],
+}
+
+# Where stored idempotent responses carry row ids: endpoint -> (table, field).
+# "id" is the created row's id; "results" is a batch response's per-operation ids.
+RESPONSE_IDS = {
+    "POST /expenses": ("expenses", "id"),
+    "POST /incomes": ("incomes", "id"),
+    "POST /plans": ("saving_plans", "id"),
+    "POST /expenses/batch": ("expenses", "results"),
+    "POST /incomes/batch": ("incomes", "results"),
+}
+
+
+def _user_filter(table, user_id):
+    return (table.c.id if table is User.__table__ else table.c.user_id) == user_id
+
+
+def _set_moving(user_id, moving, shard=None, conn=None):
+    values = {"moving": moving}
+    if shard is not None:
+        values["shard"] = shard
+    table = ShardDirectory.__table__
+    statement = update(table).where(table.c.user_id == user_id).values(**values)
+    if conn is not None:
+        conn.execute(statement)
+        return
+    with engine.begin() as conn:
+        conn.execute(statement)
+
+
+def _lock_user(conn, user_id):
+    """Wait for writes to ``user_id``'s rows and hold off new ones until ``conn`` commits."""
+    versions = UserVersion.__table__
+    conn.execute(update(versions).where(versions.c.user_id == user_id).values(version=versions.c.version))
+
+
+def _remap_response(endpoint, body, id_map):
+    table, field = RESPONSE_IDS[endpoint]
+    ids = id_map.get(table, {})
+    response = json.loads(body)
+    entries = [response] if field == "id" else response.get("results", [])
+    for entry in entries:
+        if entry.get("id") is not None:
+            entry["id"] = ids.get(entry["id"], entry["id"])
+    return json.dumps(response)
+
+
+def copy_idempotency_keys(user_id, source, target, id_map):
+    """Copy the user's stored idempotent responses, renumbering the ids in them."""
+    keys = IdempotencyKey.__table__
+    rows = []
+    for row in source.execute(select(keys).where(keys.c.user_id == user_id)):
+        row = dict(row._mapping)
+        if row["endpoint"] not in RESPONSE_IDS:
+            continue
+        del row["id"]
+        row["response_body"] = _remap_response(row["endpoint"], row["response_body"], id_map)
+        rows.append(row)
+    if rows:
+        target.execute(keys.insert(), rows)
+    return len(rows)
+
+
+def copy_user(user_id, source, target):
+    """Copy every row for ``user_id`` from ``source`` into ``target`` (a connection in a transaction).
+
+    Returns ``(rows copied per table, {table: {old id: new id}})``.
+    """
+    copied, id_map = {}, {}
+    plan = [(table, table, keep_pk) for table, keep_pk in COPIED]
+    plan += [(archive, hot, False) for archive, hot in UNARCHIVED]
+    for table, target_table, keep_pk in plan:
+        order = list(table.primary_key.columns)
+        result = source.execution_options(yield_per=BATCH_SIZE).execute(
+            select(table).where(_user_filter(table, user_id)).order_by(*order)
+        )
+        count = 0
+        for batch in result.partitions(BATCH_SIZE):
+            rows = [dict(row._mapping) for row in batch]
+            if keep_pk:
+                target.execute(target_table.insert(), rows)
+            else:
+                old_ids = [row.pop("id") for row in rows]
+                new_ids = target.execute(
+                    target_table.insert().returning(target_table.c.id, sort_by_parameter_order=True), rows
+                ).scalars().all()
+                id_map.setdefault(target_table.name, {}).update(zip(old_ids, new_ids))
+            count += len(rows)
+        copied[table.name] = count
+    copied[IdempotencyKey.__tablename__] = copy_idempotency_keys(user_id, source, target, id_map)
+    # Bump the cache version so no process serves totals cached before the
+    # move, and make every client's next sync a full one (ids changed)
+    versions = UserVersion.__table__
+    now = datetime.utcnow()
+    bumped = target.execute(
+        update(versions).where(versions.c.user_id == user_id)
+        .values(version=versions.c.version + 1, updated_at=now, resync_before=now)
+    )
+    if bumped.rowcount == 0:
+        target.execute(versions.insert().values(user_id=user_id, version=1, updated_at=now, resync_before=now))
+    return copied, id_map
+
+
+def delete_user(user_id, conn):
+    now = datetime.utcnow()
+    for table, columns in KEEP_NEWEST.items():
+        newest = select(func.max(table.c.id)).scalar_subquery()
+        conn.execute(
+            update(table).where(table.c.user_id == user_id, table.c.id == newest)
+            .values(user_id=None, deleted_at=now, updated_at=now, **dict.fromkeys(columns))
+        )
+    archives = [archive for archive, _ in UNARCHIVED]
+    for table in DROPPED + [IdempotencyKey.__table__] + archives + [table for table, _ in reversed(COPIED)]:
+        conn.execute(table.delete().where(_user_filter(table, user_id)))
+
+
+def rebalance(email, target_shard):
+    """Move ``email``'s data to ``target_shard``.
+
+    Returns ``(rows copied per table, {table: {old id: new id}})``; both are
+    empty if the user already is on that shard.
+    """
+    if not 0 <= target_shard < len(shard_engines):
+        raise ValueError(f"No shard {target_shard}; {len(shard_engines)} configured")
+    with engine.connect() as conn:
+        entry = conn.execute(
+            select(ShardDirectory.__table__).where(ShardDirectory.__table__.c.email == email)
+        ).first()
+    if entry is None:
+        raise LookupError(f"Unknown user {email}")
+    if entry.shard == target_shard:
+        return {}, {}
+
+    user_id, source_shard = entry.user_id, entry.shard
+    _set_moving(user_id, True)
+    time.sleep(REBALANCE_DRAIN_SECONDS)
+    try:
+        with shard_engines[source_shard].begin() as source:
+            _lock_user(source, user_id)
+            with shard_engines[target_shard].begin() as target:
+                copied, id_map = copy_user(user_id, source, target)
+            # Shard 0 holds the directory: flip it in the locked transaction
+            _set_moving(user_id, False, shard=target_shard, conn=source if source_shard == 0 else None)
+            delete_user(user_id, source)
+    except Exception:
+        _set_moving(user_id, False)
+        raise
+    return copied, id_map
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) not in (2, 3):
+        print(__doc__.strip().splitlines()[2].strip())
+        return 2
+    copied, id_map = rebalance(argv[0], int(argv[1]))
+    if not copied:
+        print("User already on that shard.")
+    for name, count in copied.items():
+        print(f"{name}: {count} rows")
+    if len(argv) == 3:
+        with open(argv[2], "w") as out:
+            json.dump(id_map, out)
+        print(f"id map written to {argv[2]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
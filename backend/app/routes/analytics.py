@@ -0,0 +1,134 @@
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.database import get_db, get_read_db
+from app.models import User, Settings
+from app.schemas import AnalyticsAggregate, AnalyticsRow
+from app.security import verify_token
+from app.cache import route_reads
+from app.sharding import bind_user_shard
+from app.currency_utils import minor_to_decimal, convert_decimal, round_money
+from app import analytics
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+GROUP_KEYS = ["year", "month", "category", "currency"]
+
+def get_current_user(token: str = None, db: Session = Depends(get_db)) -> User:
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    email = verify_token(token)
+    if not email:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    bind_user_shard(db, email)
+    user = db.query(User).filter(User.email == email).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    route_reads(db, user.id)
+    return user
+
+def load_ledger(user_id: int, kind: str, year_from: Optional[int], year_to: Optional[int]):
+    """Concatenate the user's partitions for the requested years."""
+    pa = analytics._pyarrow()
+    tables = [
+        analytics.read_partition(path)
+        for year, path in sorted(analytics.partition_paths(user_id, kind).items())
+        if (year_from is None or year >= year_from) and (year_to is None or year <= year_to)
+    ]
+    if not tables:
+        return None
+    return pa.concat_tables(tables)
+
+def grouped_minor_totals(table, keys):
+    """Vectorized ``SUM(amount_minor), COUNT(*)`` grouped by ``keys`` plus currency."""
+    pc = analytics._pyarrow().compute
+    columns = {
+        "year": pc.year(table.column("date")),
+        "month": table.column("month"),
+        "category": table.column("category").cast("string"),
+        "currency": table.column("currency").cast("string"),
+        "amount_minor": table.column("amount_minor"),
+    }
+    group_columns = [key for key in GROUP_KEYS if key in keys or key == "currency"]
+    if "month" in group_columns and "year" not in group_columns:
+        group_columns.insert(0, "year")
+    grouped = analytics._pyarrow().table(
+        {name: columns[name] for name in group_columns + ["amount_minor"]}
+    ).group_by(group_columns).aggregate([("amount_minor", "sum"), ("amount_minor", "count")])
+    return grouped.to_pylist()
+
+@router.get("/aggregate", response_model=AnalyticsAggregate)
+def aggregate(
+    token: str = None,
+    kind: str = "expenses",
+    group_by: str = "month",
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Totals and counts from the user's columnar snapshot.
+
+    ``group_by`` is a comma separated subset of year, month, category and
+    currency. Without currency, totals are converted to the user's display
+    currency; with it, each total stays in its own currency. Only rows
+    exported by the last ``python -m app.analytics`` run are included
+    (see ``as_of``).
+    """
+    if not analytics.available():
+        raise HTTPException(status_code=501, detail="Analytics snapshots need pyarrow on the server")
+    if kind not in analytics.KINDS:
+        raise HTTPException(
+            status_code=400, detail=f"kind must be one of: {', '.join(analytics.KINDS)}"
+        )
+    keys = [key.strip() for key in group_by.split(",") if key.strip()]
+    unknown = [key for key in keys if key not in GROUP_KEYS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown group_by: {', '.join(unknown)}. Allowed: {', '.join(GROUP_KEYS)}",
+        )
+
+    user = get_current_user(token, db)
+    manifest = analytics.read_manifest(user.id)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="No analytics snapshot for this user yet")
+    settings = db.query(Settings).filter(Settings.user_id == user.id).first()
+    user_currency = settings.currency if settings else "USD"
+    rate = settings.usd_to_inr_rate if settings else 81.0
+
+    table = load_ledger(user.id, kind, year_from, year_to)
+    totals = defaultdict(lambda: [Decimal(0), 0])
+    for group in grouped_minor_totals(table, keys) if table is not None else []:
+        amount = minor_to_decimal(group["amount_minor_sum"], group["currency"])
+        if "currency" in keys:
+            currency = group["currency"]
+        else:
+            # Exact per-currency conversion, rounded once per output row
+            currency = user_currency
+            amount = convert_decimal(amount, group["currency"], user_currency, rate)
+        key = (
+            group["year"] if "year" in keys else None,
+            f"{group['year']:04d}-{group['month']:02d}" if "month" in keys else None,
+            group["category"] if "category" in keys else None,
+            currency,
+        )
+        totals[key][0] += amount
+        totals[key][1] += group["amount_minor_count"]
+
+    rows = [
+        AnalyticsRow(year=year, month=month, category=category, currency=currency,
+                     total=round_money(total, currency), count=count)
+        for (year, month, category, currency), (total, count) in sorted(
+            totals.items(),
+            key=lambda item: tuple("" if part is None else str(part) for part in item[0]),
+        )
+    ]
+    return AnalyticsAggregate(
+        kind=kind,
+        group_by=keys,
+        as_of=datetime.fromisoformat(manifest["watermark"]),
+        rows=rows,
+    )
@@ -1,64 +1,86 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import User, Settings, Expense, Income, SavingPlan
-from app.schemas import UserCreate, UserLogin, UserResponse, Token, UserUpdate
+from app.database import get_db, get_read_db
+from app.models import User, Settings, Expense, Income, SavingPlan, ShardDirectory, UserVersion
+from app.schemas import (
+    UserCreate, UserLogin, UserResponse, Token, UserUpdate, BulkUserCreate, BulkUserResponse
+)
 from app.security import (
     get_password_hash, verify_password, create_access_token,
-    create_verification_token, verify_verification_token, verify_token
+    create_verification_token, verify_verification_token, verify_token,
+    run_hash_job, HashQueueFull, is_admin_key
 )
-from app.email_service import send_verification_email
+from app.rate_limit import client_ip, login_ip_limiter, login_email_limiter, signup_ip_limiter
+from app.periods import reopen_all
+from app.cache import touch_user
+from app.sharding import bind_user_shard, register_user
+from app.archive import ARCHIVES
+from app.provisioning import create_users, settings_values, user_values
 from datetime import datetime, timedelta
 from pydantic import EmailStr
+from typing import Optional
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+def shed_load():
+    return HTTPException(
+        status_code=503,
+        detail="Server is busy. Please try again shortly.",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/signup", response_model=dict)
-def signup(user_data: UserCreate, db: Session = Depends(get_db)):
-    # Check if email already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+def signup(user_data: UserCreate, request: Request, db: Session = Depends(get_db)):
+    signup_ip_limiter.check(client_ip(request))
+
+    # Check if email already exists (the directory covers every shard)
+    existing_user = db.query(ShardDirectory).filter(ShardDirectory.email == user_data.email).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create user (Verified by default)
-    hashed_password = get_password_hash(user_data.password)
-    default_avatar = "pic3" if user_data.category == "Milky" else "pic4"
-    db_user = User(
-        name=user_data.name,
-        email=user_data.email,
-        phone=user_data.phone,
-        password_hash=hashed_password,
-        category=user_data.category,
-        verification_token=None,
-        verification_token_expiry=None,
-        default_avatar=default_avatar,
-        is_verified=True
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    
-    # Create default settings based on category
-    default_currency = "INR" if user_data.category == "Milky" else "USD"
-    settings = Settings(
-        user_id=db_user.id,
-        currency=default_currency
-    )
-    db.add(settings)
+    try:
+        hashed_password = run_hash_job(get_password_hash, user_data.password)
+    except HashQueueFull:
+        raise shed_load()
+    try:
+        user_id = register_user(db, user_data.email)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Email already registered")
+    # User and default settings are written in the same transaction
+    db.add(User(id=user_id, **user_values(user_data, hashed_password)))
+    db.add(Settings(user_id=user_id, **settings_values(user_data)))
     db.commit()
     
     return {
         "message": "User created successfully.",
-        "user_id": db_user.id,
-        "email": db_user.email
+        "user_id": user_id,
+        "email": user_data.email
     }
 
+@router.post("/users/bulk", response_model=BulkUserResponse)
+def bulk_create_users(
+    bulk: BulkUserCreate,
+    x_admin_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Admin-only: create many users at once.
+
+    Results come back in request order, one per user.
+    """
+    if not is_admin_key(x_admin_key):
+        raise HTTPException(status_code=403, detail="Admin key required")
+    return create_users(db, bulk.users)
+
 @router.get("/verify")
 def verify_email(token: str, db: Session = Depends(get_db)):
     email = verify_verification_token(token)
     if not email:
         raise HTTPException(status_code=400, detail="Invalid or expired verification token")
     
+    bind_user_shard(db, email)
     user = db.query(User).filter(User.email == email).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -71,10 +93,19 @@ def verify_email(token: str, db: Session = Depends(get_db)):
     return {"message": "Email verified successfully. You can now login."}
 
 @router.post("/login", response_model=Token)
-def login(credentials: UserLogin, db: Session = Depends(get_db)):
+def login(credentials: UserLogin, request: Request, db: Session = Depends(get_db)):
+    # Throttle before any DB or bcrypt work
+    login_ip_limiter.check(client_ip(request))
+    login_email_limiter.check(credentials.email.lower())
+
+    bind_user_shard(db, credentials.email)
     user = db.query(User).filter(User.email == credentials.email).first()
     
-    if not user or not verify_password(credentials.password, user.password_hash):
+    try:
+        valid = user is not None and run_hash_job(verify_password, credentials.password, user.password_hash)
+    except HashQueueFull:
+        raise shed_load()
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
     if not user.is_verified:
@@ -87,7 +118,7 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user(token: str = None, db: Session = Depends(get_db)):
+def get_current_user(token: str = None, db: Session = Depends(get_read_db)):
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
@@ -95,6 +126,7 @@ def get_current_user(token: str = None, db: Session = Depends(get_db)):
     if not email:
         raise HTTPException(status_code=401, detail="Invalid token")
     
+    bind_user_shard(db, email)
     user = db.query(User).filter(User.email == email).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -110,6 +142,7 @@ def update_current_user(update: UserUpdate, token: str = None, db: Session = Dep
     if not email:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+    bind_user_shard(db, email)
     user = db.query(User).filter(User.email == email).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -132,18 +165,32 @@ def delete_user_data(token: str = None, db: Session = Depends(get_db)):
     if not email:
         raise HTTPException(status_code=401, detail="Invalid token")
     
+    bind_user_shard(db, email)
     user = db.query(User).filter(User.email == email).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Delete all expenses
-    db.query(Expense).filter(Expense.user_id == user.id).delete()
-    
-    # Delete all incomes
-    db.query(Income).filter(Income.user_id == user.id).delete()
+    # Tombstone all expenses, incomes and saving plans so /sync clients
+    # see the deletions
+    now = datetime.utcnow()
+    for model in (Expense, Income, SavingPlan):
+        db.query(model).filter(model.user_id == user.id, model.deleted_at.is_(None)).update(
+            {model.deleted_at: now, model.updated_at: now}, synchronize_session=False
+        )
+    # Archived rows are deleted for good; without tombstones for them,
+    # existing sync cursors must start over with a full resync
+    archived = sum(
+        db.query(archive).filter(archive.user_id == user.id).delete(synchronize_session=False)
+        for archive in ARCHIVES.values()
+    )
     
-    # Delete all saving plans
-    db.query(SavingPlan).filter(SavingPlan.user_id == user.id).delete()
+    # Drop closed-month snapshots of the deleted transactions
+    reopen_all(db, user.id)
+    touch_user(db, user.id)
+    if archived:
+        db.query(UserVersion).filter(UserVersion.user_id == user.id).update(
+            {UserVersion.resync_before: now}, synchronize_session=False
+        )
     
     db.commit()
     
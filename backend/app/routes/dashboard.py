@@ -1,39 +1,197 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import Expense, Income, User, Settings
-from app.schemas import DashboardSummary, RecentActivity
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, literal, select, union_all
+from sqlalchemy.orm import Session, aliased
+from app.database import get_db, get_read_db
+from app.models import (
+    Expense, Income, User, Settings, SavingPlan, UserVersion, ExpenseArchive, IncomeArchive, HouseholdLink
+)
+from app.schemas import (
+    DashboardSummary, RecentActivity, DashboardBootstrap, SavingPlanSummary, SettingsResponse,
+    DashboardForecast, DashboardHousehold, HouseholdMemberSummary
+)
 from app.security import verify_token
-from app.currency_utils import convert_amount
+from app.currency_utils import convert_minor, total_in_currency, round_money, from_minor
+from app.periods import month_bounds, is_past_month, closed_month_totals
+from app.cache import UserCache, remember_version, route_reads
+from app.sharding import bind_user_shard
+from app.archive import ARCHIVES, DATE_FIELDS, may_be_archived
+from app.routes.settings import default_settings
 from typing import List, Optional
 from datetime import datetime
+from decimal import Decimal
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
+# Month totals per user, valid until the user's next write (see app.cache)
+totals_cache = UserCache("dashboard-totals")
+forecast_cache = UserCache("dashboard-forecast")
+
 def get_current_user(token: str = None, db: Session = Depends(get_db)) -> User:
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
     email = verify_token(token)
     if not email:
         raise HTTPException(status_code=401, detail="Invalid token")
+    bind_user_shard(db, email)
     user = db.query(User).filter(User.email == email).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    route_reads(db, user.id)
     return user
 
+def get_user_and_settings(token: str, db: Session):
+    """Resolve the user and their settings row with a single query.
+
+    The user's cache version is joined in as well, so cached dashboard
+    totals can be validated without another round trip.
+    """
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    email = verify_token(token)
+    if not email:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    bind_user_shard(db, email)
+    row = db.query(User, Settings, UserVersion.version).outerjoin(
+        Settings, Settings.user_id == User.id
+    ).outerjoin(
+        UserVersion, UserVersion.user_id == User.id
+    ).filter(User.email == email).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="User not found")
+    user, settings, version = row
+    remember_version(db, user.id, version)
+    route_reads(db, user.id)
+    return user, settings
+
+def currency_and_rate(settings: Optional[Settings]):
+    user_currency = settings.currency if settings else "USD"
+    rate = settings.usd_to_inr_rate if settings else 81.0
+    return user_currency, rate
+
+def month_totals(db: Session, user_id: int, month: int, year: int, include_plans: bool = False):
+    """Cached :func:`compute_month_totals`; recomputed after any write by the user."""
+    return totals_cache.get_or_compute(
+        db, user_id, (year, month, include_plans),
+        lambda: compute_month_totals(db, user_id, month, year, include_plans)
+    )
+
+def compute_month_totals(db: Session, user_id: int, month: int, year: int, include_plans: bool = False):
+    """Per-currency expense and income totals (and optionally the plan total)
+    for one month, fetched in a single UNION ALL round trip.
+
+    Past months are read from their closed-period snapshot instead of
+    scanning transactions.
+
+    Totals are exact integer SUMs in minor units:
+    ``{"expense": {currency: minor}, "income": {...}, "plan": (minor, count)}``.
+    """
+    start, end = month_bounds(year, month)
+    totals = {"expense": {}, "income": {}, "plan": (0, 0)}
+    parts = []
+    if is_past_month(year, month):
+        totals.update(closed_month_totals(db, user_id, year, month))
+    else:
+        parts += [
+            select(literal("expense").label("kind"), Expense.currency.label("currency"),
+                   func.sum(Expense.amount_minor).label("total"), func.count().label("n"))
+            .where(Expense.user_id == user_id, Expense.deleted_at.is_(None),
+                   Expense.expense_date >= start, Expense.expense_date < end)
+            .group_by(Expense.currency),
+            select(literal("income").label("kind"), Income.currency.label("currency"),
+                   func.sum(Income.amount_minor).label("total"), func.count().label("n"))
+            .where(Income.user_id == user_id, Income.deleted_at.is_(None),
+                   Income.income_date >= start, Income.income_date < end)
+            .group_by(Income.currency),
+        ]
+    if include_plans:
+        parts.append(
+            select(literal("plan").label("kind"), literal(None).label("currency"),
+                   func.sum(SavingPlan.amount_minor).label("total"), func.count().label("n"))
+            .where(SavingPlan.user_id == user_id, SavingPlan.deleted_at.is_(None),
+                   SavingPlan.month == month, SavingPlan.year == year)
+        )
+
+    if not parts:
+        return totals
+    for kind, currency, total, n in db.execute(union_all(*parts) if len(parts) > 1 else parts[0]):
+        # int(): Postgres returns SUM(bigint) as numeric
+        if kind == "plan":
+            totals["plan"] = (int(total or 0), n)
+        else:
+            totals[kind][currency] = int(total or 0)
+    return totals
+
+def build_summary(totals: dict, user_currency: str, rate: float) -> DashboardSummary:
+    # Smart conversion: only convert if currency doesn't match. Per-currency
+    # totals are converted exactly and rounded once, at the end.
+    total_expense = round_money(total_in_currency(totals["expense"], user_currency, rate), user_currency)
+    total_income = round_money(total_in_currency(totals["income"], user_currency, rate), user_currency)
+    return DashboardSummary(
+        totalIncome=total_income,
+        totalExpense=total_expense,
+        savings=round_money(Decimal(str(total_income)) - Decimal(str(total_expense)), user_currency),
+        currency=user_currency
+    )
+
+def recent_activity(db: Session, user_id: int, user_currency: str, rate: float, limit: int) -> List[RecentActivity]:
+    """Latest ``limit`` expenses and incomes combined, newest first.
+
+    Both tables are read in one UNION ALL ordered and limited in SQL, so only
+    ``limit`` rows ever leave the database. The archive tables are only
+    added when the hot rows do not cover everything since the archive horizon.
+    """
+    def latest(expense_model, income_model):
+        expenses = select(
+            expense_model.id.label("id"), literal("expense").label("type"), literal(0).label("rank"),
+            expense_model.category.label("title"), expense_model.amount_minor.label("amount_minor"),
+            expense_model.currency.label("currency"), expense_model.expense_date.label("date"),
+            expense_model.notes.label("notes"),
+        ).where(expense_model.user_id == user_id, expense_model.deleted_at.is_(None))
+        incomes = select(
+            income_model.id.label("id"), literal("income").label("type"), literal(1).label("rank"),
+            income_model.source.label("title"), income_model.amount_minor.label("amount_minor"),
+            income_model.currency.label("currency"), income_model.income_date.label("date"),
+            income_model.notes.label("notes"),
+        ).where(income_model.user_id == user_id, income_model.deleted_at.is_(None))
+        return [expenses, incomes]
+
+    parts = latest(Expense, Income)
+    combined = union_all(*parts).subquery()
+    rows = db.execute(
+        select(combined).order_by(combined.c.date.desc(), combined.c.rank).limit(limit)
+    ).all()
+    # Archived rows are older than the horizon; they can only make the list
+    # when it is short or already reaches back past the horizon
+    oldest = rows[-1].date if rows and len(rows) >= limit else None
+    if may_be_archived(db, Expense, oldest) or may_be_archived(db, Income, oldest):
+        combined = union_all(*parts, *latest(ExpenseArchive, IncomeArchive)).subquery()
+        rows = db.execute(
+            select(combined).order_by(combined.c.date.desc(), combined.c.rank).limit(limit)
+        ).all()
+
+    activities = []
+    for row in rows:
+        activities.append(RecentActivity(
+            id=row.id,
+            type=row.type,
+            title=row.title,
+            # Smart conversion: only convert if currency doesn't match
+            amount=convert_minor(row.amount_minor, row.currency, user_currency, rate),
+            date=row.date,
+            notes=row.notes,
+            currency=user_currency
+        ))
+    return activities
+
 @router.get("/summary", response_model=DashboardSummary)
 def get_dashboard_summary(
     token: str = None,
-    month: Optional[int] = None,
+    month: Optional[int] = Query(None, ge=1, le=12),
     year: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    user = get_current_user(token, db)
-    
-    # Get user's currency setting
-    settings = db.query(Settings).filter(Settings.user_id == user.id).first()
-    user_currency = settings.currency if settings else "USD"
-    rate = settings.usd_to_inr_rate if settings else 81.0
+    user, settings = get_user_and_settings(token, db)
+    user_currency, rate = currency_and_rate(settings)
     
     now = datetime.utcnow()
     if not month:
@@ -41,108 +199,194 @@ def get_dashboard_summary(
     if not year:
         year = now.year
     
-    # Get expenses for the month
-    expenses_query = db.query(Expense).filter(
-        Expense.user_id == user.id,
-        Expense.expense_date.like(f"{year:04d}-{month:02d}%")
-    ).all()
-    
-    # Get incomes for the month
-    incomes_query = db.query(Income).filter(
-        Income.user_id == user.id,
-        Income.income_date.like(f"{year:04d}-{month:02d}%")
-    ).all()
-    
-    # Smart conversion: only convert if currency doesn't match
-    total_expense = 0
-    for e in expenses_query:
-        if e.currency == user_currency:
-            total_expense += e.amount
-        elif e.currency == "USD" and user_currency == "INR":
-            total_expense += e.amount * rate
-        elif e.currency == "INR" and user_currency == "USD":
-            total_expense += e.amount / rate
-    
-    total_income = 0
-    for i in incomes_query:
-        if i.currency == user_currency:
-            total_income += i.amount
-        elif i.currency == "USD" and user_currency == "INR":
-            total_income += i.amount * rate
-        elif i.currency == "INR" and user_currency == "USD":
-            total_income += i.amount / rate
-    
-    return DashboardSummary(
-        totalIncome=total_income,
-        totalExpense=total_expense,
-        savings=total_income - total_expense,
-        currency=user_currency
-    )
+    totals = month_totals(db, user.id, month, year)
+    return build_summary(totals, user_currency, rate)
 
 @router.get("/recent-activity", response_model=List[RecentActivity])
 def get_recent_activity(
     token: str = None,
     limit: int = 3,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    user = get_current_user(token, db)
-    
-    # Get user's currency setting
-    settings = db.query(Settings).filter(Settings.user_id == user.id).first()
-    user_currency = settings.currency if settings else "USD"
-    rate = settings.usd_to_inr_rate if settings else 81.0
-    
-    # Get recent expenses
-    expenses = db.query(Expense).filter(
-        Expense.user_id == user.id
-    ).order_by(Expense.expense_date.desc()).all()
-    
-    # Get recent incomes
-    incomes = db.query(Income).filter(
-        Income.user_id == user.id
-    ).order_by(Income.income_date.desc()).all()
-    
-    # Combine and format with smart conversion
-    activities = []
-    
-    for expense in expenses:
-        # Smart conversion: only convert if currency doesn't match
-        amount = expense.amount
-        if expense.currency != user_currency:
-            if expense.currency == "USD" and user_currency == "INR":
-                amount = expense.amount * rate
-            elif expense.currency == "INR" and user_currency == "USD":
-                amount = expense.amount / rate
-        
-        activities.append(RecentActivity(
-            id=expense.id,
-            type="expense",
-            title=expense.category,
-            amount=amount,
-            date=expense.expense_date,
-            notes=expense.notes,
-            currency=user_currency
-        ))
-    
-    for income in incomes:
-        # Smart conversion: only convert if currency doesn't match
-        amount = income.amount
-        if income.currency != user_currency:
-            if income.currency == "USD" and user_currency == "INR":
-                amount = income.amount * rate
-            elif income.currency == "INR" and user_currency == "USD":
-                amount = income.amount / rate
-        
-        activities.append(RecentActivity(
-            id=income.id,
-            type="income",
-            title=income.source,
-            amount=amount,
-            date=income.income_date,
-            notes=income.notes,
-            currency=user_currency
+    user, settings = get_user_and_settings(token, db)
+    user_currency, rate = currency_and_rate(settings)
+    return recent_activity(db, user.id, user_currency, rate, limit)
+
+@router.get("/bootstrap", response_model=DashboardBootstrap)
+def get_dashboard_bootstrap(
+    token: str = None,
+    month: Optional[int] = Query(None, ge=1, le=12),
+    year: Optional[int] = None,
+    limit: int = 3,
+    db: Session = Depends(get_read_db)
+):
+    """Everything the dashboard page needs in one round trip: settings, the
+    month summary, recent activity and the month's saving plan summary.
+
+    The token is decoded and the user and settings are resolved once; totals
+    and plans share one query and recent activity is a second.
+    """
+    user, settings = get_user_and_settings(token, db)
+    if not settings:
+        settings = default_settings(db, user)
+    user_currency, rate = currency_and_rate(settings)
+
+    now = datetime.utcnow()
+    if not month:
+        month = now.month
+    if not year:
+        year = now.year
+
+    totals = month_totals(db, user.id, month, year, include_plans=True)
+    planned, plan_count = totals["plan"]
+    planned = from_minor(planned)
+    return DashboardBootstrap(
+        settings=SettingsResponse.model_validate(settings),
+        summary=build_summary(totals, user_currency, rate),
+        recent_activity=recent_activity(db, user.id, user_currency, rate, limit),
+        plans_summary=SavingPlanSummary(month=month, year=year, total_planned=planned, count=plan_count),
+    )
+
+@router.get("/forecast", response_model=DashboardForecast)
+def get_dashboard_forecast(
+    token: str = None,
+    db: Session = Depends(get_read_db)
+):
+    """Month-to-date and projected month-end income, expenses and savings
+    for the current month (see app.forecast)."""
+    # NumPy is imported on first use to keep it out of the API's cold start
+    from app.forecast import user_forecast
+
+    user, settings = get_user_and_settings(token, db)
+    user_currency, rate = currency_and_rate(settings)
+    today = datetime.utcnow().date()
+    return forecast_cache.get_or_compute(
+        db, user.id, today, lambda: user_forecast(db, user.id, user_currency, rate, today)
+    )
+
+def get_household_members(token: str, db: Session):
+    """The user and, if linked, their partner, each with their settings row,
+    resolved with a single query. The requesting user comes first."""
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    email = verify_token(token)
+    if not email:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    bind_user_shard(db, email)
+    Partner = aliased(User)
+    PartnerSettings = aliased(Settings)
+    row = db.query(User, Settings, Partner, PartnerSettings).outerjoin(
+        Settings, Settings.user_id == User.id
+    ).outerjoin(
+        HouseholdLink, HouseholdLink.user_id == User.id
+    ).outerjoin(
+        Partner, Partner.id == HouseholdLink.partner_id
+    ).outerjoin(
+        PartnerSettings, PartnerSettings.user_id == Partner.id
+    ).filter(User.email == email).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="User not found")
+    user, settings, partner, partner_settings = row
+    route_reads(db, user.id)
+    members = [(user, settings)]
+    if partner is not None:
+        members.append((partner, partner_settings))
+    return members
+
+def compute_household_totals(db: Session, user_ids: List[int], month: int, year: int):
+    """Per-member, per-currency expense and income totals and plan totals for
+    one month, in one grouped UNION ALL over ``user_id IN (...)``.
+
+    Returns ``{user_id: {"expense": {currency: minor}, "income": {...}, "plan": minor}}``.
+    Past months read the transaction tables directly (plus the archive
+    tables when the month may be archived) rather than the per-user
+    closed-month snapshots, which would take a query per member.
+    """
+    start, end = month_bounds(year, month)
+    totals = {user_id: {"expense": {}, "income": {}, "plan": 0} for user_id in user_ids}
+    parts = []
+    for kind, model in (("expense", Expense), ("income", Income)):
+        sources = [model]
+        if is_past_month(year, month) and may_be_archived(db, model, start):
+            sources.append(ARCHIVES[model])
+        for source in sources:
+            date_column = getattr(source, DATE_FIELDS[model])
+            parts.append(
+                select(source.user_id.label("user_id"), literal(kind).label("kind"),
+                       source.currency.label("currency"), func.sum(source.amount_minor).label("total"))
+                .where(source.user_id.in_(user_ids), source.deleted_at.is_(None),
+                       date_column >= start, date_column < end)
+                .group_by(source.user_id, source.currency)
+            )
+    parts.append(
+        select(SavingPlan.user_id.label("user_id"), literal("plan").label("kind"),
+               literal(None).label("currency"), func.sum(SavingPlan.amount_minor).label("total"))
+        .where(SavingPlan.user_id.in_(user_ids), SavingPlan.deleted_at.is_(None),
+               SavingPlan.month == month, SavingPlan.year == year)
+        .group_by(SavingPlan.user_id)
+    )
+    for user_id, kind, currency, total in db.execute(union_all(*parts)):
+        member = totals[user_id]
+        # int(): Postgres returns SUM(bigint) as numeric
+        if kind == "plan":
+            member["plan"] = int(total or 0)
+        else:
+            member[kind][currency] = member[kind].get(currency, 0) + int(total or 0)
+    return totals
+
+@router.get("/household", response_model=DashboardHousehold)
+def get_household_dashboard(
+    token: str = None,
+    month: Optional[int] = Query(None, ge=1, le=12),
+    year: Optional[int] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Month totals for the user and their linked partner, combined.
+
+    Everything is shown in the requesting user's currency. Each member's
+    amounts are converted with that member's own USD/INR rate; plans carry
+    no currency and count as being in their owner's currency. Takes the
+    same two round trips as /dashboard/summary.
+    """
+    members = get_household_members(token, db)
+    household_currency, _ = currency_and_rate(members[0][1])
+
+    now = datetime.utcnow()
+    if not month:
+        month = now.month
+    if not year:
+        year = now.year
+
+    totals = compute_household_totals(db, [user.id for user, _ in members], month, year)
+    summaries = []
+    combined = {"income": Decimal(0), "expense": Decimal(0), "plan": Decimal(0)}
+    for user, settings in members:
+        member_currency, rate = currency_and_rate(settings)
+        member = totals[user.id]
+        income = total_in_currency(member["income"], household_currency, rate)
+        expense = total_in_currency(member["expense"], household_currency, rate)
+        plan = total_in_currency({member_currency: member["plan"]}, household_currency, rate)
+        combined["income"] += income
+        combined["expense"] += expense
+        combined["plan"] += plan
+        summaries.append(HouseholdMemberSummary(
+            user_id=user.id,
+            name=user.name,
+            category=user.category,
+            totalIncome=round_money(income, household_currency),
+            totalExpense=round_money(expense, household_currency),
+            savings=round_money(income - expense, household_currency),
+            totalPlanned=round_money(plan, household_currency),
         ))
-    
-    # Sort by date descending and limit
-    activities.sort(key=lambda x: x.date, reverse=True)
-    return activities[:limit]
+
+    # Rounded once, from the exact combined totals
+    return DashboardHousehold(
+        month=month,
+        year=year,
+        totalIncome=round_money(combined["income"], household_currency),
+        totalExpense=round_money(combined["expense"], household_currency),
+        savings=round_money(combined["income"] - combined["expense"], household_currency),
+        totalPlanned=round_money(combined["plan"], household_currency),
+        currency=household_currency,
+        members=summaries,
+    )
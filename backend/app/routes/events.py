@@ -0,0 +1,106 @@
+import asyncio
+import json
+from decimal import Decimal
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from app.database import ReadSessionLocal
+from app.cache import current_version
+from app.events import hub, EVENTS_HEARTBEAT_SECONDS, EVENTS_MAX_CONNECTIONS
+from app.routes.dashboard import get_user_and_settings, currency_and_rate, month_totals, build_summary
+from datetime import datetime
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+# Client reconnect delay sent with the first event (milliseconds)
+RETRY_MS = 5000
+
+def dashboard_state(token: str, month: Optional[int], year: Optional[int]):
+    """``(user_id, version, summary)`` for the stream; runs in the threadpool.
+
+    Opens a short-lived session per call, so idle streams hold no database
+    connection. The token is re-checked every time, so a stream ends once
+    its token expires.
+    """
+    db = ReadSessionLocal()
+    try:
+        user, settings = get_user_and_settings(token, db)
+        user_currency, rate = currency_and_rate(settings)
+        now = datetime.utcnow()
+        totals = month_totals(db, user.id, month or now.month, year or now.year)
+        summary = build_summary(totals, user_currency, rate)
+        return user.id, current_version(db, user.id), summary.model_dump()
+    finally:
+        db.close()
+
+def summary_delta(before: dict, after: dict):
+    """Per-field change between two summaries; None if the currency changed."""
+    if before["currency"] != after["currency"]:
+        return None
+    return {
+        key: float(Decimal(str(after[key])) - Decimal(str(before[key])))
+        for key in ("totalIncome", "totalExpense", "savings")
+    }
+
+def format_event(name: str, data: dict, event_id=None, retry=None) -> str:
+    lines = [f"event: {name}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if retry is not None:
+        lines.append(f"retry: {retry}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+async def event_stream(token, month, year, user_id, queue, version, summary):
+    try:
+        yield format_event("ready", {"version": version, "summary": summary},
+                           event_id=version, retry=RETRY_MS)
+        while True:
+            try:
+                await asyncio.wait_for(queue.get(), timeout=EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            try:
+                _, new_version, new_summary = await run_in_threadpool(dashboard_state, token, month, year)
+            except HTTPException as exc:
+                yield format_event("error", {"status": exc.status_code, "detail": exc.detail})
+                return
+            if new_version == version:
+                continue
+            yield format_event("change", {
+                "version": new_version,
+                "summary": new_summary,
+                "delta": summary_delta(summary, new_summary),
+            }, event_id=new_version)
+            version, summary = new_version, new_summary
+    finally:
+        hub.unsubscribe(user_id, queue)
+
+@router.get("/")
+async def stream_events(
+    token: str = None,
+    month: Optional[int] = Query(None, ge=1, le=12),
+    year: Optional[int] = None
+):
+    """Server-sent events for the dashboard.
+
+    Sends ``ready`` with the current month summary, then ``change`` (new
+    summary plus per-field delta) whenever the user's expenses, incomes,
+    plans or settings change, from any device or worker. Use ``GET /sync``
+    to fetch the changed rows themselves.
+    """
+    if hub.connection_count() >= EVENTS_MAX_CONNECTIONS:
+        raise HTTPException(status_code=503, detail="Too many open event streams",
+                            headers={"Retry-After": "30"})
+    user_id, version, summary = await run_in_threadpool(dashboard_state, token, month, year)
+    # A write landing between the state read and subscribing is caught by
+    # the poller, which wakes every newly seen user once
+    queue = hub.subscribe(user_id)
+    return StreamingResponse(
+        event_stream(token, month, year, user_id, queue, version, summary),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
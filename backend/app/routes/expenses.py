@@ -1,11 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import Expense, User, Settings
-from app.schemas import ExpenseCreate, ExpenseResponse
+from app.database import get_db, get_read_db
+from app.models import Expense, ExpenseArchive, User, Settings
+from app.schemas import ExpenseCreate, ExpenseResponse, ExpenseBatch, BatchResponse
 from app.security import verify_token
-from app.currency_utils import convert_amount
-from datetime import date
+from app.currency_utils import to_minor, convert_minor
+from app.projection import parse_fields, select_columns
+from app.batch import apply_batch
+from app.idempotency import request_fingerprint, find_response, commit_with_key
+from app.periods import reopen_period
+from app.cache import touch_user, route_reads
+from app.sharding import bind_user_shard
+from app.archive import may_be_archived, restore
+from app import group_commit
+from datetime import date, datetime
 from typing import List, Optional
 
 router = APIRouter(prefix="/expenses", tags=["expenses"])
@@ -16,18 +26,26 @@ def get_current_user(token: str = None, db: Session = Depends(get_db)) -> User:
     email = verify_token(token)
     if not email:
         raise HTTPException(status_code=401, detail="Invalid token")
+    bind_user_shard(db, email)
     user = db.query(User).filter(User.email == email).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    route_reads(db, user.id)
     return user
 
 @router.post("/", response_model=ExpenseResponse)
 def create_expense(
     expense: ExpenseCreate,
     token: str = None,
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     user = get_current_user(token, db)
+    # A retry with the same Idempotency-Key gets the original response
+    fingerprint = request_fingerprint("POST /expenses", expense)
+    replay = find_response(db, user.id, idempotency_key, fingerprint)
+    if replay is not None:
+        return replay
     
     # Get settings for exchange rate
     settings = db.query(Settings).filter(Settings.user_id == user.id).first()
@@ -39,30 +57,46 @@ def create_expense(
     db_expense = Expense(
         user_id=user.id,
         category=expense.category,
-        amount=expense.amount,
+        amount_minor=to_minor(expense.amount, expense_currency),
         currency=expense_currency,  # Store original currency
         expense_date=expense.expense_date,
         notes=expense.notes,
         expense_type=expense.expense_type
     )
+    if idempotency_key is None and group_commit.enabled():
+        # Committed together with other concurrent creates (see app.group_commit)
+        now = datetime.utcnow()
+        db_expense.created_at = db_expense.updated_at = now
+        values = {column: getattr(db_expense, column) for column in (
+            "user_id", "category", "amount_minor", "currency", "expense_date", "notes",
+            "expense_type", "created_at", "updated_at"
+        )}
+        db_expense.id = group_commit.insert_row(db, Expense, values)
+        response = ExpenseResponse.from_orm(db_expense)
+        response.amount = db_expense.amount
+        return response
     db.add(db_expense)
-    db.commit()
-    db.refresh(db_expense)
+    # A late entry for a closed month invalidates that month's snapshot
+    reopen_period(db, user.id, db_expense.expense_date)
+    touch_user(db, user.id)
+    db.flush()
     
     response = ExpenseResponse.from_orm(db_expense)
     response.currency = expense_currency
-    response.amount = expense.amount
-    return response
+    response.amount = db_expense.amount
+    return commit_with_key(db, user.id, idempotency_key, fingerprint, response)
 
 @router.get("/", response_model=List[ExpenseResponse])
 def list_expenses(
     token: str = None,
-    month: Optional[int] = None,
+    month: Optional[int] = Query(None, ge=1, le=12),
     year: Optional[int] = None,
     category: Optional[str] = None,
     expense_type: Optional[str] = None,
-    db: Session = Depends(get_db)
+    fields: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
+    selected = parse_fields(fields, list(ExpenseResponse.model_fields))
     user = get_current_user(token, db)
     
     # Get user's current currency setting
@@ -70,43 +104,89 @@ def list_expenses(
     user_currency = settings.currency if settings else "USD"
     rate = settings.usd_to_inr_rate if settings else 81.0
     
-    query = db.query(Expense).filter(Expense.user_id == user.id)
-    
-    if month and year:
-        query = query.filter(
-            Expense.expense_date.like(f"{year:04d}-{month:02d}%")
-        )
-    elif year:
-        query = query.filter(
-            Expense.expense_date.like(f"{year:04d}%")
-        )
-    
-    if category:
-        query = query.filter(Expense.category == category)
-    
-    if expense_type:
-        query = query.filter(Expense.expense_type == expense_type)
-    
-    expenses = query.order_by(Expense.expense_date.desc()).all()
+    # Archived rows are only read when the period reaches back far enough
+    start = date(year, month if month else 1, 1) if year else None
+    models = [Expense] + ([ExpenseArchive] if may_be_archived(db, Expense, start) else [])
+    required = ("currency",) if selected is not None and "amount" in selected else ()
+    if len(models) > 1:
+        required += ("expense_date",)
+
+    expenses = []
+    for model in models:
+        if selected is not None:
+            # Sparse fieldset: SELECT only what was asked for (plus the stored
+            # currency when amounts need converting)
+            names, columns = select_columns(
+                model, selected, required=required,
+                column_map={"amount": model.amount_minor}
+            )
+            query = db.query(*columns)
+        else:
+            query = db.query(model)
+        query = query.filter(model.user_id == user.id, model.deleted_at.is_(None))
+
+        if month and year:
+            query = query.filter(
+                model.expense_date.like(f"{year:04d}-{month:02d}%")
+            )
+        elif year:
+            query = query.filter(
+                model.expense_date.like(f"{year:04d}%")
+            )
+
+        if category:
+            query = query.filter(model.category == category)
+
+        if expense_type:
+            query = query.filter(model.expense_type == expense_type)
+
+        expenses += query.order_by(model.expense_date.desc()).all()
+    if len(models) > 1:
+        expenses.sort(key=lambda row: row.expense_date, reverse=True)
+
+    if selected is not None:
+        result = []
+        for row in expenses:
+            item = dict(zip(names, row))
+            if "amount" in item:
+                item["amount"] = convert_minor(item["amount"], item["currency"], user_currency, rate)
+            if "currency" in item:
+                item["currency"] = user_currency
+            result.append({name: item[name] for name in selected})
+        # Bypass response_model validation, which expects every field
+        return JSONResponse(content=jsonable_encoder(result))
     
     # Smart conversion: Only convert if stored currency differs from user's selected currency
     result = []
     for expense in expenses:
         response = ExpenseResponse.from_orm(expense)
-        # If expense was entered in different currency than user's current selection, convert
-        if expense.currency != user_currency:
-            if expense.currency == "USD" and user_currency == "INR":
-                # Convert USD to INR
-                response.amount = expense.amount * rate
-            elif expense.currency == "INR" and user_currency == "USD":
-                # Convert INR to USD
-                response.amount = expense.amount / rate
-        # If same currency, no conversion needed
+        # If expense was entered in different currency than user's current selection,
+        # convert (exactly, rounded once to the display currency's minor unit)
+        response.amount = convert_minor(expense.amount_minor, expense.currency, user_currency, rate)
         response.currency = user_currency
         result.append(response)
     
     return result
 
+@router.post("/batch", response_model=BatchResponse)
+def batch_expenses(
+    batch: ExpenseBatch,
+    token: str = None,
+    idempotency_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Apply many create/update/delete operations in one transaction.
+
+    Results come back in request order, one per operation.
+    """
+    user = get_current_user(token, db)
+    fingerprint = request_fingerprint("POST /expenses/batch", batch)
+    replay = find_response(db, user.id, idempotency_key, fingerprint)
+    if replay is not None:
+        return replay
+    return apply_batch(db, user.id, Expense, "expense_date", batch.operations,
+                       idempotency=(idempotency_key, fingerprint))
+
 @router.delete("/{expense_id}")
 def delete_expense(
     expense_id: int,
@@ -115,15 +195,23 @@ def delete_expense(
 ):
     user = get_current_user(token, db)
     
-    expense = db.query(Expense).filter(
+    lookup = db.query(Expense).filter(
         Expense.id == expense_id,
-        Expense.user_id == user.id
-    ).first()
+        Expense.user_id == user.id,
+        Expense.deleted_at.is_(None)
+    )
+    expense = lookup.first()
+    if not expense and restore(db, Expense, user.id, [expense_id]):
+        # Archived: moved back to the hot table, then deleted as usual
+        expense = lookup.first()
     
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
     
-    db.delete(expense)
+    # Tombstone instead of DELETE so /sync can report it
+    expense.deleted_at = datetime.utcnow()
+    reopen_period(db, user.id, expense.expense_date)
+    touch_user(db, user.id)
     db.commit()
     
     return {"message": "Expense deleted successfully"}
@@ -0,0 +1,108 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.database import get_db, get_read_db
+from app.models import HouseholdLink, ShardDirectory, User
+from app.schemas import HouseholdInvite, HouseholdPartner, HouseholdResponse
+from app.security import (
+    verify_token, create_household_invite, verify_household_invite, HOUSEHOLD_INVITE_HOURS
+)
+from app.cache import route_reads
+from app.sharding import bind_user_shard, is_sharded
+
+router = APIRouter(prefix="/household", tags=["household"])
+
+def get_current_user(token: str = None, db: Session = Depends(get_db)) -> User:
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    email = verify_token(token)
+    if not email:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    bind_user_shard(db, email)
+    user = db.query(User).filter(User.email == email).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    route_reads(db, user.id)
+    return user
+
+def household_response(partner) -> HouseholdResponse:
+    return HouseholdResponse(partner=HouseholdPartner.model_validate(partner) if partner else None)
+
+@router.get("/", response_model=HouseholdResponse)
+def get_household(
+    token: str = None,
+    db: Session = Depends(get_read_db)
+):
+    user = get_current_user(token, db)
+    partner = db.query(User).join(HouseholdLink, HouseholdLink.partner_id == User.id).filter(
+        HouseholdLink.user_id == user.id
+    ).first()
+    return household_response(partner)
+
+@router.post("/invite", response_model=HouseholdInvite)
+def invite_partner(
+    token: str = None,
+    db: Session = Depends(get_read_db)
+):
+    """Create an invite for the partner account to accept with /household/join."""
+    user = get_current_user(token, db)
+    return HouseholdInvite(invite=create_household_invite(user.email), expires_in_hours=HOUSEHOLD_INVITE_HOURS)
+
+@router.post("/join", response_model=HouseholdResponse)
+def join_household(
+    invite: str,
+    token: str = None,
+    db: Session = Depends(get_db)
+):
+    """Link the current account with the one that created ``invite``."""
+    user = get_current_user(token, db)
+    inviter_email = verify_household_invite(invite)
+    if not inviter_email:
+        raise HTTPException(status_code=400, detail="Invalid or expired invite")
+    if inviter_email == user.email:
+        raise HTTPException(status_code=400, detail="Cannot link an account to itself")
+
+    if is_sharded():
+        # The household dashboard reads both members in one query
+        entry = db.query(ShardDirectory).filter(ShardDirectory.email == inviter_email).first()
+        if entry is not None and entry.shard != db.info.get("shard", 0):
+            raise HTTPException(status_code=409, detail="Accounts are stored on different shards")
+    partner = db.query(User).filter(User.email == inviter_email).first()
+    if not partner:
+        raise HTTPException(status_code=404, detail="Inviting user not found")
+
+    links = db.query(HouseholdLink).filter(HouseholdLink.user_id.in_([user.id, partner.id])).all()
+    if links:
+        if all(link.partner_id in (user.id, partner.id) for link in links) and len(links) == 2:
+            # Already linked to each other; accepting twice is harmless
+            return household_response(partner)
+        raise HTTPException(status_code=409, detail="One of the accounts is already linked")
+
+    db.add_all([
+        HouseholdLink(user_id=user.id, partner_id=partner.id),
+        HouseholdLink(user_id=partner.id, partner_id=user.id),
+    ])
+    response = household_response(partner)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Linked concurrently by another request
+        db.rollback()
+        raise HTTPException(status_code=409, detail="One of the accounts is already linked")
+    return response
+
+@router.delete("/")
+def leave_household(
+    token: str = None,
+    db: Session = Depends(get_db)
+):
+    """Unlink the current account and its partner."""
+    user = get_current_user(token, db)
+    link = db.query(HouseholdLink).filter(HouseholdLink.user_id == user.id).first()
+    if not link:
+        raise HTTPException(status_code=404, detail="Not linked to a household")
+    db.query(HouseholdLink).filter(
+        HouseholdLink.user_id.in_([user.id, link.partner_id])
+    ).delete(synchronize_session=False)
+    db.commit()
+    return {"message": "Household unlinked"}
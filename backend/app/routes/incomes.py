@@ -1,10 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import Income, User, Settings
-from app.schemas import IncomeCreate, IncomeResponse
+from app.database import get_db, get_read_db
+from app.models import Income, IncomeArchive, User, Settings
+from app.schemas import IncomeCreate, IncomeResponse, IncomeBatch, BatchResponse
 from app.security import verify_token
-from app.currency_utils import convert_amount
+from app.currency_utils import to_minor, convert_minor
+from app.projection import parse_fields, select_columns
+from app.batch import apply_batch
+from app.idempotency import request_fingerprint, find_response, commit_with_key
+from app.periods import reopen_period
+from app.cache import touch_user, route_reads
+from app.sharding import bind_user_shard
+from app.archive import may_be_archived, restore
+from app import group_commit
+from datetime import date, datetime
 from typing import List, Optional
 
 router = APIRouter(prefix="/incomes", tags=["incomes"])
@@ -15,18 +26,26 @@ def get_current_user(token: str = None, db: Session = Depends(get_db)) -> User:
     email = verify_token(token)
     if not email:
         raise HTTPException(status_code=401, detail="Invalid token")
+    bind_user_shard(db, email)
     user = db.query(User).filter(User.email == email).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    route_reads(db, user.id)
     return user
 
 @router.post("/", response_model=IncomeResponse)
 def create_income(
     income: IncomeCreate,
     token: str = None,
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     user = get_current_user(token, db)
+    # A retry with the same Idempotency-Key gets the original response
+    fingerprint = request_fingerprint("POST /incomes", income)
+    replay = find_response(db, user.id, idempotency_key, fingerprint)
+    if replay is not None:
+        return replay
     
     # Get settings for exchange rate
     settings = db.query(Settings).filter(Settings.user_id == user.id).first()
@@ -38,28 +57,44 @@ def create_income(
     db_income = Income(
         user_id=user.id,
         source=income.source,
-        amount=income.amount,
+        amount_minor=to_minor(income.amount, income_currency),
         currency=income_currency,  # Store original currency
         income_date=income.income_date,
         notes=income.notes
     )
+    if idempotency_key is None and group_commit.enabled():
+        # Committed together with other concurrent creates (see app.group_commit)
+        now = datetime.utcnow()
+        db_income.created_at = db_income.updated_at = now
+        values = {column: getattr(db_income, column) for column in (
+            "user_id", "source", "amount_minor", "currency", "income_date", "notes",
+            "created_at", "updated_at"
+        )}
+        db_income.id = group_commit.insert_row(db, Income, values)
+        response = IncomeResponse.from_orm(db_income)
+        response.amount = db_income.amount
+        return response
     db.add(db_income)
-    db.commit()
-    db.refresh(db_income)
+    # A late entry for a closed month invalidates that month's snapshot
+    reopen_period(db, user.id, db_income.income_date)
+    touch_user(db, user.id)
+    db.flush()
     
     response = IncomeResponse.from_orm(db_income)
     response.currency = income_currency
-    response.amount = income.amount
-    return response
+    response.amount = db_income.amount
+    return commit_with_key(db, user.id, idempotency_key, fingerprint, response)
 
 @router.get("/", response_model=List[IncomeResponse])
 def list_incomes(
     token: str = None,
-    month: Optional[int] = None,
+    month: Optional[int] = Query(None, ge=1, le=12),
     year: Optional[int] = None,
     source: Optional[str] = None,
-    db: Session = Depends(get_db)
+    fields: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
+    selected = parse_fields(fields, list(IncomeResponse.model_fields))
     user = get_current_user(token, db)
     
     # Get user's current currency setting
@@ -67,40 +102,86 @@ def list_incomes(
     user_currency = settings.currency if settings else "USD"
     rate = settings.usd_to_inr_rate if settings else 81.0
     
-    query = db.query(Income).filter(Income.user_id == user.id)
-    
-    if month and year:
-        query = query.filter(
-            Income.income_date.like(f"{year:04d}-{month:02d}%")
-        )
-    elif year:
-        query = query.filter(
-            Income.income_date.like(f"{year:04d}%")
-        )
-    
-    if source:
-        query = query.filter(Income.source == source)
-    
-    incomes = query.order_by(Income.income_date.desc()).all()
+    # Archived rows are only read when the period reaches back far enough
+    start = date(year, month if month else 1, 1) if year else None
+    models = [Income] + ([IncomeArchive] if may_be_archived(db, Income, start) else [])
+    required = ("currency",) if selected is not None and "amount" in selected else ()
+    if len(models) > 1:
+        required += ("income_date",)
+
+    incomes = []
+    for model in models:
+        if selected is not None:
+            # Sparse fieldset: SELECT only what was asked for (plus the stored
+            # currency when amounts need converting)
+            names, columns = select_columns(
+                model, selected, required=required,
+                column_map={"amount": model.amount_minor}
+            )
+            query = db.query(*columns)
+        else:
+            query = db.query(model)
+        query = query.filter(model.user_id == user.id, model.deleted_at.is_(None))
+
+        if month and year:
+            query = query.filter(
+                model.income_date.like(f"{year:04d}-{month:02d}%")
+            )
+        elif year:
+            query = query.filter(
+                model.income_date.like(f"{year:04d}%")
+            )
+
+        if source:
+            query = query.filter(model.source == source)
+
+        incomes += query.order_by(model.income_date.desc()).all()
+    if len(models) > 1:
+        incomes.sort(key=lambda row: row.income_date, reverse=True)
+
+    if selected is not None:
+        result = []
+        for row in incomes:
+            item = dict(zip(names, row))
+            if "amount" in item:
+                item["amount"] = convert_minor(item["amount"], item["currency"], user_currency, rate)
+            if "currency" in item:
+                item["currency"] = user_currency
+            result.append({name: item[name] for name in selected})
+        # Bypass response_model validation, which expects every field
+        return JSONResponse(content=jsonable_encoder(result))
     
     # Smart conversion: Only convert if stored currency differs from user's selected currency
     result = []
     for income in incomes:
         response = IncomeResponse.from_orm(income)
-        # If income was entered in different currency than user's current selection, convert
-        if income.currency != user_currency:
-            if income.currency == "USD" and user_currency == "INR":
-                # Convert USD to INR
-                response.amount = income.amount * rate
-            elif income.currency == "INR" and user_currency == "USD":
-                # Convert INR to USD
-                response.amount = income.amount / rate
-        # If same currency, no conversion needed
+        # If income was entered in different currency than user's current selection,
+        # convert (exactly, rounded once to the display currency's minor unit)
+        response.amount = convert_minor(income.amount_minor, income.currency, user_currency, rate)
         response.currency = user_currency
         result.append(response)
     
     return result
 
+@router.post("/batch", response_model=BatchResponse)
+def batch_incomes(
+    batch: IncomeBatch,
+    token: str = None,
+    idempotency_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Apply many create/update/delete operations in one transaction.
+
+    Results come back in request order, one per operation.
+    """
+    user = get_current_user(token, db)
+    fingerprint = request_fingerprint("POST /incomes/batch", batch)
+    replay = find_response(db, user.id, idempotency_key, fingerprint)
+    if replay is not None:
+        return replay
+    return apply_batch(db, user.id, Income, "income_date", batch.operations,
+                       idempotency=(idempotency_key, fingerprint))
+
 @router.delete("/{income_id}")
 def delete_income(
     income_id: int,
@@ -109,15 +190,23 @@ def delete_income(
 ):
     user = get_current_user(token, db)
     
-    income = db.query(Income).filter(
+    lookup = db.query(Income).filter(
         Income.id == income_id,
-        Income.user_id == user.id
-    ).first()
+        Income.user_id == user.id,
+        Income.deleted_at.is_(None)
+    )
+    income = lookup.first()
+    if not income and restore(db, Income, user.id, [income_id]):
+        # Archived: moved back to the hot table, then deleted as usual
+        income = lookup.first()
     
     if not income:
         raise HTTPException(status_code=404, detail="Income not found")
     
-    db.delete(income)
+    # Tombstone instead of DELETE so /sync can report it
+    income.deleted_at = datetime.utcnow()
+    reopen_period(db, user.id, income.income_date)
+    touch_user(db, user.id)
     db.commit()
     
     return {"message": "Income deleted successfully"}
@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.database import get_db
+from datetime import datetime
+from app.database import get_db, get_read_db
 from app.models import SavingPlan, User
 from app.schemas import SavingPlanCreate, SavingPlanResponse, SavingPlanSummary
 from app.security import verify_token
+from app.currency_utils import to_minor, from_minor
+from app.cache import touch_user, route_reads
+from app.sharding import bind_user_shard
+from app.idempotency import request_fingerprint, find_response, commit_with_key
 
 router = APIRouter(prefix="/plans", tags=["saving-plans"]) 
 
@@ -14,35 +20,47 @@ def get_current_user(token: str = None, db: Session = Depends(get_db)) -> User:
     email = verify_token(token)
     if not email:
         raise HTTPException(status_code=401, detail="Invalid token")
+    bind_user_shard(db, email)
     user = db.query(User).filter(User.email == email).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    route_reads(db, user.id)
     return user
 
 @router.post("/", response_model=SavingPlanResponse)
-def create_plan(plan: SavingPlanCreate, token: str = None, db: Session = Depends(get_db)):
+def create_plan(
+    plan: SavingPlanCreate,
+    token: str = None,
+    idempotency_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     user = get_current_user(token, db)
+    # A retry with the same Idempotency-Key gets the original response
+    fingerprint = request_fingerprint("POST /plans", plan)
+    replay = find_response(db, user.id, idempotency_key, fingerprint)
+    if replay is not None:
+        return replay
     db_plan = SavingPlan(
         user_id=user.id,
         category=plan.category,
-        amount=plan.amount,
+        amount_minor=to_minor(plan.amount),
         month=plan.month,
         year=plan.year,
     )
     db.add(db_plan)
-    db.commit()
-    db.refresh(db_plan)
-    return db_plan
+    touch_user(db, user.id)
+    db.flush()
+    return commit_with_key(db, user.id, idempotency_key, fingerprint, SavingPlanResponse.from_orm(db_plan))
 
 @router.get("/", response_model=List[SavingPlanResponse])
 def list_plans(
     token: str = None,
     month: Optional[int] = None,
     year: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     user = get_current_user(token, db)
-    query = db.query(SavingPlan).filter(SavingPlan.user_id == user.id)
+    query = db.query(SavingPlan).filter(SavingPlan.user_id == user.id, SavingPlan.deleted_at.is_(None))
     if month:
         query = query.filter(SavingPlan.month == month)
     if year:
@@ -52,10 +70,14 @@ def list_plans(
 @router.delete("/{plan_id}")
 def delete_plan(plan_id: int, token: str = None, db: Session = Depends(get_db)):
     user = get_current_user(token, db)
-    plan = db.query(SavingPlan).filter(SavingPlan.id == plan_id, SavingPlan.user_id == user.id).first()
+    plan = db.query(SavingPlan).filter(
+        SavingPlan.id == plan_id, SavingPlan.user_id == user.id, SavingPlan.deleted_at.is_(None)
+    ).first()
     if not plan:
         raise HTTPException(status_code=404, detail="Saving plan not found")
-    db.delete(plan)
+    # Tombstone instead of DELETE so /sync can report it
+    plan.deleted_at = datetime.utcnow()
+    touch_user(db, user.id)
     db.commit()
     return {"message": "Saving plan deleted successfully"}
 
@@ -64,13 +86,14 @@ def plans_summary(
     month: int,
     year: int,
     token: str = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     user = get_current_user(token, db)
-    plans = db.query(SavingPlan).filter(
+    # Exact integer SUM in SQL instead of loading every plan
+    total, count = db.query(func.sum(SavingPlan.amount_minor), func.count()).filter(
         SavingPlan.user_id == user.id,
+        SavingPlan.deleted_at.is_(None),
         SavingPlan.month == month,
         SavingPlan.year == year
-    ).all()
-    total = sum(p.amount for p in plans)
-    return SavingPlanSummary(month=month, year=year, total_planned=total, count=len(plans))
+    ).one()
+    return SavingPlanSummary(month=month, year=year, total_planned=from_minor(total or 0), count=count)
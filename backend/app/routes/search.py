@@ -0,0 +1,138 @@
+import re
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.database import get_db, get_read_db
+from app.models import Expense, Income, User, Settings
+from app.archive import ARCHIVES, may_be_archived
+from app.schemas import RecentActivity, SearchResults
+from app.security import verify_token
+from app.cache import route_reads
+from app.sharding import bind_user_shard
+from app.currency_utils import convert_minor
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+MAX_LIMIT = 100
+MAX_TERMS = 8
+
+def get_current_user(token: str = None, db: Session = Depends(get_db)) -> User:
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    email = verify_token(token)
+    if not email:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    bind_user_shard(db, email)
+    user = db.query(User).filter(User.email == email).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    route_reads(db, user.id)
+    return user
+
+def search_terms(q: str):
+    """Split user input into plain word tokens.
+
+    Everything but letters and digits is dropped, so FTS query syntax typed
+    by the user can never reach the MATCH/tsquery parser.
+    """
+    return re.findall(r"\w+", q.lower())[:MAX_TERMS]
+
+def _sqlite_matches(db: Session, user_id: int, terms, limit: int, offset: int):
+    # All terms must match (prefix match) in title or notes, and the owner
+    # token narrows the lookup to this user's postings.
+    body = " ".join(f'"{term}"*' for term in terms)
+    match = f"owner : u{user_id} AND {{title notes}} : ({body})"
+    rows = db.execute(text(
+        "SELECT rowid, bm25(transactions_fts, 0.0, 2.0, 1.0) AS score "
+        "FROM transactions_fts WHERE transactions_fts MATCH :match "
+        "ORDER BY score LIMIT :limit OFFSET :offset"
+    ), {"match": match, "limit": limit, "offset": offset})
+    return [("income" if rowid % 2 else "expense", rowid // 2) for rowid, _ in rows]
+
+def _postgres_matches(db: Session, user_id: int, terms, limit: int, offset: int):
+    tsquery = " & ".join(f"{term}:*" for term in terms)
+    sources = []
+    for model, kind, column in ((Expense, "expense", "expense_date"), (Income, "income", "income_date")):
+        sources.append((kind, model.__tablename__, column))
+        # Archived rows are indexed as well; only read once something was archived
+        if may_be_archived(db, model, None):
+            sources.append((kind, ARCHIVES[model].__tablename__, column))
+    union = " UNION ALL".join(
+        f" SELECT '{kind}' AS kind, id, ts_rank(search_vector, q) AS score, {column} AS day"
+        f" FROM {table}, to_tsquery('simple', :q) q"
+        " WHERE user_id = :user_id AND deleted_at IS NULL AND search_vector @@ q"
+        for kind, table, column in sources
+    )
+    rows = db.execute(text(
+        f"SELECT kind, id FROM ({union}) hits ORDER BY score DESC, day DESC LIMIT :limit OFFSET :offset"
+    ), {"q": tsquery, "user_id": user_id, "limit": limit, "offset": offset})
+    return [(kind, row_id) for kind, row_id in rows]
+
+def _load(db: Session, model, user_id: int, ids):
+    """Rows of ``model`` by id, falling back to its archive for ids not in the hot table."""
+    if not ids:
+        return {}
+    rows = {row.id: row for row in db.query(model).filter(
+        model.user_id == user_id, model.deleted_at.is_(None), model.id.in_(ids))}
+    missing = [row_id for row_id in ids if row_id not in rows]
+    if missing and may_be_archived(db, model, None):
+        archive = ARCHIVES[model]
+        rows.update({row.id: row for row in db.query(archive).filter(
+            archive.user_id == user_id, archive.id.in_(missing))})
+    return rows
+
+@router.get("/", response_model=SearchResults)
+def search_transactions(
+    q: str,
+    token: str = None,
+    limit: int = 20,
+    offset: int = 0,
+    db: Session = Depends(get_read_db)
+):
+    """Ranked full-text search over expense categories/notes and income
+    sources/notes, archived ones included. Results are paginated with
+    ``limit``/``offset``."""
+    user = get_current_user(token, db)
+    limit = max(1, min(limit, MAX_LIMIT))
+    offset = max(0, offset)
+
+    terms = search_terms(q)
+    if not terms:
+        return SearchResults(query=q, limit=limit, offset=offset, has_more=False, results=[])
+
+    # Fetch one extra hit to know whether another page exists
+    if db.get_bind().dialect.name == "postgresql":
+        hits = _postgres_matches(db, user.id, terms, limit + 1, offset)
+    else:
+        hits = _sqlite_matches(db, user.id, terms, limit + 1, offset)
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+
+    settings = db.query(Settings).filter(Settings.user_id == user.id).first()
+    user_currency = settings.currency if settings else "USD"
+    rate = settings.usd_to_inr_rate if settings else 81.0
+
+    expenses = _load(db, Expense, user.id, [row_id for kind, row_id in hits if kind == "expense"])
+    incomes = _load(db, Income, user.id, [row_id for kind, row_id in hits if kind == "income"])
+
+    results = []
+    for kind, row_id in hits:
+        if kind == "expense" and row_id in expenses:
+            row = expenses[row_id]
+            title, day = row.category, row.expense_date
+        elif kind == "income" and row_id in incomes:
+            row = incomes[row_id]
+            title, day = row.source, row.income_date
+        else:
+            continue
+        results.append(RecentActivity(
+            id=row.id,
+            type=kind,
+            title=title,
+            amount=convert_minor(row.amount_minor, row.currency, user_currency, rate),
+            date=day,
+            notes=row.notes,
+            currency=user_currency
+        ))
+
+    return SearchResults(query=q, limit=limit, offset=offset, has_more=has_more, results=results)
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models import Settings, User
 from app.schemas import SettingsResponse, SettingsBase
 from app.security import verify_token
+from app.cache import touch_user, route_reads
+from app.sharding import bind_user_shard
 
 router = APIRouter(prefix="/settings", tags=["settings"])
 
@@ -13,26 +15,40 @@ def get_current_user(token: str = None, db: Session = Depends(get_db)) -> User:
     email = verify_token(token)
     if not email:
         raise HTTPException(status_code=401, detail="Invalid token")
+    bind_user_shard(db, email)
     user = db.query(User).filter(User.email == email).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    route_reads(db, user.id)
     return user
 
+def default_settings(db: Session, user: User) -> Settings:
+    """Create ``user``'s missing settings row with the defaults and return it.
+
+    Read sessions switch to the primary first: the row may already be there
+    and not yet on the replica, and the new row is not on the replica yet
+    either when it is loaded back after the commit.
+    """
+    db.info["use_primary"] = True
+    settings = db.query(Settings).filter(Settings.user_id == user.id).first()
+    if settings:
+        return settings
+    default_currency = "INR" if user.category == "Milky" else "USD"
+    settings = Settings(user_id=user.id, currency=default_currency)
+    db.add(settings)
+    db.commit()
+    return settings
+
 @router.get("/", response_model=SettingsResponse)
 def get_settings(
     token: str = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     user = get_current_user(token, db)
     
     settings = db.query(Settings).filter(Settings.user_id == user.id).first()
     if not settings:
-        # Create default settings if not exists
-        default_currency = "INR" if user.category == "Milky" else "USD"
-        settings = Settings(user_id=user.id, currency=default_currency)
-        db.add(settings)
-        db.commit()
-        db.refresh(settings)
+        settings = default_settings(db, user)
     
     return settings
 
@@ -52,6 +68,7 @@ def update_settings(
         settings.currency = settings_data.currency
         settings.usd_to_inr_rate = settings_data.usd_to_inr_rate
     
+    touch_user(db, user.id)
     db.commit()
     db.refresh(settings)
     return settings
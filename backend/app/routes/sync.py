@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.database import get_db, get_read_db
+from app.models import Expense, Income, SavingPlan, User, Settings, UserVersion
+from app.schemas import (
+    ExpenseResponse, IncomeResponse, SavingPlanResponse, SettingsResponse,
+    SyncChanges, SyncTombstones
+)
+from app.security import verify_token
+from app.cache import route_reads, require_caught_up
+from app.sharding import bind_user_shard
+from app.archive import ARCHIVES, ARCHIVE_MIN_AGE_DAYS, TOMBSTONE_RETENTION_DAYS, may_be_archived
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+# The next cursor trails the clock by this much, so rows stamped just before
+# a sync by a transaction that had not committed yet are picked up next time.
+# Clients merge by id, so the overlap only costs a few repeated rows.
+CURSOR_LAG = timedelta(seconds=5)
+
+def get_current_user(token: str = None, db: Session = Depends(get_db)) -> User:
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    email = verify_token(token)
+    if not email:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    bind_user_shard(db, email)
+    user = db.query(User).filter(User.email == email).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    route_reads(db, user.id)
+    return user
+
+def _archive_has_changes(db: Session, model, changed_since: Optional[datetime], now: datetime) -> bool:
+    """Archived rows were last changed at least ARCHIVE_MIN_AGE_DAYS ago, so
+    only full syncs and older cursors need to look at them."""
+    if not may_be_archived(db, model, None):
+        return False
+    return changed_since is None or changed_since < now - timedelta(days=ARCHIVE_MIN_AGE_DAYS)
+
+def encode_cursor(shard: int, moment: datetime) -> str:
+    return f"{shard}:{moment.isoformat()}"
+
+def decode_cursor(cursor: str):
+    """Return ``(shard, datetime)``. Raises 400 for a malformed cursor."""
+    try:
+        shard, moment = cursor.split(":", 1)
+        return int(shard), datetime.fromisoformat(moment)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid sync cursor")
+
+@router.get("/", response_model=SyncChanges)
+def sync_changes(
+    token: str = None,
+    since: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Rows created, changed or deleted since ``since``.
+
+    Without a cursor, after the user's data moved to another shard (ids
+    are shard-local), for cursors older than ``TOMBSTONE_RETENTION_DAYS``
+    (their tombstones may have been purged), or when deletions since the
+    cursor left no tombstones (``user_versions.resync_before``), every live
+    row is returned with ``full=True``.
+    Amounts are not converted: each row keeps the currency it was entered
+    in, and the current settings are included so clients can convert
+    locally without re-syncing when the display currency changes.
+
+    Reads use the replica only when it has all of the user's writes.
+    """
+    started = datetime.utcnow()
+    user = get_current_user(token, db)
+    # The cursor below comes from the clock, so a lagging replica must not
+    # hide rows committed before it
+    require_caught_up(db, user.id)
+    shard = db.info.get("shard", 0)
+
+    changed_since = None
+    if since:
+        cursor_shard, changed_since = decode_cursor(since)
+        if cursor_shard != shard or changed_since < started - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+            changed_since = None
+    if changed_since is not None:
+        # Read after route_reads, so it comes from the primary right after a write
+        resync_before = db.query(UserVersion.resync_before).filter(UserVersion.user_id == user.id).scalar()
+        if resync_before is not None and changed_since < resync_before:
+            changed_since = None
+    full = changed_since is None
+
+    changes = {}
+    deleted = SyncTombstones()
+    for name, model in (("expenses", Expense), ("incomes", Income), ("plans", SavingPlan)):
+        query = db.query(model).filter(model.user_id == user.id)
+        if full:
+            query = query.filter(model.deleted_at.is_(None))
+        else:
+            query = query.filter(model.updated_at > changed_since)
+        rows = query.order_by(model.updated_at).all()
+        if model in ARCHIVES and _archive_has_changes(db, model, changed_since, started):
+            archive = ARCHIVES[model]
+            query = db.query(archive).filter(archive.user_id == user.id, archive.deleted_at.is_(None))
+            if not full:
+                query = query.filter(archive.updated_at > changed_since)
+            rows = query.order_by(archive.updated_at).all() + rows
+        changes[name] = [row for row in rows if row.deleted_at is None]
+        setattr(deleted, name, [row.id for row in rows if row.deleted_at is not None])
+
+    settings = db.query(Settings).filter(Settings.user_id == user.id).first()
+    return SyncChanges(
+        cursor=encode_cursor(shard, started - CURSOR_LAG),
+        full=full,
+        settings=SettingsResponse.from_orm(settings) if settings else None,
+        expenses=[ExpenseResponse.from_orm(row) for row in changes["expenses"]],
+        incomes=[IncomeResponse.from_orm(row) for row in changes["incomes"]],
+        plans=[SavingPlanResponse.from_orm(row) for row in changes["plans"]],
+        deleted=deleted,
+    )
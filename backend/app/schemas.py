@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import List, Optional
 from datetime import date, datetime
 
 # User schemas
@@ -12,6 +12,21 @@ class UserBase(BaseModel):
 class UserCreate(UserBase):
     password: str
 
+class BulkUserCreate(BaseModel):
+    users: List[UserCreate]
+
+class BulkUserResult(BaseModel):
+    index: int
+    email: str
+    user_id: Optional[int] = None
+    status: int  # 201 created or 409 email already taken
+    detail: Optional[str] = None
+
+class BulkUserResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkUserResult]
+
 class UserResponse(UserBase):
     id: int
     is_verified: bool
@@ -131,3 +146,147 @@ class SavingPlanSummary(BaseModel):
     year: int
     total_planned: float
     count: int
+
+# Dashboard bootstrap (one round trip for the home page)
+class DashboardBootstrap(BaseModel):
+    settings: SettingsResponse
+    summary: DashboardSummary
+    recent_activity: List[RecentActivity]
+    plans_summary: SavingPlanSummary
+
+# Household schemas
+class HouseholdInvite(BaseModel):
+    invite: str  # Give this to the partner, who passes it to /household/join
+    expires_in_hours: int
+
+class HouseholdPartner(BaseModel):
+    id: int
+    name: str
+    email: str
+    category: str
+
+    class Config:
+        from_attributes = True
+
+class HouseholdResponse(BaseModel):
+    partner: Optional[HouseholdPartner] = None
+
+class HouseholdMemberSummary(BaseModel):
+    user_id: int
+    name: str
+    category: str
+    totalIncome: float
+    totalExpense: float
+    savings: float
+    totalPlanned: float
+
+class DashboardHousehold(BaseModel):
+    month: int
+    year: int
+    totalIncome: float
+    totalExpense: float
+    savings: float
+    totalPlanned: float
+    currency: str = "USD"  # The requesting member's currency; every amount is in it
+    members: List[HouseholdMemberSummary]
+
+# Month-end forecast
+class ForecastLine(BaseModel):
+    actual: float  # Month to date, including today
+    projected: float  # Estimated month-end total
+
+class DashboardForecast(BaseModel):
+    month: int
+    year: int
+    as_of: date
+    regularExpense: ForecastLine
+    additionalExpense: ForecastLine
+    totalExpense: ForecastLine
+    totalIncome: ForecastLine
+    savings: ForecastLine
+    currency: str = "USD"
+
+# Search schemas
+class SearchResults(BaseModel):
+    query: str
+    limit: int
+    offset: int
+    has_more: bool
+    results: List[RecentActivity]
+
+# Delta sync schemas
+class SyncTombstones(BaseModel):
+    expenses: List[int] = []
+    incomes: List[int] = []
+    plans: List[int] = []
+
+class SyncChanges(BaseModel):
+    cursor: str  # Pass back as ?since= on the next sync
+    full: bool  # True: replace the local cache instead of merging
+    settings: Optional[SettingsResponse] = None
+    # Amounts are in each row's own currency; convert with `settings`
+    expenses: List[ExpenseResponse]
+    incomes: List[IncomeResponse]
+    plans: List[SavingPlanResponse]
+    deleted: SyncTombstones
+
+# Batch mutation schemas
+class ExpenseUpdate(BaseModel):
+    category: Optional[str] = None
+    amount: Optional[float] = None
+    expense_date: Optional[date] = None
+    notes: Optional[str] = None
+    expense_type: Optional[str] = None
+    currency: Optional[str] = None
+
+class IncomeUpdate(BaseModel):
+    source: Optional[str] = None
+    amount: Optional[float] = None
+    income_date: Optional[date] = None
+    notes: Optional[str] = None
+    currency: Optional[str] = None
+
+class ExpenseBatchOp(BaseModel):
+    op: str  # create, update or delete
+    id: Optional[int] = None  # update and delete
+    data: Optional[ExpenseCreate] = None  # create
+    changes: Optional[ExpenseUpdate] = None  # update; only the fields sent are changed
+
+class IncomeBatchOp(BaseModel):
+    op: str  # create, update or delete
+    id: Optional[int] = None  # update and delete
+    data: Optional[IncomeCreate] = None  # create
+    changes: Optional[IncomeUpdate] = None  # update; only the fields sent are changed
+
+class ExpenseBatch(BaseModel):
+    operations: List[ExpenseBatchOp]
+
+class IncomeBatch(BaseModel):
+    operations: List[IncomeBatchOp]
+
+class BatchResult(BaseModel):
+    index: int
+    op: str
+    id: Optional[int] = None
+    status: int  # 201 created, 200 updated/deleted, 404, 409 or 422
+    detail: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    applied: int
+    failed: int
+    results: List[BatchResult]
+
+# Analytics schemas
+class AnalyticsRow(BaseModel):
+    year: Optional[int] = None
+    month: Optional[str] = None  # YYYY-MM
+    category: Optional[str] = None  # expense category or income source
+    currency: str  # Currency of `total`
+    total: float
+    count: int
+
+class AnalyticsAggregate(BaseModel):
+    kind: str
+    group_by: List[str]
+    as_of: Optional[datetime] = None  # Snapshot watermark; later changes are not included
+    rows: List[AnalyticsRow]
@@ -1,23 +1,82 @@
-from passlib.context import CryptContext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import lru_cache
+import hmac
+import multiprocessing
+import threading
 from typing import Optional
-from jose import JWTError, jwt
 from pydantic import ValidationError
 import os
 
+# passlib and jose (which pulls in cryptography) dominate the API's import
+# time, so they are imported on first use instead of at process start.
+
 SECRET_KEY = "your-secret-key-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
+HOUSEHOLD_INVITE_HOURS = 24
+# Shared secret for admin-only endpoints (X-Admin-Key); unset disables them
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache(maxsize=None)
+def _pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     # Truncate to 72 bytes for bcrypt compatibility
-    return pwd_context.verify(plain_password[:72], hashed_password)
+    return _pwd_context().verify(plain_password[:72], hashed_password)
 
 def get_password_hash(password: str) -> str:
     # Truncate to 72 bytes for bcrypt compatibility
-    return pwd_context.hash(password[:72])
+    return _pwd_context().hash(password[:72])
+
+# bcrypt runs on a small dedicated pool. At most HASH_QUEUE_LIMIT hashes may
+# be running or waiting at once; beyond that callers get HashQueueFull and the
+# endpoint sheds load instead of tying up every server thread in bcrypt.
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", str(HASH_WORKERS * 2)))
+
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_slots = threading.BoundedSemaphore(HASH_QUEUE_LIMIT)
+
+class HashQueueFull(Exception):
+    """Raised when the password hashing queue is saturated."""
+
+def run_hash_job(fn, *args):
+    """Run a password hash/verify call on the bounded bcrypt pool."""
+    if not _hash_slots.acquire(blocking=False):
+        raise HashQueueFull()
+    try:
+        return _hash_executor.submit(fn, *args).result()
+    finally:
+        _hash_slots.release()
+
+def is_admin_key(key: Optional[str]) -> bool:
+    return bool(ADMIN_API_KEY) and key is not None and hmac.compare_digest(key, ADMIN_API_KEY)
+
+# Bulk provisioning hashes hundreds of passwords per request. Those go to a
+# separate process pool (created on first use) so they run on every core
+# without occupying the bounded pool that login and signup depend on.
+BULK_HASH_PROCESSES = int(os.getenv("BULK_HASH_PROCESSES", str(os.cpu_count() or 1)))
+
+_bulk_hash_pool = None
+_bulk_hash_lock = threading.Lock()
+
+def hash_passwords(passwords):
+    """Hash many passwords in parallel; results are in input order."""
+    global _bulk_hash_pool
+    passwords = list(passwords)
+    if BULK_HASH_PROCESSES <= 1 or len(passwords) <= 1:
+        return [get_password_hash(password) for password in passwords]
+    with _bulk_hash_lock:
+        if _bulk_hash_pool is None:
+            # spawn, not fork: forking a threaded server process is unsafe
+            _bulk_hash_pool = ProcessPoolExecutor(
+                max_workers=BULK_HASH_PROCESSES, mp_context=multiprocessing.get_context("spawn")
+            )
+    chunksize = max(1, len(passwords) // (BULK_HASH_PROCESSES * 4))
+    return list(_bulk_hash_pool.map(get_password_hash, passwords, chunksize=chunksize))
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -26,10 +85,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
+    from jose import jwt
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 def verify_token(token: str) -> Optional[str]:
+    from jose import JWTError, jwt
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -46,10 +107,12 @@ def create_verification_token(email: str, expires_delta: Optional[timedelta] = N
     else:
         expire = datetime.utcnow() + timedelta(hours=24)
     to_encode.update({"exp": expire})
+    from jose import jwt
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 def verify_verification_token(token: str) -> Optional[str]:
+    from jose import JWTError, jwt
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -59,3 +122,21 @@ def verify_verification_token(token: str) -> Optional[str]:
         return email
     except JWTError:
         return None
+
+def create_household_invite(email: str, expires_delta: Optional[timedelta] = None) -> str:
+    to_encode = {"sub": email, "type": "household"}
+    expire = datetime.utcnow() + (expires_delta or timedelta(hours=HOUSEHOLD_INVITE_HOURS))
+    to_encode.update({"exp": expire})
+    from jose import jwt
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def verify_household_invite(token: str) -> Optional[str]:
+    """Email of the user who created the invite, or None if invalid/expired."""
+    from jose import JWTError, jwt
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("type") != "household":
+        return None
+    return payload.get("sub")
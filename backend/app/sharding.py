@@ -0,0 +1,59 @@
+"""Horizontal sharding of per-user data.
+
+Every user's rows (users, settings, transactions, plans, snapshots and
+version counter) live on exactly one shard. The ``shard_directory`` table on
+the primary maps email -> user id -> shard and allocates user ids, so ids
+stay unique across shards. With no ``DATABASE_SHARD_URLS`` configured there
+is a single shard and none of this does any extra work.
+"""
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.database import shard_engines
+from app.models import ShardDirectory
+
+# How long clients should wait before retrying a write during a rebalance
+MOVE_RETRY_SECONDS = 5
+
+
+def is_sharded() -> bool:
+    return len(shard_engines) > 1
+
+
+def shard_for(user_id: int) -> int:
+    """Placement for new users."""
+    return user_id % len(shard_engines)
+
+
+def register_user(db: Session, email: str) -> int:
+    """Allocate a user id in the directory and bind the session to its shard.
+
+    Flushes but does not commit; the caller commits together with the user
+    row (which only shares a transaction when both are on shard 0).
+    """
+    entry = ShardDirectory(email=email, shard=0, moving=False)
+    db.add(entry)
+    db.flush()
+    entry.shard = shard_for(entry.user_id)
+    db.info["shard"] = entry.shard
+    return entry.user_id
+
+
+def bind_user_shard(db: Session, email: str) -> None:
+    """Point ``db`` at the shard holding ``email``'s data.
+
+    Unknown emails stay on shard 0, where the later user lookup 404s as
+    before. Writes are refused with 503 while the user is being moved.
+    """
+    if not is_sharded():
+        return
+    entry = db.query(ShardDirectory).filter(ShardDirectory.email == email).first()
+    if entry is None:
+        return
+    if entry.moving and not db.info.get("read_only"):
+        raise HTTPException(
+            status_code=503,
+            detail="Account is being migrated, please retry shortly",
+            headers={"Retry-After": str(MOVE_RETRY_SECONDS)},
+        )
+    db.info["shard"] = entry.shard
@@ -0,0 +1,83 @@
+"""Shared helpers for the benchmark scripts: a throwaway migrated SQLite
+database seeded with users and transactions, and a logged-in TestClient.
+
+Import this module before anything from ``app`` so DATABASE_URL points at the
+scratch database.
+"""
+import os
+import random
+import sys
+import tempfile
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SCRATCH_DIR = tempfile.mkdtemp(prefix="mm-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{SCRATCH_DIR}/bench.db")
+
+CATEGORIES = ["Food", "Rent", "Travel", "Shopping", "Bills", "Health", "Fun"]
+SOURCES = ["Salary", "Freelance", "Gift", "Interest"]
+NOTES = ["", "weekly groceries at the market", "split with Milky", "card payment",
+         "cash", "monthly subscription renewal"]
+
+
+def migrate():
+    from app import migrations
+    from app.database import shard_engines
+    for shard_engine in shard_engines:
+        migrations.upgrade(shard_engine)
+
+
+def seed(users=1, expenses_per_user=1000, incomes_per_user=100, start=date(2022, 1, 1), days=1400, rng_seed=7):
+    """Insert users (password ``pw``) with random transactions. Returns the emails."""
+    from app.database import SessionLocal
+    from app.models import Expense, Income, Settings, User
+    from app.security import get_password_hash
+    from app.sharding import register_user
+
+    rng = random.Random(rng_seed)
+    password_hash = get_password_hash("pw")
+    emails = []
+    for n in range(users):
+        # One session per user: each is bound to that user's shard
+        db = SessionLocal()
+        try:
+            email = f"bench{n}@example.com"
+            category = "Milky" if n % 2 else "Mocha"
+            user = User(id=register_user(db, email), name=f"bench{n}", email=email, phone="0",
+                        password_hash=password_hash, category=category, is_verified=True)
+            db.add(user)
+            db.add(Settings(user_id=user.id, currency="INR" if category == "Milky" else "USD"))
+            db.add_all(
+                Expense(user_id=user.id, category=rng.choice(CATEGORIES),
+                        amount_minor=rng.randrange(100, 50000), currency=rng.choice(["USD", "INR"]),
+                        expense_date=start + timedelta(days=rng.randrange(days)),
+                        notes=rng.choice(NOTES) or None,
+                        expense_type=rng.choice(["regular", "additional"]))
+                for _ in range(expenses_per_user)
+            )
+            db.add_all(
+                Income(user_id=user.id, source=rng.choice(SOURCES),
+                       amount_minor=rng.randrange(10000, 500000), currency=rng.choice(["USD", "INR"]),
+                       income_date=start + timedelta(days=rng.randrange(days)),
+                       notes=rng.choice(NOTES) or None)
+                for _ in range(incomes_per_user)
+            )
+            emails.append(email)
+            db.commit()
+        finally:
+            db.close()
+    return emails
+
+
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    return TestClient(app)
+
+
+def login(test_client, email):
+    response = test_client.post("/auth/login", json={"email": email, "password": "pw"})
+    response.raise_for_status()
+    return response.json()["access_token"]
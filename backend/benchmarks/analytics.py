@@ -0,0 +1,90 @@
+"""Columnar snapshots versus SQL for analytics aggregates.
+
+Seeds one user with ``--rows`` expenses, then reports the time for a full
+export, an incremental refresh after a small edit, and the latency of a
+monthly/category aggregate answered by ``GET /analytics/aggregate`` against
+the same ``GROUP BY`` run in SQL. Needs pyarrow.
+
+Usage (from backend/):
+    python benchmarks/analytics.py [--rows 100000] [--format arrow|parquet]
+"""
+import argparse
+import os
+import statistics
+import time
+from datetime import datetime
+
+import _seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--format", choices=["arrow", "parquet"], default="arrow")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ["ANALYTICS_DIR"] = os.path.join(_seed.SCRATCH_DIR, "analytics")
+    os.environ["ANALYTICS_FORMAT"] = args.format
+    _seed.migrate()
+    email = _seed.seed(users=1, expenses_per_user=args.rows, incomes_per_user=0)[0]
+
+    from sqlalchemy import func, select, update
+    from app import analytics
+    from app.database import engine
+    from app.models import Expense
+
+    if not analytics.available():
+        raise SystemExit("pyarrow is not installed (pip install -r requirements-analytics.txt)")
+    analytics.WATERMARK_LAG = analytics.timedelta(0)
+
+    def timed(fn):
+        start = time.perf_counter()
+        result = fn()
+        return (time.perf_counter() - start) * 1000, result
+
+    def report(label, elapsed):
+        print(f"{label:<52} {elapsed:8.1f} ms")
+
+    with engine.connect() as conn:
+        elapsed, rebuilt = timed(lambda: analytics.refresh_user(conn, 1, full=True))
+        report(f"full export ({args.format}, {len(rebuilt['expenses'])} year files)", elapsed)
+        elapsed, _ = timed(lambda: analytics.refresh_user(conn, 1))
+        report("refresh, nothing changed", elapsed)
+    time.sleep(0.01)
+    with engine.begin() as conn:
+        conn.execute(update(Expense).where(Expense.id.in_([1, 2, 3])).values(
+            category="Edited", updated_at=datetime.utcnow()
+        ))
+    with engine.connect() as conn:
+        elapsed, rebuilt = timed(lambda: analytics.refresh_user(conn, 1))
+        report(f"refresh after editing 3 rows (years {rebuilt['expenses']})", elapsed)
+
+    client = _seed.client()
+    token = _seed.login(client, email)
+
+    def api():
+        response = client.get("/analytics/aggregate",
+                              params={"token": token, "group_by": "month,category,currency"})
+        response.raise_for_status()
+        return len(response.json()["rows"])
+
+    month = func.strftime("%Y-%m", Expense.expense_date)
+    sql_query = select(month, Expense.category, Expense.currency,
+                       func.sum(Expense.amount_minor), func.count()).where(
+        Expense.user_id == 1, Expense.deleted_at.is_(None)
+    ).group_by(month, Expense.category, Expense.currency)
+
+    def sql():
+        with engine.connect() as conn:
+            return len(conn.execute(sql_query).all())
+
+    for label, fn in (("GET /analytics/aggregate", api), ("SQL GROUP BY", sql)):
+        fn()
+        samples = [timed(fn) for _ in range(args.repeat)]
+        p50 = statistics.median(ms for ms, _ in samples)
+        print(f"{label:<52} {p50:8.1f} ms p50  ({samples[0][1]} groups)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Hot/cold archival: table sizes and route latency before and after.
+
+Seeds ``--users`` users with ``--expenses`` expenses each, spread over the
+last ``--years`` years, then times current-year listings, recent activity
+and a full-history listing, runs ``app.archive`` with ``--keep`` years hot,
+and times them again.
+
+Usage (from backend/):
+    python benchmarks/archive.py [--users 20] [--expenses 5000] [--years 8] [--keep 2]
+"""
+import argparse
+import os
+import statistics
+import time
+from datetime import date, timedelta
+
+import _seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--expenses", type=int, default=5000)
+    parser.add_argument("--years", type=int, default=8)
+    parser.add_argument("--keep", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ["ARCHIVE_HORIZON_CACHE_SECONDS"] = "0"
+    _seed.migrate()
+    today = date.today()
+    days = 365 * args.years
+    emails = _seed.seed(users=args.users, expenses_per_user=args.expenses, incomes_per_user=50,
+                        start=today - timedelta(days=days), days=days)
+
+    from sqlalchemy import text
+    from app import archive
+    from app.database import engine
+
+    client = _seed.client()
+    token = _seed.login(client, emails[0])
+
+    def p50(path, **params):
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            client.get(path, params={"token": token, **params}).raise_for_status()
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
+
+    def report(label):
+        with engine.connect() as conn:
+            hot = conn.execute(text("SELECT COUNT(*) FROM expenses")).scalar()
+            cold = conn.execute(text("SELECT COUNT(*) FROM expenses_archive")).scalar()
+        print(f"{label}: {hot} hot / {cold} archived expense rows")
+        for name, path, params in (
+            (f"GET /expenses?year={today.year}", "/expenses/", {"year": today.year}),
+            ("GET /dashboard/recent-activity", "/dashboard/recent-activity", {"limit": 10}),
+            ("GET /expenses (full history)", "/expenses/", {"fields": "id,amount,expense_date"}),
+        ):
+            print(f"  {name:<40} {p50(path, **params):8.1f} ms p50")
+
+    report("before")
+    # Seeded rows were just inserted; treat them as old enough to move
+    archive.ARCHIVE_MIN_AGE_DAYS = -1
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        moved, _ = archive.run(conn, today, years=args.keep)
+    print(f"archive run ({args.keep} years kept): {moved} in {(time.perf_counter() - start):.1f}s")
+    report("after")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Per-item endpoints versus ``POST /expenses/batch``.
+
+Recategorizes and then deletes ``--rows`` expenses: once with ``POST
+/expenses/batch`` and, for deletes, once with one ``DELETE /expenses/{id}``
+per row. Reports wall time, SQL statements and commits for each.
+
+Usage (from backend/):
+    python benchmarks/batch.py [--rows 500]
+"""
+import argparse
+import collections
+import time
+
+import _seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500)
+    args = parser.parse_args()
+
+    _seed.migrate()
+    email = _seed.seed(users=1, expenses_per_user=args.rows * 3, incomes_per_user=0)[0]
+
+    from sqlalchemy import event
+    from app.database import engine
+
+    counts = collections.Counter()
+    event.listen(engine, "before_cursor_execute", lambda *a: counts.update(["statements"]))
+    event.listen(engine, "commit", lambda *a: counts.update(["commits"]))
+
+    client = _seed.client()
+    token = _seed.login(client, email)
+    ids = [e["id"] for e in client.get("/expenses/", params={"token": token, "fields": "id"}).json()]
+
+    def measure(label, fn):
+        counts.clear()
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{label:<42} {elapsed:8.1f} ms  {counts['statements']:6d} statements  {counts['commits']:5d} commits")
+
+    def batch(operations):
+        response = client.post("/expenses/batch", params={"token": token}, json={"operations": operations})
+        response.raise_for_status()
+        assert response.json()["failed"] == 0, response.json()
+
+    recategorize = ids[:args.rows]
+    measure(f"batch: recategorize {args.rows}", lambda: batch(
+        [{"op": "update", "id": row_id, "changes": {"category": "Groceries"}} for row_id in recategorize]
+    ))
+    measure(f"batch: delete {args.rows}", lambda: batch(
+        [{"op": "delete", "id": row_id} for row_id in ids[args.rows:args.rows * 2]]
+    ))
+
+    def delete_one_by_one():
+        for row_id in ids[args.rows * 2:args.rows * 3]:
+            client.delete(f"/expenses/{row_id}", params={"token": token}).raise_for_status()
+    measure(f"DELETE /expenses/{{id}} x {args.rows}", delete_one_by_one)
+
+
+if __name__ == "__main__":
+    main()
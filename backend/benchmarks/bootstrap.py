@@ -0,0 +1,68 @@
+"""Latency of GET /dashboard/bootstrap versus the separate calls it replaces
+(settings, summary, recent activity, plans summary).
+
+Reports median/p95 wall time and SQL statements per page load. TestClient
+runs in-process, so the numbers exclude network RTT; on a real connection
+each avoided request also saves one round trip.
+
+Usage (from backend/):
+    python benchmarks/bootstrap.py [--rows 5000] [--iterations 200]
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime
+
+import _seed
+
+SEPARATE = [
+    ("/settings/", {}),
+    ("/dashboard/summary", {}),
+    ("/dashboard/recent-activity", {"limit": 3}),
+    ("/plans/summary", {"month": datetime.utcnow().month, "year": datetime.utcnow().year}),
+]
+
+
+def measure(client, calls, iterations):
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        for path, params in calls:
+            client.get(path, params=params).raise_for_status()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    _seed.migrate()
+    email = _seed.seed(users=1, expenses_per_user=args.rows, incomes_per_user=args.rows // 10)[0]
+
+    from sqlalchemy import event
+    from app.database import engine
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a, **k: statements.append(1))
+
+    with _seed.client() as client:
+        token = _seed.login(client, email)
+        client.params = {"token": token}
+        separate = [(path, dict(params)) for path, params in SEPARATE]
+        bootstrap = [("/dashboard/bootstrap", {})]
+
+        for label, calls in [("separate (4 requests)", separate), ("bootstrap (1 request)", bootstrap)]:
+            measure(client, calls, 5)  # warm up
+            statements.clear()
+            measure(client, calls, 1)
+            queries = len(statements)
+            median, p95 = measure(client, calls, args.iterations)
+            print(f"{label:<24} median {median:6.2f} ms   p95 {p95:6.2f} ms   {queries} SQL statements")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""One ``POST /auth/signup`` per user versus ``POST /auth/users/bulk``.
+
+Creates ``--users`` users each way and reports wall time, SQL statements and
+commits. Password hashing dominates both; the bulk endpoint spreads it over
+``BULK_HASH_PROCESSES`` processes (default: one per CPU).
+
+Usage (from backend/):
+    python benchmarks/bulk_users.py [--users 200]
+"""
+import argparse
+import collections
+import os
+import time
+
+import _seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ["RATE_LIMIT_ENABLED"] = "0"
+    os.environ.setdefault("ADMIN_API_KEY", "bench-admin-key")
+    _seed.migrate()
+
+    from sqlalchemy import event
+    from app.database import engine
+
+    counts = collections.Counter()
+    event.listen(engine, "before_cursor_execute", lambda *a: counts.update(["statements"]))
+    event.listen(engine, "commit", lambda *a: counts.update(["commits"]))
+
+    client = _seed.client()
+
+    def users(prefix):
+        return [{"name": f"{prefix}{n}", "email": f"{prefix}{n}@example.com", "phone": "0",
+                 "category": "Milky" if n % 2 else "Mocha", "password": f"pw{n}"}
+                for n in range(args.users)]
+
+    def measure(label, fn):
+        counts.clear()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        print(f"{label:<36} {elapsed:8.2f} s  {counts['statements']:6d} statements  {counts['commits']:5d} commits")
+
+    def one_by_one():
+        for user in users("signup"):
+            client.post("/auth/signup", json=user).raise_for_status()
+
+    def bulk():
+        response = client.post("/auth/users/bulk", json={"users": users("bulk")},
+                               headers={"X-Admin-Key": os.environ["ADMIN_API_KEY"]})
+        response.raise_for_status()
+        assert response.json()["failed"] == 0, response.json()
+
+    measure(f"POST /auth/signup x {args.users}", one_by_one)
+    measure(f"POST /auth/users/bulk ({args.users})", bulk)
+
+
+if __name__ == "__main__":
+    main()
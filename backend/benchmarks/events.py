@@ -0,0 +1,132 @@
+"""Idle-connection cost and push latency of ``GET /events``.
+
+Starts a real server, opens ``--connections`` event streams spread over
+``--users`` users, and reports the server's RSS growth per idle stream. Then
+creates an expense for user 0 several times and measures how long until
+every one of user 0's streams receives the ``change`` event, and checks the
+other users' streams stay quiet. With ``--workers 2`` writes and streams
+land on different processes, so delivery goes through the
+``user_versions`` poller (``EVENTS_POLL_SECONDS``).
+
+Usage (from backend/):
+    python benchmarks/events.py [--connections 1000] [--users 10] [--workers 1]
+"""
+import argparse
+import asyncio
+import resource
+import time
+
+import httpx
+
+import _seed
+from _server import Server, percentile
+
+
+def rss_kb(pid):
+    total = 0
+    for child in [pid] + children(pid):
+        try:
+            with open(f"/proc/{child}/status") as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+        except (FileNotFoundError, StopIteration):
+            pass
+    return total
+
+
+def children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except FileNotFoundError:
+        return []
+
+
+class Stream:
+    def __init__(self, user):
+        self.user = user
+        self.changes = []  # arrival times of "change" events
+
+    async def open(self, port, token):
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+        self.writer.write(
+            f"GET /events/?token={token} HTTP/1.1\r\nHost: bench\r\n"
+            f"Accept: text/event-stream\r\n\r\n".encode()
+        )
+        await self.writer.drain()
+        # Wait for the "ready" event so the stream is subscribed
+        while b"event: ready" not in await self.reader.readline():
+            pass
+        self.task = asyncio.create_task(self.listen())
+
+    async def listen(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return
+            if line.startswith(b"event: change"):
+                self.changes.append(time.perf_counter())
+
+    def close(self):
+        self.task.cancel()
+        self.writer.close()
+
+
+async def run(server, tokens, args):
+    streams = [Stream(n % len(tokens)) for n in range(args.connections)]
+    base_rss = rss_kb(server.proc.pid)
+    for start in range(0, len(streams), 100):
+        await asyncio.gather(*(s.open(server.port, tokens[s.user]) for s in streams[start:start + 100]))
+    await asyncio.sleep(1)
+    grown = rss_kb(server.proc.pid) - base_rss
+    print(f"{len(streams)} idle streams: server RSS +{grown / 1024:.1f} MiB "
+          f"({grown / len(streams):.1f} KiB per stream)")
+
+    mine = [s for s in streams if s.user == 0]
+    others = [s for s in streams if s.user != 0]
+    latencies = []
+    async with httpx.AsyncClient(base_url=server.url, timeout=30) as client:
+        for round_number in range(args.rounds):
+            start = time.perf_counter()
+            response = await client.post("/expenses/", params={"token": tokens[0]}, json={
+                "category": "Push", "amount": 1, "currency": "USD",
+                "expense_date": time.strftime("%Y-%m-%d"),
+            })
+            response.raise_for_status()
+            deadline = time.time() + 10
+            while any(len(s.changes) <= round_number for s in mine) and time.time() < deadline:
+                await asyncio.sleep(0.005)
+            latencies += [(s.changes[round_number] - start) * 1000 for s in mine if len(s.changes) > round_number]
+            await asyncio.sleep(0.2)
+
+    expected = len(mine) * args.rounds
+    print(f"write -> change event for user 0 ({len(mine)} streams x {args.rounds} writes): "
+          f"{len(latencies)}/{expected} delivered, p50 {percentile(latencies, 50):.1f} ms, "
+          f"p99 {percentile(latencies, 99):.1f} ms")
+    print(f"events on other users' streams: {sum(len(s.changes) for s in others)} (expected 0)")
+    for stream in streams:
+        stream.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = min(hard, args.connections * 2 + 256)
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+
+    _seed.migrate()
+    emails = _seed.seed(users=args.users, expenses_per_user=200, incomes_per_user=20)
+    tokens = [_seed.login(_seed.client(), email) for email in emails]
+    env = {"RATE_LIMIT_ENABLED": "0", "EVENTS_MAX_CONNECTIONS": str(args.connections + 100)}
+    with Server(env=env, workers=args.workers, args=("--limit-concurrency", str(args.connections * 2))) as server:
+        asyncio.run(run(server, tokens, args))
+
+
+if __name__ == "__main__":
+    main()
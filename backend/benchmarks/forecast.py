@@ -0,0 +1,60 @@
+"""Month-end forecasts: one vectorized batch versus one user at a time.
+
+Seeds ``--users`` users, then times ``app.forecast.store_all`` (the nightly
+job) against computing each user's forecast separately, and reports the
+latency of ``GET /dashboard/forecast`` when served from the nightly result
+and from the in-process cache.
+
+Usage (from backend/):
+    python benchmarks/forecast.py [--users 500] [--expenses 400]
+"""
+import argparse
+import statistics
+import time
+from datetime import date, timedelta
+
+import _seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--expenses", type=int, default=400, help="per user, over the last 120 days")
+    args = parser.parse_args()
+
+    _seed.migrate()
+    today = date.today()
+    emails = _seed.seed(users=args.users, expenses_per_user=args.expenses, incomes_per_user=10,
+                        start=today - timedelta(days=120), days=121)
+
+    from app import forecast
+    from app.database import engine
+    from app.routes.dashboard import forecast_cache
+
+    def timed(fn):
+        start = time.perf_counter()
+        fn()
+        return (time.perf_counter() - start) * 1000
+
+    with engine.connect() as conn:
+        elapsed = timed(lambda: forecast.store_all(conn, today))
+        print(f"nightly batch, {args.users} users               {elapsed:8.1f} ms")
+        users = [(user_id, "USD", 81.0) for user_id in range(1, args.users + 1)]
+        elapsed = timed(lambda: [forecast.forecast_users(conn, [user], today) for user in users])
+        print(f"one user at a time, {args.users} users          {elapsed:8.1f} ms")
+
+    client = _seed.client()
+    tokens = [_seed.login(client, email) for email in emails[:20]]
+
+    def request(token):
+        client.get("/dashboard/forecast", params={"token": token}).raise_for_status()
+
+    forecast_cache.clear()
+    stored = [timed(lambda: request(token)) for token in tokens]
+    cached = [timed(lambda: request(token)) for token in tokens]
+    print(f"GET /dashboard/forecast, nightly result      {statistics.median(stored):8.1f} ms p50")
+    print(f"GET /dashboard/forecast, cached              {statistics.median(cached):8.1f} ms p50")
+
+
+if __name__ == "__main__":
+    main()
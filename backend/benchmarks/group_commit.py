@@ -0,0 +1,74 @@
+"""``POST /expenses`` throughput and latency under concurrent load, with each
+request committing on its own versus group commit (``GROUP_COMMIT_MS``).
+
+Each phase starts a uvicorn server with ``--workers`` processes. It then
+runs ``--clients`` threads that create expenses as fast as they can for
+``--seconds``, and reports requests/s, p50/p99 latency and response codes
+(SQLite lock timeouts show up as 500s).
+
+Usage (from backend/):
+    python benchmarks/group_commit.py [--seconds 10] [--clients 32] [--workers 2] [--window-ms 2 5]
+"""
+import argparse
+import collections
+import threading
+import time
+from datetime import date
+
+import httpx
+
+import _seed
+from _server import Server, percentile
+
+
+def client_loop(url, token, stop, samples, codes):
+    body = {"category": "Food", "amount": 12.5, "expense_date": str(date.today()), "currency": "USD"}
+    with httpx.Client(base_url=url, timeout=60) as client:
+        while not stop.is_set():
+            start = time.perf_counter()
+            response = client.post("/expenses/", params={"token": token}, json=body)
+            samples.append((time.perf_counter() - start) * 1000)
+            codes[response.status_code] += 1
+
+
+def run_phase(name, env, args, emails):
+    with Server(env=env, workers=args.workers) as server:
+        tokens = [httpx.post(f"{server.url}/auth/login", json={"email": email, "password": "pw"})
+                  .json()["access_token"] for email in emails]
+        stop = threading.Event()
+        samples, codes = [], collections.Counter()
+        threads = [threading.Thread(target=client_loop,
+                                    args=(server.url, tokens[n % len(tokens)], stop, samples, codes))
+                   for n in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    created = codes[200]
+    status = ", ".join(f"{code}: {count}" for code, count in sorted(codes.items())) or "-"
+    print(f"{name:<22} {created / args.seconds:8.1f} creates/s  p50 {percentile(samples, 50):7.1f} ms"
+          f"  p99 {percentile(samples, 99):7.1f} ms   responses {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--window-ms", type=float, nargs="+", default=[2, 5])
+    args = parser.parse_args()
+
+    _seed.migrate()
+    emails = _seed.seed(users=args.users, expenses_per_user=1000, incomes_per_user=0)
+
+    env = {"RATE_LIMIT_ENABLED": "0"}
+    run_phase("commit per request", {**env, "GROUP_COMMIT_MS": "0"}, args, emails)
+    for window in args.window_ms:
+        run_phase(f"group commit {window:g} ms", {**env, "GROUP_COMMIT_MS": str(window)}, args, emails)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Bytes-on-wire and server CPU for large expense listings.
+
+Compares the full listing against sparse fieldsets, each uncompressed, gzip
+and brotli (when installed).
+
+Usage (from backend/):
+    python benchmarks/list_payload.py [--rows 20000] [--repeat 5]
+"""
+import argparse
+import time
+
+import _seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    _seed.migrate()
+    email = _seed.seed(users=1, expenses_per_user=args.rows, incomes_per_user=0)[0]
+    from app.compression import ENCODERS
+
+    with _seed.client() as client:
+        token = _seed.login(client, email)
+        variants = [
+            ("all columns", None),
+            ("id,amount,expense_date", "id,amount,expense_date"),
+            ("id,category,amount,expense_date,currency", "id,category,amount,expense_date,currency"),
+        ]
+        encodings = ["identity", *ENCODERS]
+        print(f"{args.rows} expenses, median of {args.repeat} requests\n")
+        print(f"{'fields':<44}{'encoding':<10}{'bytes':>12}{'cpu ms':>10}")
+        for label, fields in variants:
+            params = {"token": token}
+            if fields:
+                params["fields"] = fields
+            for encoding in encodings:
+                cpu, size = [], 0
+                for _ in range(args.repeat):
+                    # TestClient runs the app in-process, so process time is
+                    # server work plus a small, constant client overhead
+                    t0 = time.process_time()
+                    response = client.get("/expenses/", params=params,
+                                          headers={"Accept-Encoding": encoding})
+                    cpu.append((time.process_time() - t0) * 1000)
+                    size = int(response.headers.get("content-length", len(response.content)))
+                cpu.sort()
+                print(f"{label:<44}{encoding:<10}{size:>12,}{cpu[len(cpu) // 2]:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Credential-stuffing burst against /auth/login while measuring the p99 of
+an ordinary endpoint (/dashboard/summary).
+
+Three phases against a real uvicorn process:
+  idle         no burst, baseline latency
+  unprotected  burst with rate limiting off and an unbounded bcrypt queue
+  protected    burst with the default limiter and bounded bcrypt queue
+
+Usage (from backend/):
+    python benchmarks/login_burst.py [--seconds 10] [--attackers 32]
+"""
+import argparse
+import collections
+import threading
+import time
+
+import httpx
+
+import _seed
+from _server import Server, percentile
+
+
+def probe(url, token, stop, samples):
+    with httpx.Client(base_url=url, timeout=30) as client:
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            client.get("/dashboard/summary", params={"token": token})
+            samples.append((time.perf_counter() - t0) * 1000)
+            time.sleep(0.01)
+
+
+def attacker(url, email, stop, codes):
+    with httpx.Client(base_url=url, timeout=30) as client:
+        n = 0
+        while not stop.is_set():
+            n += 1
+            response = client.post("/auth/login", json={"email": email, "password": f"guess{n}"})
+            codes[response.status_code] += 1
+
+
+def run_phase(name, env, seconds, attackers, email):
+    with Server(env=env) as server:
+        token = httpx.post(f"{server.url}/auth/login",
+                           json={"email": email, "password": "pw"}).json()["access_token"]
+        stop = threading.Event()
+        samples, codes = [], collections.Counter()
+        threads = [threading.Thread(target=probe, args=(server.url, token, stop, samples))]
+        threads += [threading.Thread(target=attacker, args=(server.url, email, stop, codes))
+                    for _ in range(attackers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    status = ", ".join(f"{code}: {count}" for code, count in sorted(codes.items())) or "-"
+    print(f"{name:<12} summary p50 {percentile(samples, 50):7.1f} ms  p99 {percentile(samples, 99):7.1f} ms"
+          f"   login responses {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--attackers", type=int, default=32)
+    args = parser.parse_args()
+
+    _seed.migrate()
+    email = _seed.seed(users=1, expenses_per_user=2000, incomes_per_user=200)[0]
+    # Generous enough that the victim's own login above is never throttled
+    limits = {"LOGIN_EMAIL_RATE": "5/60", "LOGIN_IP_RATE": "20/60"}
+
+    run_phase("idle", {"RATE_LIMIT_ENABLED": "0"}, args.seconds, 0, email)
+    run_phase("unprotected", {"RATE_LIMIT_ENABLED": "0", "HASH_QUEUE_LIMIT": "100000"},
+              args.seconds, args.attackers, email)
+    run_phase("protected", limits, args.seconds, args.attackers, email)
+
+
+if __name__ == "__main__":
+    main()
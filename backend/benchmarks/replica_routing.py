@@ -0,0 +1,66 @@
+"""Local check of read/write routing with two SQLite files.
+
+The primary is migrated and seeded, then copied to a replica file (standing
+in for replication). The script counts statements per database while it:
+  1. reads as a user who has not written recently  -> replica
+  2. creates an expense                            -> primary
+  3. reads again immediately                       -> primary (read-your-writes)
+  4. reads after READ_AFTER_WRITE_SECONDS          -> replica
+
+Usage (from backend/):
+    python benchmarks/replica_routing.py
+"""
+import collections
+import os
+import sqlite3
+import time
+
+import _seed
+
+REPLICA_PATH = os.path.join(_seed.SCRATCH_DIR, "replica.db")
+os.environ["DATABASE_READ_URL"] = f"sqlite:///{REPLICA_PATH}"
+os.environ.setdefault("READ_AFTER_WRITE_SECONDS", "1")
+
+
+def copy_primary_to_replica():
+    primary = sqlite3.connect(os.environ["DATABASE_URL"].replace("sqlite:///", "", 1))
+    replica = sqlite3.connect(REPLICA_PATH)
+    primary.backup(replica)
+    primary.close()
+    replica.close()
+
+
+def main():
+    _seed.migrate()
+    email = _seed.seed(users=1, expenses_per_user=200, incomes_per_user=20)[0]
+
+    from sqlalchemy import event
+    from app import database
+
+    counts = collections.Counter()
+    event.listen(database.engine, "before_cursor_execute", lambda *a, **k: counts.update(["primary"]))
+    event.listen(database.read_engine, "before_cursor_execute", lambda *a, **k: counts.update(["replica"]))
+
+    with _seed.client() as client:
+        token = _seed.login(client, email)
+        copy_primary_to_replica()
+        time.sleep(float(os.environ["READ_AFTER_WRITE_SECONDS"]))
+
+        def step(label, fn):
+            counts.clear()
+            fn()
+            print(f"{label:<36} primary {counts['primary']:>2}   replica {counts['replica']:>2}")
+
+        params = {"token": token}
+        step("read (no recent write)", lambda: client.get("/dashboard/bootstrap", params=params).raise_for_status())
+        step("create expense", lambda: client.post("/expenses/", params=params, json={
+            "category": "Food", "amount": 5, "currency": "USD", "expense_date": time.strftime("%Y-%m-%d"),
+        }).raise_for_status())
+        step("read right after write", lambda: client.get("/dashboard/bootstrap", params=params).raise_for_status())
+        time.sleep(float(os.environ["READ_AFTER_WRITE_SECONDS"]) + 0.1)
+        copy_primary_to_replica()
+        step("read after the sticky window", lambda: client.get("/dashboard/bootstrap", params=params).raise_for_status())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Local check of sharded placement and rebalancing with N SQLite files.
+
+Seeds users across the shards, reports rows per shard, logs in as one user
+and reads their dashboard (statements counted per shard), then moves that
+user to another shard with ``app.rebalance`` and repeats the read.
+
+Usage (from backend/):
+    python benchmarks/sharding.py [--shards 3] [--users 6]
+"""
+import argparse
+import collections
+import os
+import sqlite3
+import time
+
+import _seed
+
+
+def configure(shards):
+    urls = [f"sqlite:///{_seed.SCRATCH_DIR}/shard{n}.db" for n in range(1, shards)]
+    os.environ["DATABASE_SHARD_URLS"] = ",".join(urls)
+    # Nothing else writes during the move, so time the copy alone
+    os.environ.setdefault("REBALANCE_DRAIN_SECONDS", "0")
+
+
+def rows_per_shard():
+    from app.database import shard_engines
+    counts = []
+    for shard_engine in shard_engines:
+        conn = sqlite3.connect(shard_engine.url.database)
+        counts.append(tuple(
+            conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("users", "expenses", "incomes")
+        ))
+        conn.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shards", type=int, default=3)
+    parser.add_argument("--users", type=int, default=6)
+    args = parser.parse_args()
+    configure(args.shards)
+
+    _seed.migrate()
+    emails = _seed.seed(users=args.users, expenses_per_user=500, incomes_per_user=50)
+
+    from sqlalchemy import event
+    from app.database import shard_engines
+    from app.rebalance import rebalance
+
+    statements = collections.Counter()
+    for index, shard_engine in enumerate(shard_engines):
+        event.listen(shard_engine, "before_cursor_execute",
+                     lambda *a, index=index: statements.update([index]))
+
+    def report(label):
+        print(f"\n{label}")
+        for index, (users, expenses, incomes) in enumerate(rows_per_shard()):
+            print(f"  shard {index}: {users} users, {expenses} expenses, {incomes} incomes")
+
+    report("Placement after seeding (user_id % shards)")
+
+    client = _seed.client()
+    email = emails[1]
+    token = _seed.login(client, email)
+
+    def read_dashboard(label):
+        statements.clear()
+        start = time.perf_counter()
+        response = client.get("/dashboard/bootstrap", params={"token": token})
+        elapsed = (time.perf_counter() - start) * 1000
+        response.raise_for_status()
+        per_shard = ", ".join(f"shard {i}: {statements[i]}" for i in range(len(shard_engines)))
+        print(f"{label}: {elapsed:.1f} ms  statements -> {per_shard}  "
+              f"savings {response.json()['summary']['savings']}")
+
+    read_dashboard(f"\n{email} dashboard")
+    with shard_engines[0].connect() as conn:
+        current = conn.exec_driver_sql(
+            "SELECT shard FROM shard_directory WHERE email = ?", (email,)
+        ).scalar_one()
+    target = (current + 1) % len(shard_engines)
+    start = time.perf_counter()
+    copied, _ = rebalance(email, target)
+    print(f"\nMoved {email} to shard {target} in {(time.perf_counter() - start) * 1000:.1f} ms: {copied}")
+    read_dashboard(f"{email} dashboard")
+    report("Placement after the move")
+
+
+if __name__ == "__main__":
+    main()
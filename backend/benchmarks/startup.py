@@ -0,0 +1,83 @@
+"""Cold-start benchmark for the API process.
+
+Measures, in fresh interpreters:
+  * wall time to ``import app.main``
+  * wall time for the lifespan startup hook (schema version check)
+  * self+cumulative import time of the heavy modules, from ``-X importtime``
+
+Usage (from backend/, against a migrated database):
+    python benchmarks/startup.py [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WATCHED = ["passlib", "jose", "cryptography", "app.email_service", "app.security",
+           "sqlalchemy", "fastapi", "app.main"]
+
+TIMING_SNIPPET = """
+import time
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+app.main.startup()
+t2 = time.perf_counter()
+print(f"{(t1 - t0) * 1000:.1f} {(t2 - t1) * 1000:.1f}")
+"""
+
+
+def _run(args, **kwargs):
+    return subprocess.run([sys.executable, *args], cwd=BACKEND_DIR,
+                          capture_output=True, text=True, check=True, **kwargs)
+
+
+def time_startup(runs):
+    imports, boots = [], []
+    for _ in range(runs):
+        out = _run(["-c", TIMING_SNIPPET]).stdout.strip().splitlines()[-1]
+        imp, boot = out.split()
+        imports.append(float(imp))
+        boots.append(float(boot))
+    return imports, boots
+
+
+def import_profile():
+    """Return {module: (self_us, cumulative_us)} for the watched top-level modules."""
+    err = _run(["-X", "importtime", "-c", "import app.main"]).stderr
+    profile = {}
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cum_us, name = [p.strip() for p in line[len("import time:"):].split("|")]
+        if name in WATCHED and self_us.isdigit():
+            profile[name] = (int(self_us), int(cum_us))
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    imports, boots = time_startup(args.runs)
+    print(f"import app.main : median {statistics.median(imports):7.1f} ms  "
+          f"(min {min(imports):.1f}, max {max(imports):.1f})")
+    print(f"startup()       : median {statistics.median(boots):7.1f} ms  "
+          f"(min {min(boots):.1f}, max {max(boots):.1f})")
+
+    print("\nImport profile (ms, self / cumulative; absent = not imported at boot)")
+    profile = import_profile()
+    for name in WATCHED:
+        if name in profile:
+            self_us, cum_us = profile[name]
+            print(f"  {name:<20} {self_us / 1000:7.1f} / {cum_us / 1000:7.1f}")
+        else:
+            print(f"  {name:<20} {'-':>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Throughput of /dashboard/summary versus number of worker processes, plus
+a cross-worker read-your-writes check.
+
+For each worker count a real server is started (gunicorn with uvicorn
+workers when available, otherwise ``uvicorn --workers``). Client processes
+hammer the endpoint for a fixed time. Then, for a few rounds, one expense is
+created and the summary is immediately read several times; reads are spread
+over all workers and each must already include the new expense.
+
+Usage (from backend/):
+    python benchmarks/worker_scaling.py [--workers 1,2,4] [--seconds 10] [--clients 8]
+"""
+import argparse
+import multiprocessing
+import shutil
+import time
+
+import httpx
+
+import _seed
+from _server import Server, free_port
+
+
+def client_loop(url, token, seconds, results):
+    done = 0
+    deadline = time.time() + seconds
+    with httpx.Client(base_url=url, timeout=30) as client:
+        while time.time() < deadline:
+            client.get("/dashboard/summary", params={"token": token}).raise_for_status()
+            done += 1
+    results.put(done)
+
+
+def gunicorn_server(workers):
+    port = free_port()
+    server = Server(env={"WEB_CONCURRENCY": str(workers), "PORT": str(port)})
+    server.port, server.url = port, f"http://127.0.0.1:{port}"
+    server.cmd = ["gunicorn", "app.main:app", "-c", "gunicorn.conf.py",
+                  "--bind", f"127.0.0.1:{port}", "--access-logfile", "/dev/null",
+                  "--log-level", "warning"]
+    return server
+
+
+def check_read_your_writes(url, token, rounds=20, reads=8):
+    stale = 0
+    with httpx.Client(base_url=url, timeout=30) as client:
+        # New connection per read so requests land on different workers
+        for n in range(rounds):
+            before = client.get("/dashboard/summary", params={"token": token}).json()["totalExpense"]
+            client.post("/expenses/", params={"token": token}, json={
+                "category": "Check", "amount": 1, "currency": "USD",
+                "expense_date": time.strftime("%Y-%m-%d"),
+            }).raise_for_status()
+            for _ in range(reads):
+                with httpx.Client(base_url=url, timeout=30) as fresh:
+                    after = fresh.get("/dashboard/summary", params={"token": token}).json()["totalExpense"]
+                if after == before:
+                    stale += 1
+    return stale, rounds * reads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=8)
+    args = parser.parse_args()
+
+    _seed.migrate()
+    email = _seed.seed(users=1, expenses_per_user=5000, incomes_per_user=500)[0]
+    use_gunicorn = shutil.which("gunicorn") is not None
+    print(f"server: {'gunicorn + uvicorn workers' if use_gunicorn else 'uvicorn --workers'}, "
+          f"{multiprocessing.cpu_count()} CPUs, {args.clients} client processes\n")
+
+    for workers in [int(w) for w in args.workers.split(",")]:
+        server = gunicorn_server(workers) if use_gunicorn else Server(workers=workers)
+        with server:
+            token = httpx.post(f"{server.url}/auth/login",
+                               json={"email": email, "password": "pw"}).json()["access_token"]
+            results = multiprocessing.Queue()
+            procs = [multiprocessing.Process(target=client_loop,
+                                             args=(server.url, token, args.seconds, results))
+                     for _ in range(args.clients)]
+            for proc in procs:
+                proc.start()
+            total = sum(results.get() for _ in procs)
+            for proc in procs:
+                proc.join()
+            stale, reads = check_read_your_writes(server.url, token)
+        print(f"{workers} worker(s): {total / args.seconds:8.1f} req/s   "
+              f"stale reads after write: {stale}/{reads}")
+
+
+if __name__ == "__main__":
+    main()
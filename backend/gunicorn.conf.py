@@ -0,0 +1,28 @@
+"""Multi-worker serving: gunicorn managing uvicorn workers.
+
+    gunicorn app.main:app -c gunicorn.conf.py
+
+Worker count comes from WEB_CONCURRENCY (default: one per CPU). Workers
+share nothing in memory; per-user caches are kept consistent through the
+``user_versions`` table (see app/cache.py). With SQLite, point
+RATE_LIMIT_DB at a file so login throttling is shared too. Behind a proxy,
+set FORWARDED_ALLOW_IPS so client IPs are the real ones.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+# Import the app once in the master so workers fork with it loaded
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = 20
+keepalive = 5
+accesslog = "-"
+# Proxies whose X-Forwarded-For / X-Forwarded-Proto are trusted: comma
+# separated IPs, or "*". Login and signup are rate limited per client IP, so
+# behind a platform load balancer this must cover it; otherwise every request
+# seems to come from the proxy and all clients share one bucket. Use "*" only
+# when the app cannot be reached except through the proxy.
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
@@ -0,0 +1,104 @@
+"""Shared fixtures: a migrated scratch SQLite database seeded with two users
+(plus their analytics snapshots), a TestClient, and a login token per seeded
+user.
+
+DATABASE_URL is set before anything from ``app`` is imported.
+"""
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SCRATCH_DIR = tempfile.mkdtemp(prefix="mm-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{SCRATCH_DIR}/test.db"
+os.environ.pop("DATABASE_READ_URL", None)
+os.environ.pop("DATABASE_SHARD_URLS", None)
+os.environ["ANALYTICS_DIR"] = os.path.join(SCRATCH_DIR, "analytics")
+os.environ["EVENTS_POLL_SECONDS"] = "0"
+os.environ["ADMIN_API_KEY"] = ADMIN_KEY = "test-admin-key"
+
+PASSWORD = "pw"
+EMAILS = ["alice@example.com", "bob@example.com"]
+
+
+def _seed():
+    from app import analytics, migrations
+    from app.database import SessionLocal, engine
+    from app.models import Expense, Income, SavingPlan, Settings, User
+    from app.security import get_password_hash
+    from app.sharding import register_user
+
+    migrations.upgrade(engine)
+    password_hash = get_password_hash(PASSWORD)
+    today = date.today()
+    for n, email in enumerate(EMAILS):
+        db = SessionLocal()
+        try:
+            user = User(id=register_user(db, email), name=email.split("@")[0], email=email, phone="0",
+                        password_hash=password_hash, category="Milky" if n else "Mocha", is_verified=True)
+            db.add(user)
+            db.add(Settings(user_id=user.id, currency="INR" if n else "USD"))
+            for day in range(0, 120, 3):
+                db.add(Expense(user_id=user.id, category=("Food", "Rent", "Travel")[day % 3],
+                               amount_minor=1000 + day, currency=("USD", "INR")[day % 2],
+                               expense_date=today - timedelta(days=day), notes="weekly groceries",
+                               expense_type=("regular", "additional")[day % 2]))
+            for day in range(0, 120, 15):
+                db.add(Income(user_id=user.id, source="Salary", amount_minor=500000, currency="USD",
+                              income_date=today - timedelta(days=day)))
+            db.add(SavingPlan(user_id=user.id, category="Trip", amount_minor=20000,
+                              month=today.month, year=today.year))
+            db.commit()
+            with engine.connect() as conn:
+                analytics.refresh_user(conn, user.id, full=True)
+        finally:
+            db.close()
+
+
+def create_user(email: str) -> str:
+    """Create a verified user without any data; returns an access token.
+
+    For tests that change or delete a user's data, so the seeded users stay
+    as the query-plan cases expect them.
+    """
+    from app.database import SessionLocal
+    from app.models import Settings, User
+    from app.security import create_access_token
+    from app.sharding import register_user
+
+    db = SessionLocal()
+    try:
+        user_id = register_user(db, email)
+        db.add(User(id=user_id, name=email.split("@")[0], email=email, phone="0",
+                    password_hash="-", category="Mocha", is_verified=True))
+        db.add(Settings(user_id=user_id, currency="USD"))
+        db.commit()
+    finally:
+        db.close()
+    return create_access_token(data={"sub": email})
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    _seed()
+    from app.main import app
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def tokens(client):
+    """Access tokens for ``EMAILS``, in the same order."""
+    tokens = []
+    for email in EMAILS:
+        response = client.post("/auth/login", json={"email": email, "password": PASSWORD})
+        response.raise_for_status()
+        tokens.append(response.json()["access_token"])
+    return tokens
@@ -0,0 +1,121 @@
+"""Hot/cold archival (``app/archive.py``) as seen through the API."""
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app import archive
+
+
+@pytest.fixture
+def archived(client, monkeypatch):
+    """Archive every seeded row dated more than 60 days ago; restore afterwards."""
+    from app.database import engine
+
+    monkeypatch.setattr(archive, "ARCHIVE_HORIZON_CACHE_SECONDS", 0)
+    # Horizons cached while archived are dropped again on teardown
+    monkeypatch.setattr(archive, "_horizons", {})
+    cutoff = date.today() - timedelta(days=60)
+    # Seeded rows were just written; pretend they are old enough to move
+    now = datetime.utcnow() + timedelta(days=archive.ARCHIVE_MIN_AGE_DAYS + 1)
+    with engine.connect() as conn:
+        moved = sum(archive.archive_table(conn, model, cutoff, now) for model in archive.ARCHIVES)
+    assert moved > 0
+    yield cutoff
+    with engine.connect() as conn:
+        for model in archive.ARCHIVES:
+            archive.unarchive_table(conn, model, None)
+
+
+def test_search_finds_archived_rows(client, tokens, archived):
+    response = client.get("/search/", params={"q": "groceries", "limit": 100, "token": tokens[0]})
+    response.raise_for_status()
+    dates = [date.fromisoformat(hit["date"]) for hit in response.json()["results"]]
+    # Seeded expenses every third day over 120 days, all noted "weekly groceries"
+    assert any(day < archived for day in dates)
+    assert len(dates) >= 40
+
+
+def _aggregate_years(client, token):
+    response = client.get("/analytics/aggregate", params={"token": token, "group_by": "year"})
+    response.raise_for_status()
+    return {row["year"] for row in response.json()["rows"]}
+
+
+def test_delete_all_removes_archived_rows_and_resets_sync(client, monkeypatch):
+    from conftest import create_user
+
+    token = create_user("archived@example.com")
+    old = date.today() - timedelta(days=400)
+    for n in range(3):
+        client.post("/expenses/", params={"token": token}, json={
+            "category": "Old", "amount": 10 + n, "expense_date": str(old), "currency": "USD",
+            "notes": "archived receipt",
+        }).raise_for_status()
+    # A newer row keeps the newest id hot, as archive_table requires
+    client.post("/expenses/", params={"token": token}, json={
+        "category": "New", "amount": 1, "expense_date": str(date.today()), "currency": "USD",
+    }).raise_for_status()
+    cursor = client.get("/sync/", params={"token": token}).json()["cursor"]
+
+    from app import analytics
+    from app.database import engine
+    from app.models import Expense, ExpenseArchive, User
+
+    monkeypatch.setattr(archive, "ARCHIVE_HORIZON_CACHE_SECONDS", 0)
+    monkeypatch.setattr(archive, "_horizons", {})
+    now = datetime.utcnow() + timedelta(days=archive.ARCHIVE_MIN_AGE_DAYS + 1)
+    with engine.connect() as conn:
+        assert archive.archive_table(conn, Expense, date.today() - timedelta(days=300), now) >= 3
+        user_id = conn.execute(select(User.id).where(User.email == "archived@example.com")).scalar()
+        analytics.refresh_user(conn, user_id)
+    assert _aggregate_years(client, token) == {old.year, date.today().year}
+
+    client.delete("/auth/data", params={"token": token}).raise_for_status()
+    with engine.connect() as conn:
+        # Incremental: the hard-deleted archived rows leave nothing past the watermark
+        analytics.refresh_user(conn, user_id)
+    assert _aggregate_years(client, token) == set()
+
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        # Deleted for good, not moved back to the hot table as tombstones
+        assert db.query(ExpenseArchive).filter(ExpenseArchive.category == "Old").count() == 0
+        assert db.query(Expense).filter(Expense.category == "Old").count() == 0
+    finally:
+        db.close()
+    found = client.get("/search/", params={"q": "archived receipt", "token": token}).json()
+    assert found["results"] == []
+
+    synced = client.get("/sync/", params={"token": token, "since": cursor}).json()
+    assert synced["full"] is True
+    assert synced["expenses"] == []
+
+    with engine.connect() as conn:
+        for model in archive.ARCHIVES:
+            archive.unarchive_table(conn, model, None)
+
+
+def test_purge_tombstones_keeps_recent_and_newest(client):
+    from conftest import create_user
+    from app.database import engine
+    from app.models import Expense
+
+    token = create_user("purge@example.com")
+    ids = [client.post("/expenses/", params={"token": token}, json={
+        "category": "Gone", "amount": 1, "expense_date": str(date.today()), "currency": "USD",
+    }).json()["id"] for _ in range(3)]
+    for expense_id in ids:
+        client.delete(f"/expenses/{expense_id}", params={"token": token}).raise_for_status()
+
+    table = Expense.__table__
+    later = datetime.utcnow() + timedelta(days=archive.TOMBSTONE_RETENTION_DAYS + 1)
+    with engine.connect() as conn:
+        archive.purge_tombstones(conn, Expense, datetime.utcnow())
+        assert len(conn.execute(table.select().where(table.c.id.in_(ids))).all()) == 3
+
+        assert archive.purge_tombstones(conn, Expense, later) >= 2
+        remaining = conn.execute(table.select().where(table.c.id.in_(ids))).all()
+    # The newest id stays so SQLite never hands it out again
+    assert [row.id for row in remaining] == ids[-1:]
@@ -0,0 +1,120 @@
+"""Group commit of single-row creates (``app/group_commit.py``)."""
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+import pytest
+
+from app import group_commit
+from app.models import Expense
+
+WAITERS = 20
+
+
+@pytest.fixture
+def writer(client, monkeypatch):
+    # A wide window, so the concurrent inserts below share groups
+    monkeypatch.setattr(group_commit, "GROUP_COMMIT_MS", 50)
+    return group_commit.writer_for(0)
+
+
+def _expense(user_id, amount_minor, category="Grouped"):
+    now = datetime.utcnow()
+    return dict(user_id=user_id, category=category, amount_minor=amount_minor, currency="USD",
+                expense_date=date.today(), notes=None, expense_type="regular",
+                created_at=now, updated_at=now)
+
+
+def _insert_concurrently(writer, rows):
+    """``writer.insert`` every row at once; returns each id or exception, in order."""
+    barrier = threading.Barrier(len(rows))
+
+    def insert(values):
+        barrier.wait()
+        try:
+            return writer.insert(Expense, values)
+        except Exception as exc:
+            return exc
+
+    with ThreadPoolExecutor(len(rows)) as pool:
+        return list(pool.map(insert, rows))
+
+
+def _new_user(email):
+    """Id and token of a fresh user, so the seeded users' totals stay as seeded."""
+    from conftest import create_user
+    from app.database import SessionLocal
+    from app.models import User
+
+    token = create_user(email)
+    db = SessionLocal()
+    try:
+        return db.query(User.id).filter(User.email == email).scalar(), token
+    finally:
+        db.close()
+
+
+def _amounts(ids):
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return dict(db.query(Expense.id, Expense.amount_minor).filter(Expense.id.in_(ids)).all())
+    finally:
+        db.close()
+
+
+def test_concurrent_creates_each_get_their_own_id(writer):
+    from app.database import SessionLocal
+    from app.models import UserVersion
+
+    user_id, _ = _new_user("grouped@example.com")
+
+    # Every row is distinguishable by its amount
+    ids = _insert_concurrently(writer, [_expense(user_id, 1000 + n) for n in range(WAITERS)])
+
+    assert all(isinstance(row_id, int) for row_id in ids), ids
+    assert len(set(ids)) == WAITERS
+    assert _amounts(ids) == {row_id: 1000 + n for n, row_id in enumerate(ids)}
+    db = SessionLocal()
+    try:
+        # One version bump per group, at least one group
+        assert db.query(UserVersion.version).filter(UserVersion.user_id == user_id).scalar() >= 1
+    finally:
+        db.close()
+
+
+def test_a_failing_group_reaches_every_waiter(writer, caplog):
+    user_id, _ = _new_user("grouped-failure@example.com")
+    # Every third row has a value the driver cannot bind
+    rows = [_expense(user_id, 2000 + n, category=object() if n % 3 == 0 else "Grouped")
+            for n in range(WAITERS)]
+
+    with caplog.at_level(logging.ERROR, logger=group_commit.__name__):
+        results = _insert_concurrently(writer, rows)
+
+    group_sizes = [int(re.search(r"of (\d+) rows", record.getMessage()).group(1)) for record in caplog.records]
+    assert max(group_sizes) > 1, "the rows were never written as one group"
+    failed = [n for n, result in enumerate(results) if isinstance(result, Exception)]
+    assert failed == [n for n in range(WAITERS) if n % 3 == 0]
+    assert all("binding parameter" in str(results[n]) for n in failed)
+    # The rest of the group is retried row by row and still lands
+    written = {n: row_id for n, row_id in enumerate(results) if n not in failed}
+    assert _amounts(written.values()) == {row_id: 2000 + n for n, row_id in written.items()}
+
+
+def test_create_route_uses_the_writer(client, writer, monkeypatch):
+    _, token = _new_user("grouped-route@example.com")
+    calls = []
+    insert = group_commit.GroupCommitWriter.insert
+    monkeypatch.setattr(group_commit.GroupCommitWriter, "insert",
+                        lambda self, model, values: calls.append(model) or insert(self, model, values))
+
+    response = client.post("/expenses/", params={"token": token}, json={
+        "category": "Grouped", "amount": 7.25, "expense_date": str(date.today()), "currency": "USD",
+    })
+    response.raise_for_status()
+    assert calls == [Expense]
+    assert _amounts([response.json()["id"]]) == {response.json()["id"]: 725}
@@ -0,0 +1,66 @@
+"""``Idempotency-Key`` handling for create endpoints (``app/idempotency.py``)."""
+from datetime import date
+
+from app.database import SessionLocal
+from app.models import IdempotencyKey
+from app.routes import expenses as expense_routes
+
+EXPENSE = {"category": "Food", "amount": 9.5, "expense_date": str(date.today()), "currency": "USD"}
+
+
+def _count(token, client):
+    rows = client.get("/expenses/", params={"token": token}).json()
+    return len(rows)
+
+
+def _post(client, token, key, body=EXPENSE):
+    return client.post("/expenses/", params={"token": token}, json=body, headers={"Idempotency-Key": key})
+
+
+def test_retry_with_the_same_key_replays_the_first_response(client):
+    from conftest import create_user
+
+    token = create_user("idem-replay@example.com")
+    first = _post(client, token, "replay-1")
+    retry = _post(client, token, "replay-1")
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert _count(token, client) == 1
+    db = SessionLocal()
+    try:
+        key = db.query(IdempotencyKey).filter(IdempotencyKey.key == "replay-1").one()
+        assert key.endpoint == "POST /expenses"
+    finally:
+        db.close()
+
+
+def test_same_key_with_a_different_body_is_rejected(client):
+    from conftest import create_user
+
+    token = create_user("idem-mismatch@example.com")
+    _post(client, token, "mismatch-1").raise_for_status()
+    response = _post(client, token, "mismatch-1", {**EXPENSE, "amount": 10})
+
+    assert response.status_code == 422
+    assert _count(token, client) == 1
+
+
+def test_concurrent_requests_with_the_same_key_create_one_row(client, monkeypatch):
+    from conftest import create_user
+
+    token = create_user("idem-race@example.com")
+    first = _post(client, token, "race-1")
+    # The second request checks for the key before the first one has
+    # committed: it inserts its own row, and the unique (user_id, key)
+    # constraint then rolls it back and replays the first response
+    monkeypatch.setattr(expense_routes, "find_response", lambda *args: None)
+    second = _post(client, token, "race-1")
+
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert second.headers["Idempotent-Replayed"] == "true"
+    monkeypatch.undo()
+    assert _count(token, client) == 1
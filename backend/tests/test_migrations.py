@@ -0,0 +1,45 @@
+"""Schema migrations (``app/migrations/``) applied to existing data."""
+import os
+
+import pytest
+from sqlalchemy import text
+
+from conftest import SCRATCH_DIR
+
+
+@pytest.fixture
+def scratch_engine():
+    from app.database import _create_engine
+
+    path = os.path.join(SCRATCH_DIR, "migrations.db")
+    if os.path.exists(path):
+        os.remove(path)
+    engine = _create_engine(f"sqlite:///{path}")
+    yield engine
+    engine.dispose()
+
+
+# Halves the float cannot hold exactly (2.675 is 2.67499999...), and amounts
+# whose product with 100 lands just off the integer
+AMOUNTS = [2.675, 1.005, 0.285, 1.115, 19.99, 0.1, 1234567.895, 4.35, 0.0]
+
+
+def test_integer_money_rounds_like_to_minor(scratch_engine):
+    from app import migrations
+    from app.currency_utils import to_minor
+
+    migrations.upgrade(scratch_engine, target=4)
+    with scratch_engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, email, name) VALUES (1, 'm@example.com', 'm')"))
+        for table in ("expenses", "incomes"):
+            conn.execute(text(f"INSERT INTO {table} (user_id, amount, currency) VALUES (1, :amount, 'INR')"),
+                         [{"amount": amount} for amount in AMOUNTS])
+        # Plans have no currency column and use the default exponent
+        conn.execute(text("INSERT INTO saving_plans (user_id, amount) VALUES (1, :amount)"),
+                     [{"amount": amount} for amount in AMOUNTS])
+    migrations.upgrade(scratch_engine, target=5)
+
+    with scratch_engine.connect() as conn:
+        for table in ("expenses", "incomes", "saving_plans"):
+            stored = conn.execute(text(f"SELECT amount_minor FROM {table} ORDER BY id")).scalars().all()
+            assert stored == [to_minor(amount, "INR") for amount in AMOUNTS], table
@@ -0,0 +1,54 @@
+"""Closed-month snapshots (``app/periods.py``)."""
+from datetime import date, timedelta
+
+from conftest import EMAILS
+
+from app import periods
+
+
+def _month_before_last():
+    first = date.today().replace(day=1)
+    return (first - timedelta(days=1)).replace(day=1) - timedelta(days=1)
+
+
+def test_snapshot_discarded_when_a_write_lands_during_the_scan(client, monkeypatch):
+    from app.cache import touch_user
+    from app.database import SessionLocal
+    from app.models import Expense, PeriodSnapshot, User
+
+    day = _month_before_last()
+    db = SessionLocal()
+    user_id = db.query(User.id).filter(User.email == EMAILS[1]).scalar()
+    db.close()
+    scan = periods._scan_month
+
+    def racing_scan(db, *args):
+        rows = scan(db, *args)
+        # A backdated expense commits after the scan has read the month
+        writer = SessionLocal()
+        writer.add(Expense(user_id=user_id, category="Late", amount_minor=700, currency="USD",
+                           expense_date=day))
+        periods.reopen_period(writer, user_id, day)
+        touch_user(writer, user_id)
+        writer.commit()
+        writer.close()
+        return rows
+
+    def late_total(rows):
+        return sum(total for kind, _currency, category, total, _count in rows if category == "Late")
+
+    db = SessionLocal()
+    try:
+        monkeypatch.setattr(periods, "_scan_month", racing_scan)
+        assert late_total(periods.closed_month_rows(db, user_id, day.year, day.month)) == 0
+        monkeypatch.setattr(periods, "_scan_month", scan)
+        assert db.query(PeriodSnapshot).filter(
+            PeriodSnapshot.user_id == user_id, PeriodSnapshot.year == day.year,
+            PeriodSnapshot.month == day.month,
+        ).count() == 0
+
+        # The next read closes the month with the late expense included
+        assert late_total(periods.closed_month_rows(db, user_id, day.year, day.month)) == 700
+        assert late_total(periods.closed_month_rows(db, user_id, day.year, day.month)) == 700
+    finally:
+        db.close()
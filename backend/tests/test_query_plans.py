@@ -0,0 +1,344 @@
+"""Query-plan regression tests for every route in ``app/routes/``.
+
+Each case calls one route against the seeded database (see conftest.py)
+and records every SQL statement it sends. The test fails when
+
+* the response does not match the case's ``expect``/``check``,
+* a statement's ``EXPLAIN QUERY PLAN`` shows a full scan of one of the
+  ``WATCHED`` tables (an unindexed filter), or
+* the route sends more statements than its declared ``budget`` (an N+1
+  loop, or a lookup that should have been folded into another query).
+
+Cases run in order against the same database, so later ones see what
+earlier ones wrote.
+
+A new route must get a case here, or ``test_every_route_has_a_case``
+fails. When a change legitimately needs more queries, raise the budget in
+the same change so the reason shows up in review.
+"""
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Callable, Optional
+
+import pytest
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+from conftest import ADMIN_KEY, EMAILS, PASSWORD
+
+WATCHED = {"expenses", "incomes", "saving_plans", "settings", "users"}
+
+# Routes that cannot be measured as a single request/response
+EXCLUDED = {
+    ("GET", "/events/"): "server-sent events stream never completes",
+}
+
+SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")
+
+TODAY = date.today()
+LAST_MONTH = (TODAY.replace(day=1) - timedelta(days=1))
+
+
+@dataclass
+class Case:
+    method: str
+    path: str
+    budget: int
+    params: dict = field(default_factory=dict)
+    json: Optional[dict] = None
+    headers: dict = field(default_factory=dict)
+    status: tuple = (200,)
+    user: int = 0  # index into conftest.EMAILS
+    # Runs before statements are recorded; returns values for ``path`` placeholders
+    prepare: Optional[Callable] = None
+    name: str = ""
+    # Fields the JSON response must have, and a callable with further assertions on it
+    expect: dict = field(default_factory=dict)
+    check: Optional[Callable] = None
+
+    @property
+    def id(self):
+        return f"{self.method} {self.path}{' ' + self.name if self.name else ''}"
+
+
+def _create(kind, key, body):
+    def prepare(client, token):
+        response = client.post(f"/{kind}/", params={"token": token}, json=body)
+        response.raise_for_status()
+        return {key: response.json()["id"]}
+    return prepare
+
+
+EXPENSE = {"category": "Food", "amount": 12.5, "expense_date": str(TODAY), "currency": "USD"}
+INCOME = {"source": "Gift", "amount": 50, "income_date": str(TODAY), "currency": "INR"}
+PLAN = {"category": "Trip", "amount": 100, "month": TODAY.month, "year": TODAY.year}
+
+
+def _household_invite(client, token):
+    """An invite from the first seeded user, for the case's user to accept."""
+    login = client.post("/auth/login", json={"email": EMAILS[0], "password": PASSWORD})
+    login.raise_for_status()
+    response = client.post("/household/invite", params={"token": login.json()["access_token"]})
+    response.raise_for_status()
+    return {"invite": response.json()["invite"]}
+
+
+def _sync_cursor(client, token):
+    response = client.get("/sync/", params={"token": token})
+    response.raise_for_status()
+    return {"since": response.json()["cursor"]}
+
+
+def _newest_first(field_name):
+    def check(rows):
+        dates = [row[field_name] for row in rows]
+        assert dates and dates == sorted(dates, reverse=True)
+    return check
+
+
+def _in_month(field_name):
+    def check(rows):
+        assert rows and all(row[field_name].startswith(TODAY.strftime("%Y-%m-")) for row in rows)
+    return check
+
+
+def _only_fields(*names):
+    def check(rows):
+        assert rows and all(set(row) == set(names) for row in rows)
+    return check
+
+
+def _bulk_in_order(body):
+    assert [result["email"] for result in body["results"]] == [f"user{n}@example.com" for n in range(5)]
+    assert all(result["status"] == 201 for result in body["results"])
+
+
+def _partner(email):
+    def check(body):
+        assert body["partner"]["email"] == email
+    return check
+
+
+def _plan_amounts(*amounts):
+    def check(rows):
+        # The seeded plan and the one created by the previous case
+        assert sorted(row["amount"] for row in rows) == sorted(amounts)
+    return check
+
+
+def _balanced(summary):
+    assert summary["savings"] == pytest.approx(summary["totalIncome"] - summary["totalExpense"], abs=0.01)
+
+
+def _batch_statuses(*statuses):
+    def check(body):
+        assert [result["status"] for result in body["results"]] == list(statuses)
+    return check
+
+
+def _summary(body):
+    _balanced(body)
+    # Seeded salaries of 5000 USD every 15 days
+    assert body["totalIncome"] >= 5000 and body["totalExpense"] > 0
+
+
+def _bootstrap(body):
+    assert set(body) == {"settings", "summary", "recent_activity", "plans_summary"}
+    _balanced(body["summary"])
+    _newest_first("date")(body["recent_activity"])
+
+
+def _forecast(body):
+    for name in ("regularExpense", "additionalExpense", "totalExpense", "totalIncome"):
+        assert body[name]["projected"] >= body[name]["actual"]
+
+
+def _household(body):
+    assert [member["user_id"] for member in body["members"]] == [1, 2]
+    for name in ("totalIncome", "totalExpense", "totalPlanned"):
+        assert body[name] == pytest.approx(sum(member[name] for member in body["members"]), abs=0.01)
+
+
+def _search(body):
+    assert body["has_more"] and len(body["results"]) == body["limit"]
+    assert all("groceries" in (hit["notes"] or "") + hit["title"].lower() for hit in body["results"])
+
+
+def _full_sync(body):
+    assert body["expenses"] and body["incomes"] and body["settings"]["currency"] == "INR"
+    assert all(row["user_id"] == 1 for row in body["expenses"] + body["incomes"] + body["plans"])
+
+
+def _analytics(body):
+    months = [row["month"] for row in body["rows"]]
+    assert months == sorted(months)
+    # The snapshot was exported right after seeding: 40 expenses per user
+    assert sum(row["count"] for row in body["rows"]) == 40
+
+
+CASES = [
+    Case("POST", "/auth/signup", 4, json={"name": "carol", "email": "carol@example.com", "phone": "0",
+                                          "category": "Mocha", "password": PASSWORD},
+         expect={"email": "carol@example.com"}),
+    Case("POST", "/auth/users/bulk", 5, headers={"X-Admin-Key": ADMIN_KEY}, json={"users": [
+        {"name": f"user{n}", "email": f"user{n}@example.com", "phone": "0", "category": "Milky",
+         "password": PASSWORD} for n in range(5)
+    ]}, expect={"created": 5, "failed": 0}, check=_bulk_in_order),
+    Case("GET", "/auth/verify", 1, params={"token": "not-a-real-token"}, status=(400,)),
+    Case("POST", "/auth/login", 1, json={"email": EMAILS[0], "password": PASSWORD},
+         expect={"token_type": "bearer"}),
+    Case("GET", "/auth/me", 1, expect={"email": EMAILS[0]}),
+    Case("PUT", "/auth/me", 3, json={"name": "Alice"}, expect={"name": "Alice", "email": EMAILS[0]}),
+    Case("DELETE", "/auth/data", 12, user=1),
+
+    Case("POST", "/expenses/", 6, json=EXPENSE,
+         expect={"amount": 12.5, "currency": "USD", "expense_date": str(TODAY), "user_id": 1}),
+    Case("GET", "/expenses/", 4, check=_newest_first("expense_date")),
+    Case("GET", "/expenses/", 4, params={"month": TODAY.month, "year": TODAY.year}, name="month",
+         check=_in_month("expense_date")),
+    Case("GET", "/expenses/", 0, params={"month": 13, "year": 2024}, name="bad month", status=(422,)),
+    Case("GET", "/expenses/", 4, params={"fields": "id,amount,expense_date"}, name="fields",
+         check=_only_fields("id", "amount", "expense_date")),
+    Case("POST", "/expenses/batch", 8, json={"operations": [
+        {"op": "create", "data": EXPENSE},
+        {"op": "update", "id": 1, "changes": {"category": "Groceries"}},
+        {"op": "delete", "id": 2},
+    ]}, expect={"applied": 3, "failed": 0}, check=_batch_statuses(201, 200, 200)),
+    Case("DELETE", "/expenses/{expense_id}", 5, prepare=_create("expenses", "expense_id", EXPENSE),
+         expect={"message": "Expense deleted successfully"}),
+
+    Case("POST", "/incomes/", 6, json=INCOME, expect={"amount": 50, "currency": "INR", "source": "Gift"}),
+    Case("GET", "/incomes/", 4, check=_newest_first("income_date")),
+    Case("GET", "/incomes/", 4, params={"month": TODAY.month, "year": TODAY.year}, name="month",
+         check=_in_month("income_date")),
+    Case("GET", "/incomes/", 0, params={"month": 13, "year": 2024}, name="bad month", status=(422,)),
+    Case("POST", "/incomes/batch", 8, json={"operations": [
+        {"op": "create", "data": INCOME},
+        {"op": "delete", "id": 1},
+    ]}, expect={"applied": 2, "failed": 0}, check=_batch_statuses(201, 200)),
+    Case("DELETE", "/incomes/{income_id}", 5, prepare=_create("incomes", "income_id", INCOME),
+         expect={"message": "Income deleted successfully"}),
+
+    Case("GET", "/dashboard/summary", 2, expect={"currency": "USD"}, check=_summary),
+    # Scan, then close: snapshot inserts plus the user_versions check
+    Case("GET", "/dashboard/summary", 9, params={"month": LAST_MONTH.month, "year": LAST_MONTH.year},
+         name="closing a month", expect={"currency": "USD"}, check=_summary),
+    Case("GET", "/dashboard/summary", 0, params={"month": 13, "year": 2024}, name="bad month",
+         status=(422,)),
+    Case("GET", "/dashboard/recent-activity", 2, check=_newest_first("date")),
+    Case("GET", "/dashboard/bootstrap", 3, check=_bootstrap),
+    Case("GET", "/dashboard/bootstrap", 0, params={"month": 13, "year": 2024}, name="bad month",
+         status=(422,)),
+    Case("GET", "/dashboard/forecast", 3, expect={"month": TODAY.month, "year": TODAY.year}, check=_forecast),
+
+    Case("GET", "/household/", 2, expect={"partner": None}),
+    Case("POST", "/household/invite", 1, expect={"expires_in_hours": 24}),
+    Case("POST", "/household/join", 5, user=1, prepare=_household_invite,
+         check=_partner(EMAILS[0])),
+    Case("GET", "/dashboard/household", 2, check=_household),
+    Case("GET", "/dashboard/household", 0, params={"month": 13, "year": 2024}, name="bad month",
+         status=(422,)),
+    Case("DELETE", "/household/", 3, expect={"message": "Household unlinked"}),
+
+    Case("GET", "/settings/", 2, expect={"currency": "USD", "user_id": 1}),
+    Case("PUT", "/settings/", 5, json={"currency": "INR", "usd_to_inr_rate": 82.0},
+         expect={"currency": "INR", "usd_to_inr_rate": 82.0}),
+
+    Case("POST", "/plans/", 4, json=PLAN, expect={"category": "Trip", "amount": 100}),
+    Case("GET", "/plans/", 2, check=_plan_amounts(100, 200)),
+    Case("GET", "/plans/summary", 2, params={"month": TODAY.month, "year": TODAY.year},
+         expect={"total_planned": 300, "count": 2}),
+    Case("DELETE", "/plans/{plan_id}", 4, prepare=_create("plans", "plan_id", PLAN),
+         expect={"message": "Saving plan deleted successfully"}),
+
+    Case("GET", "/search/", 4, params={"q": "groceries"}, check=_search),
+    Case("GET", "/sync/", 5, expect={"full": True}, check=_full_sync),
+    Case("GET", "/sync/", 6, prepare=_sync_cursor, name="delta", expect={"full": False}),
+    Case("GET", "/analytics/aggregate", 2, expect={"kind": "expenses", "group_by": ["month"]}, check=_analytics),
+]
+
+
+@contextmanager
+def recorded_statements():
+    """Collect ``(statement, parameters)`` for everything sent to the database."""
+    from app.database import engine
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        # executemany passes one parameter set per row; "insertmanyvalues"
+        # batches arrive already flattened into a single set
+        if executemany and parameters and isinstance(parameters[0], (tuple, list, dict)):
+            parameters = parameters[0]
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def full_scans(statement, parameters):
+    """Watched tables that ``statement`` reads with a full scan."""
+    if not statement.lstrip().upper().startswith(EXPLAINABLE):
+        return []
+    from app.database import engine
+
+    with engine.connect() as conn:
+        plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    scans = []
+    for *_, detail in plan:
+        match = SCAN.match(detail)
+        if match and match.group(1) in WATCHED:
+            scans.append(detail)
+    return scans
+
+
+def test_every_route_has_a_case(client):
+    from app.main import app
+
+    routes = {
+        (method, route.path)
+        for route in app.routes
+        if isinstance(route, APIRoute) and route.endpoint.__module__.startswith("app.routes.")
+        for method in route.methods
+    }
+    covered = {(case.method, case.path) for case in CASES} | set(EXCLUDED)
+    assert routes - covered == set(), "add a Case (with a query budget) for these routes"
+
+
+@pytest.mark.parametrize("case", CASES, ids=lambda case: case.id)
+def test_route_query_plan(client, tokens, case):
+    token = tokens[case.user]
+    params = dict(case.params)
+    path = case.path
+    if case.prepare is not None:
+        values = case.prepare(client, token)
+        path = path.format(**values)
+        params.update({key: value for key, value in values.items() if key not in case.path})
+    if not path.startswith("/auth/") or path == "/auth/me" or path == "/auth/data":
+        params.setdefault("token", token)
+
+    with recorded_statements() as statements:
+        response = client.request(case.method, path, params=params, json=case.json, headers=case.headers)
+    assert response.status_code in case.status, response.text
+    if case.expect or case.check:
+        body = response.json()
+        assert {key: body.get(key) for key in case.expect} == case.expect
+        if case.check is not None:
+            case.check(body)
+
+    problems = []
+    for statement, parameters in statements:
+        for scan in full_scans(statement, parameters):
+            problems.append(f"{scan}: {' '.join(statement.split())}")
+    assert problems == [], "full table scans:\n" + "\n".join(problems)
+
+    assert len(statements) <= case.budget, (
+        f"{case.id} issued {len(statements)} statements (budget {case.budget}):\n"
+        + "\n".join(" ".join(statement.split()) for statement, _ in statements)
+    )
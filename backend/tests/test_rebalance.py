@@ -0,0 +1,124 @@
+"""Moving a user between shards (``app/rebalance.py``), on two scratch SQLite databases."""
+import json
+import os
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from conftest import SCRATCH_DIR
+
+
+@pytest.fixture
+def shards(client):
+    from app import migrations
+    from app.database import _create_engine
+
+    engines = []
+    for name in ("source", "target"):
+        path = os.path.join(SCRATCH_DIR, f"rebalance-{name}.db")
+        if os.path.exists(path):
+            os.remove(path)
+        engine = _create_engine(f"sqlite:///{path}")
+        migrations.upgrade(engine)
+        engines.append(engine)
+    yield engines
+    for engine in engines:
+        engine.dispose()
+
+
+def _add_user(conn, user_id, expenses):
+    from app.models import Expense, User
+
+    conn.execute(User.__table__.insert().values(id=user_id, email=f"u{user_id}@example.com", name="u"))
+    now = datetime.utcnow()
+    return conn.execute(Expense.__table__.insert().returning(Expense.__table__.c.id), [
+        dict(user_id=user_id, category="Food", amount_minor=100 * n, currency="USD",
+             expense_date=date.today(), created_at=now, updated_at=now)
+        for n in range(1, expenses + 1)
+    ]).scalars().all()
+
+
+def test_move_renumbers_ids_and_keeps_idempotency_keys(shards):
+    from app.models import Expense, IdempotencyKey, UserVersion
+    from app.rebalance import copy_user
+
+    source_engine, target_engine = shards
+    now = datetime.utcnow()
+    with source_engine.begin() as source:
+        old_ids = _add_user(source, 7, 3)
+        source.execute(IdempotencyKey.__table__.insert(), [
+            dict(user_id=7, key="create-1", endpoint="POST /expenses", fingerprint="f" * 64, status_code=200,
+                 response_body=json.dumps({"id": old_ids[0], "amount": 1.0}),
+                 created_at=now, expires_at=now + timedelta(hours=1)),
+            dict(user_id=7, key="batch-1", endpoint="POST /expenses/batch", fingerprint="b" * 64,
+                 status_code=200, response_body=json.dumps({"applied": 2, "failed": 0, "results": [
+                     {"index": 0, "op": "create", "id": old_ids[1], "status": 201},
+                     {"index": 1, "op": "delete", "id": old_ids[2], "status": 200},
+                 ]}), created_at=now, expires_at=now + timedelta(hours=1)),
+            # Stored before the endpoint was recorded: cannot be remapped
+            dict(user_id=7, key="legacy", endpoint=None, fingerprint="l" * 64, status_code=200,
+                 response_body="{}", created_at=now, expires_at=now + timedelta(hours=1)),
+        ])
+    with target_engine.begin() as target:
+        # Another user already holds the ids the moved rows had
+        _add_user(target, 8, 5)
+
+    with source_engine.connect() as source, target_engine.begin() as target:
+        copied, id_map = copy_user(7, source, target)
+
+    assert copied["expenses"] == 3
+    assert copied["idempotency_keys"] == 2
+    new_ids = [id_map["expenses"][old_id] for old_id in old_ids]
+    assert set(new_ids).isdisjoint(old_ids)
+
+    with target_engine.connect() as target:
+        moved = target.execute(
+            select(Expense.id, Expense.amount_minor).where(Expense.user_id == 7).order_by(Expense.id)
+        ).all()
+        assert moved == [(new_ids[n], 100 * (n + 1)) for n in range(3)]
+
+        keys = dict(target.execute(
+            select(IdempotencyKey.key, IdempotencyKey.response_body).where(IdempotencyKey.user_id == 7)
+        ).all())
+        assert json.loads(keys["create-1"])["id"] == new_ids[0]
+        assert [result["id"] for result in json.loads(keys["batch-1"])["results"]] == new_ids[1:]
+        assert "legacy" not in keys
+
+        resync_before = target.execute(
+            select(UserVersion.resync_before).where(UserVersion.user_id == 7)
+        ).scalar()
+        assert resync_before is not None and resync_before >= now
+
+
+def test_move_from_shard_zero_keeps_the_newest_id(shards, monkeypatch):
+    from app import rebalance as rebalancing
+    from app.models import Expense, ShardDirectory
+
+    source_engine, target_engine = shards
+    with source_engine.begin() as source:
+        source.execute(ShardDirectory.__table__.insert().values(
+            user_id=7, email="u7@example.com", shard=0, moving=False
+        ))
+        old_ids = _add_user(source, 7, 3)
+    # Shard 0 also holds the directory, as DATABASE_URL does
+    monkeypatch.setattr(rebalancing, "engine", source_engine)
+    monkeypatch.setattr(rebalancing, "shard_engines", [source_engine, target_engine])
+    monkeypatch.setattr(rebalancing, "REBALANCE_DRAIN_SECONDS", 0)
+
+    copied, _ = rebalancing.rebalance("u7@example.com", 1)
+
+    assert copied["expenses"] == 3
+    expenses = Expense.__table__
+    with source_engine.begin() as source:
+        entry = source.execute(select(ShardDirectory.shard, ShardDirectory.moving)).one()
+        assert tuple(entry) == (1, False)
+        left = source.execute(select(expenses)).all()
+        # Blanked, not deleted, so SQLite does not hand out its id again
+        assert [(row.id, row.user_id, row.category, row.amount_minor) for row in left] == \
+            [(old_ids[-1], None, None, None)]
+        assert left[0].deleted_at is not None
+        new_id = source.execute(expenses.insert().returning(expenses.c.id).values(
+            user_id=9, category="Food", amount_minor=1, currency="USD", expense_date=date.today(),
+        )).scalar()
+    assert new_id > max(old_ids)
@@ -0,0 +1,108 @@
+"""Read-only handlers with a read replica (``DATABASE_READ_URL``) that lags behind."""
+import os
+import sqlite3
+
+import pytest
+from sqlalchemy import event
+
+from conftest import SCRATCH_DIR, create_user
+
+
+@pytest.fixture
+def lagging_replica(client, monkeypatch):
+    """Freeze a copy of the database as the replica; call it again to take a fresh copy."""
+    from app import database
+
+    path = os.path.join(SCRATCH_DIR, "replica.db")
+    replica = None
+
+    def snapshot():
+        nonlocal replica
+        if replica is not None:
+            replica.dispose()
+        primary = sqlite3.connect(database.engine.url.database)
+        copy = sqlite3.connect(path)
+        primary.backup(copy)
+        copy.close()
+        primary.close()
+        replica = database._create_engine(f"sqlite:///{path}")
+        monkeypatch.setattr(database, "read_engine", replica)
+
+    yield snapshot
+    replica.dispose()
+
+
+def _without_settings(email):
+    from app.database import SessionLocal
+    from app.models import Settings, User
+
+    token = create_user(email)
+    db = SessionLocal()
+    try:
+        user_id = db.query(User.id).filter(User.email == email).scalar()
+        db.query(Settings).filter(Settings.user_id == user_id).delete()
+        db.commit()
+    finally:
+        db.close()
+    return token
+
+
+@pytest.mark.parametrize("path", ["/settings/", "/dashboard/bootstrap"])
+def test_missing_settings_are_created_on_the_primary(client, lagging_replica, path):
+    token = _without_settings(f"no-settings-{path.strip('/').replace('/', '-')}@example.com")
+    lagging_replica()
+
+    response = client.get(path, params={"token": token})
+
+    assert response.status_code == 200
+    settings = response.json() if path == "/settings/" else response.json()["settings"]
+    assert settings["currency"] == "USD"
+    # Created once: the next read finds it on the primary, not a second insert
+    assert client.get(path, params={"token": token}).status_code == 200
+
+
+def test_settings_missing_only_on_the_replica_are_not_inserted_twice(client, lagging_replica):
+    from app.database import SessionLocal
+    from app.models import Settings, User
+
+    email = "late-settings@example.com"
+    token = _without_settings(email)
+    lagging_replica()
+    db = SessionLocal()
+    try:
+        user_id = db.query(User.id).filter(User.email == email).scalar()
+        db.add(Settings(user_id=user_id, currency="INR"))
+        db.commit()
+    finally:
+        db.close()
+
+    response = client.get("/settings/", params={"token": token})
+    assert response.status_code == 200
+    assert response.json()["currency"] == "INR"
+
+
+
+def test_sync_does_not_skip_rows_the_replica_has_not_applied(client, lagging_replica, monkeypatch):
+    from app import database
+
+    token = create_user("lagging-sync@example.com")
+    expense = {"category": "Food", "amount": 4, "expense_date": "2024-05-01", "currency": "USD"}
+    client.post("/expenses/", params={"token": token}, json=expense).raise_for_status()
+    lagging_replica()
+    created = client.post("/expenses/", params={"token": token}, json=expense).json()
+    # Past the read-after-write window, but the replica still lacks the write
+    monkeypatch.setattr(database, "READ_AFTER_WRITE_SECONDS", 0)
+
+    synced = client.get("/sync/", params={"token": token}).json()
+    assert created["id"] in [row["id"] for row in synced["expenses"]]
+
+    # Once the replica has caught up, it serves the sync again
+    lagging_replica()
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(database.read_engine, "before_cursor_execute", record)
+    try:
+        client.get("/sync/", params={"token": token}).raise_for_status()
+    finally:
+        event.remove(database.read_engine, "before_cursor_execute", record)
+    assert any("FROM expenses" in statement for statement in statements)
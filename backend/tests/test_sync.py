@@ -0,0 +1,31 @@
+"""Delta sync (``GET /sync``)."""
+from datetime import date, datetime, timedelta
+
+from app.archive import TOMBSTONE_RETENTION_DAYS
+from app.routes.sync import encode_cursor
+
+
+def test_cursor_within_retention_gets_a_delta(client):
+    from conftest import create_user
+
+    token = create_user("delta@example.com")
+    cursor = client.get("/sync/", params={"token": token}).json()["cursor"]
+    created = client.post("/expenses/", params={"token": token}, json={
+        "category": "Food", "amount": 3, "expense_date": str(date.today()), "currency": "USD",
+    }).json()
+    client.delete(f"/expenses/{created['id']}", params={"token": token}).raise_for_status()
+
+    synced = client.get("/sync/", params={"token": token, "since": cursor}).json()
+    assert synced["full"] is False
+    assert synced["deleted"]["expenses"] == [created["id"]]
+
+
+def test_cursor_older_than_tombstone_retention_gets_a_full_resync(client, tokens):
+    stale = encode_cursor(0, datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS + 1))
+    synced = client.get("/sync/", params={"token": tokens[0], "since": stale}).json()
+    assert synced["full"] is True
+    assert synced["deleted"]["expenses"] == []
+    assert len(synced["expenses"]) > 0
+
+    recent = encode_cursor(0, datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS - 1))
+    assert client.get("/sync/", params={"token": tokens[0], "since": recent}).json()["full"] is False